@@ -0,0 +1,282 @@
+"""Read-only HTTP JSON API over the blog data, on plain asyncio
+
+Usage:
+    python api.py [--host 127.0.0.1] [--port 8080] [--mode json] [--metrics SPEC] [DATA_FILE]
+
+Endpoints (GET or HEAD, all answering JSON):
+
+    /posts?limit=10&cursor=C               newest posts first, without content
+    /posts/ID                              one post with its content
+    /search?q=TEXT&page=1&per_page=10      posts ranked by relevance
+    /authors                               every author with post and like counts
+    /authors/NAME/posts?limit=10&cursor=C  one author's posts, newest first
+
+Listings return {"posts", "next_cursor", "total"}; pass next_cursor back as
+cursor for the following page, until it is null.
+
+Every response carries a strong ETag built from BlogManager.data_version(),
+which moves on with any change to the posts, and the server's start-up ID.
+A client repeating a request with If-None-Match gets 304 Not Modified as
+long as nothing changed, which costs the server a data version check and
+nothing else. Response bodies are cached per data version and sent
+gzip-compressed to clients that accept it.
+"""
+import argparse
+import asyncio
+import base64
+import gzip
+import json
+import secrets
+import sys
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import metrics
+from blog_manager import BlogManager
+from fragment_cache import FragmentCache
+from metrics import timed
+from storage import STORAGE_BACKENDS
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+RESPONSE_CACHE_BYTES = 16 * 1024 * 1024
+# Smaller bodies gain too little from compression to be worth it
+GZIP_MIN_SIZE = 512
+GZIP_LEVEL = 6
+# Longest request line plus headers
+MAX_HEADER_BYTES = 16 * 1024
+# Seconds an idle keep-alive connection stays open
+KEEP_ALIVE_TIMEOUT = 15.0
+
+class ApiError(Exception):
+    """A request the API can't answer, sent as the status with {"error": message}"""
+    
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def encode_cursor(cursor):
+    """Opaque text form of a keyset cursor (None stays None)"""
+    if cursor is None:
+        return None
+    data = json.dumps(list(cursor), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip("=")
+
+def decode_cursor(text):
+    """Keyset cursor from encode_cursor's text, raising ApiError for anything else"""
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(text + "=" * (-len(text) % 4)))
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Invalid cursor") from None
+    if not (isinstance(cursor, list) and len(cursor) == 2 and all(isinstance(part, str) for part in cursor)):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Invalid cursor")
+    return tuple(cursor)
+
+def _int_param(query, name, default, maximum):
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        value = int(values[0])
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be a number") from None
+    if not 1 <= value <= maximum:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be between 1 and {maximum}")
+    return value
+
+def _accepts_gzip(accept_encoding):
+    for item in accept_encoding.split(","):
+        coding, _, parameters = item.partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            quality = parameters.strip()
+            return not (quality.startswith("q=") and quality[2:].strip() in ("0", "0.0", "0.00", "0.000"))
+    return False
+
+def _parse_head(head):
+    """(method, target, HTTP version, headers with lowercased names) of a request head"""
+    lines = head.decode('latin-1').split("\r\n")
+    method, target, version = lines[0].split(" ")
+    if not version.startswith("HTTP/1."):
+        raise ValueError(f"Unsupported protocol {version}")
+    headers = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, separator, value = line.partition(":")
+        if not separator:
+            raise ValueError(f"Malformed header {line!r}")
+        name = name.strip().lower()
+        headers[name] = f"{headers[name]}, {value.strip()}" if name in headers else value.strip()
+    return method, target, version, headers
+
+class BlogApi:
+    """Answers API requests from a BlogManager; handle_connection serves one client connection"""
+    
+    def __init__(self, manager, cache_bytes=RESPONSE_CACHE_BYTES):
+        self.manager = manager
+        # Data versions start over when the process does, so tags from an
+        # earlier run must not match the same version numbers
+        self.instance = secrets.token_hex(4)
+        self.responses = FragmentCache(cache_bytes, name="api_responses")
+    
+    def etag(self, version, gzipped):
+        return f'"{self.instance}-{version}{"-gzip" if gzipped else ""}"'
+    
+    def _listing(self, query, author=None):
+        limit = _int_param(query, "limit", DEFAULT_LIMIT, MAX_LIMIT)
+        cursor = decode_cursor(query["cursor"][0]) if query.get("cursor") else None
+        posts, next_cursor, total = self.manager.get_posts_page(cursor, limit, author)
+        return {"posts": posts, "next_cursor": encode_cursor(next_cursor), "total": total}
+    
+    def _route(self, path, query):
+        """The JSON value answering a request for path, or ApiError"""
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        if parts == ["posts"]:
+            return self._listing(query)
+        if len(parts) == 2 and parts[0] == "posts":
+            post = self.manager.get_post(parts[1])
+            if post is None:
+                raise ApiError(HTTPStatus.NOT_FOUND, "No such post")
+            return post
+        if parts == ["search"]:
+            text = query.get("q", [""])[0].strip()
+            if not text:
+                raise ApiError(HTTPStatus.BAD_REQUEST, "q is required")
+            page = _int_param(query, "page", 1, sys.maxsize)
+            per_page = _int_param(query, "per_page", DEFAULT_LIMIT, MAX_LIMIT)
+            posts, total = self.manager.search_posts_ranked(text, page, per_page)
+            return {"posts": posts, "total": total, "page": page}
+        if parts == ["authors"]:
+            authors = sorted(self.manager.get_stats()["authors"].values(),
+                             key=lambda author: (-author["posts"], author["author"].lower()))
+            return {"authors": authors}
+        if len(parts) == 3 and parts[0] == "authors" and parts[2] == "posts":
+            return self._listing(query, author=parts[1])
+        raise ApiError(HTTPStatus.NOT_FOUND, "Not found")
+    
+    def _body(self, version, target, gzipped):
+        """Response body for target at a data version, built once and then cached"""
+        def render():
+            if gzipped:
+                # mtime=0 keeps the bytes, and so the strong ETag, the same across rebuilds
+                return gzip.compress(self._body(version, target, False), GZIP_LEVEL, mtime=0)
+            url = urlsplit(target)
+            value = self._route(url.path, parse_qs(url.query))
+            return json.dumps(value, ensure_ascii=False).encode('utf-8')
+        return self.responses.get_or_render((version, target, gzipped), render)
+    
+    @timed("BlogApi.render")
+    def render(self, version, target, accepts_gzip):
+        """(body, gzipped) answering target at a data version; runs in a worker thread"""
+        body = self._body(version, target, False)
+        if accepts_gzip and len(body) >= GZIP_MIN_SIZE:
+            return self._body(version, target, True), True
+        return body, False
+    
+    async def respond(self, method, target, headers):
+        """(status, headers, body) answering one request"""
+        if method not in ("GET", "HEAD"):
+            return self._error(HTTPStatus.METHOD_NOT_ALLOWED, "Method not allowed", {"Allow": "GET, HEAD"})
+        version = self.manager.data_version()
+        accepts_gzip = _accepts_gzip(headers.get("accept-encoding", ""))
+        response_headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        
+        if "if-none-match" in headers:
+            current = {self.etag(version, False), self.etag(version, True) if accepts_gzip else None}
+            for tag in headers["if-none-match"].split(","):
+                tag = tag.strip().removeprefix("W/")
+                if tag in current:
+                    response_headers["ETag"] = tag
+                    return HTTPStatus.NOT_MODIFIED, response_headers, b""
+        
+        try:
+            body, gzipped = await asyncio.to_thread(self.render, version, target, accepts_gzip)
+        except ApiError as e:
+            return self._error(e.status, str(e))
+        except Exception as e:
+            print(f"Error answering {target}: {e!r}", file=sys.stderr)
+            return self._error(HTTPStatus.INTERNAL_SERVER_ERROR, "Internal server error")
+        response_headers["ETag"] = self.etag(version, gzipped)
+        response_headers["Content-Type"] = "application/json; charset=utf-8"
+        if gzipped:
+            response_headers["Content-Encoding"] = "gzip"
+        return HTTPStatus.OK, response_headers, body
+    
+    @staticmethod
+    def _error(status, message, headers=None):
+        body = json.dumps({"error": message}).encode('utf-8')
+        return status, {"Content-Type": "application/json; charset=utf-8", **(headers or {})}, body
+    
+    async def handle_connection(self, reader, writer):
+        """Answer requests on one connection until the client closes it or stops keeping it alive"""
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, "HEAD", False,
+                                     *self._error(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Headers too large"))
+                    return
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                try:
+                    method, target, version, headers = _parse_head(head)
+                    # Requests to this API have no body, but one sent anyway must not be read as the next request
+                    length = int(headers.get("content-length", 0))
+                    if length:
+                        await reader.readexactly(length)
+                except (ValueError, asyncio.IncompleteReadError):
+                    await self._send(writer, "GET", False, *self._error(HTTPStatus.BAD_REQUEST, "Bad request"))
+                    return
+                connection = headers.get("connection", "").lower()
+                keep_alive = "keep-alive" in connection if version == "HTTP/1.0" else "close" not in connection
+                await self._send(writer, method, keep_alive, *await self.respond(method, target, headers))
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    
+    @staticmethod
+    async def _send(writer, method, keep_alive, status, headers, body):
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        if status != HTTPStatus.NOT_MODIFIED:
+            lines.append(f"Content-Length: {len(body)}")
+        lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+        if method != "HEAD":
+            writer.write(body)
+        await writer.drain()
+
+async def serve(manager, host="127.0.0.1", port=8080):
+    """Serve the API for manager until cancelled"""
+    api = BlogApi(manager)
+    server = await asyncio.start_server(api.handle_connection, host, port, limit=MAX_HEADER_BYTES, backlog=1024)
+    async with server:
+        await server.serve_forever()
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Read-only HTTP JSON API over the blog data")
+    parser.add_argument("data_file", nargs="?", default="data/blog_posts.json", help="Data file")
+    parser.add_argument("--mode", choices=sorted(STORAGE_BACKENDS), default="json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--metrics", metavar="SPEC",
+                        help="Record operation metrics to these sinks (see metrics.py)")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    metrics.configure(args.metrics)
+    manager = BlogManager(args.data_file, storage_mode=args.mode)
+    print(f"Serving {args.data_file} ({args.mode}) at http://{args.host}:{args.port}/", file=sys.stderr)
+    try:
+        asyncio.run(serve(manager, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,11 +3,13 @@ import json
 import os
 from datetime import datetime
 from pathlib import Path
-from blog_manager import BlogManager
-from utils import format_date, truncate_content, search_posts
-
-# Initialize blog manager
-blog_manager = BlogManager()
+import streamlit_cache as cached
+from storage import VersionConflict
+from fragment_cache import post_fragment_key
+from metrics import timed
+from streamlit_cache import get_blog_manager, get_fragment_cache
+from templates import render_manage_item, render_post_card, render_post_view, theme_css
+from utils import count_words, format_date, reading_time_for_words
 
 # Configure page
 st.set_page_config(
@@ -17,271 +19,20 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Operation metrics, off unless BLOG_METRICS names sinks for them (see metrics.py)
+cached.setup_metrics(os.environ.get("BLOG_METRICS"))
+
+# One blog manager per process, shared by all sessions; BLOG_STORAGE_MODE
+# selects json, journal, split, compressed, sharded or sqlite storage (with
+# BLOG_COMPRESSION picking zlib or lzma for compressed). Reads below go
+# through streamlit_cache, which caches them until the next write
+blog_manager = get_blog_manager(os.environ.get("BLOG_STORAGE_MODE", "json"), os.environ.get("BLOG_COMPRESSION"))
+# Rendered post HTML and theme CSS, reused across reruns and sessions
+fragments = get_fragment_cache()
+
 # Dynamic CSS for light/dark mode
 def get_theme_css():
-    if st.session_state.dark_mode:
-        return """
-        <style>
-            .stApp {
-                background-color: #1a1a1a;
-                color: #ffffff;
-            }
-            
-            .main-header {
-                background: linear-gradient(90deg, #4a5568 0%, #2d3748 100%);
-                padding: 2rem 1rem;
-                border-radius: 10px;
-                margin-bottom: 2rem;
-                color: white;
-                text-align: center;
-            }
-            
-            .post-container {
-                background: #2d3748;
-                padding: 1.5rem;
-                border-radius: 10px;
-                box-shadow: 0 2px 10px rgba(0,0,0,0.3);
-                margin-bottom: 1.5rem;
-                border-left: 4px solid #4a5568;
-            }
-            
-            .post-title {
-                color: #e2e8f0;
-                font-size: 1.5rem;
-                font-weight: 600;
-                margin-bottom: 0.5rem;
-            }
-            
-            .post-meta {
-                color: #a0aec0;
-                font-size: 0.9rem;
-                margin-bottom: 1rem;
-            }
-            
-            .post-content {
-                color: #cbd5e0;
-                line-height: 1.6;
-                margin-bottom: 1rem;
-            }
-            
-            .sidebar-header {
-                background: linear-gradient(135deg, #4a5568 0%, #2d3748 100%);
-                padding: 1rem;
-                border-radius: 10px;
-                margin-bottom: 1rem;
-                color: white;
-                text-align: center;
-            }
-            
-            .stats-container {
-                background: #2d3748;
-                padding: 1rem;
-                border-radius: 8px;
-                margin: 1rem 0;
-                color: #e2e8f0;
-            }
-            
-            .welcome-banner {
-                background: linear-gradient(135deg, #4a5568 0%, #2d3748 100%);
-                color: white;
-                padding: 2rem;
-                border-radius: 15px;
-                text-align: center;
-                margin-bottom: 2rem;
-            }
-            
-            .search-highlight {
-                background: #744210;
-                padding: 0.5rem 1rem;
-                border-radius: 5px;
-                border-left: 4px solid #f6e05e;
-                margin-bottom: 1rem;
-                color: #faf089;
-            }
-            
-            .empty-state {
-                text-align: center;
-                padding: 3rem;
-                color: #a0aec0;
-            }
-            
-            .form-container {
-                background: #2d3748;
-                padding: 2rem;
-                border-radius: 10px;
-                box-shadow: 0 2px 10px rgba(0,0,0,0.3);
-                margin-bottom: 2rem;
-            }
-            
-            .manage-post-item {
-                background: #2d3748;
-                padding: 1.5rem;
-                border-radius: 8px;
-                box-shadow: 0 1px 5px rgba(0,0,0,0.3);
-                margin-bottom: 1rem;
-                border-left: 3px solid #4a5568;
-            }
-            
-            .reading-time {
-                color: #a0aec0;
-                font-size: 0.85rem;
-                font-style: italic;
-            }
-            
-            .like-button {
-                background: none;
-                border: none;
-                color: #e53e3e;
-                cursor: pointer;
-                font-size: 1.2rem;
-                margin-right: 0.5rem;
-            }
-            
-            .like-button:hover {
-                color: #c53030;
-            }
-            
-            .like-count {
-                color: #a0aec0;
-                font-size: 0.9rem;
-            }
-        </style>
-        """
-    else:
-        return """
-        <style>
-            .main-header {
-                background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
-                padding: 2rem 1rem;
-                border-radius: 10px;
-                margin-bottom: 2rem;
-                color: white;
-                text-align: center;
-            }
-            
-            .post-container {
-                background: white;
-                padding: 1.5rem;
-                border-radius: 10px;
-                box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-                margin-bottom: 1.5rem;
-                border-left: 4px solid #667eea;
-            }
-            
-            .post-title {
-                color: #2c3e50;
-                font-size: 1.5rem;
-                font-weight: 600;
-                margin-bottom: 0.5rem;
-            }
-            
-            .post-meta {
-                color: #7f8c8d;
-                font-size: 0.9rem;
-                margin-bottom: 1rem;
-            }
-            
-            .post-content {
-                color: #34495e;
-                line-height: 1.6;
-                margin-bottom: 1rem;
-            }
-            
-            .sidebar-header {
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                padding: 1rem;
-                border-radius: 10px;
-                margin-bottom: 1rem;
-                color: white;
-                text-align: center;
-            }
-            
-            .stats-container {
-                background: #f8f9fa;
-                padding: 1rem;
-                border-radius: 8px;
-                margin: 1rem 0;
-            }
-            
-            .welcome-banner {
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 2rem;
-                border-radius: 15px;
-                text-align: center;
-                margin-bottom: 2rem;
-            }
-            
-            .button-container {
-                display: flex;
-                gap: 10px;
-                margin-top: 1rem;
-            }
-            
-            .pagination-container {
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                gap: 20px;
-                margin: 2rem 0;
-            }
-            
-            .search-highlight {
-                background: #fff3cd;
-                padding: 0.5rem 1rem;
-                border-radius: 5px;
-                border-left: 4px solid #ffc107;
-                margin-bottom: 1rem;
-            }
-            
-            .empty-state {
-                text-align: center;
-                padding: 3rem;
-                color: #6c757d;
-            }
-            
-            .form-container {
-                background: white;
-                padding: 2rem;
-                border-radius: 10px;
-                box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-                margin-bottom: 2rem;
-            }
-            
-            .manage-post-item {
-                background: white;
-                padding: 1.5rem;
-                border-radius: 8px;
-                box-shadow: 0 1px 5px rgba(0,0,0,0.1);
-                margin-bottom: 1rem;
-                border-left: 3px solid #667eea;
-            }
-            
-            .reading-time {
-                color: #6c757d;
-                font-size: 0.85rem;
-                font-style: italic;
-            }
-            
-            .like-button {
-                background: none;
-                border: none;
-                color: #e53e3e;
-                cursor: pointer;
-                font-size: 1.2rem;
-                margin-right: 0.5rem;
-            }
-            
-            .like-button:hover {
-                color: #c53030;
-            }
-            
-            .like-count {
-                color: #6c757d;
-                font-size: 0.9rem;
-            }
-        </style>
-        """
+    return theme_css(st.session_state.dark_mode)
 
 # Initialize session state FIRST
 if 'current_page' not in st.session_state:
@@ -290,26 +41,61 @@ if 'current_post_id' not in st.session_state:
     st.session_state.current_post_id = None
 if 'search_query' not in st.session_state:
     st.session_state.search_query = ""
+if 'search_sort' not in st.session_state:
+    st.session_state.search_sort = "Newest"
 if 'posts_per_page' not in st.session_state:
     st.session_state.posts_per_page = 5
 if 'current_page_num' not in st.session_state:
     st.session_state.current_page_num = 1
+if 'page_cursors' not in st.session_state:
+    # Keyset cursor each listing page starts from; page 1 starts at the newest post
+    st.session_state.page_cursors = {1: None}
+if 'current_author' not in st.session_state:
+    st.session_state.current_author = None
+if 'author_page_num' not in st.session_state:
+    st.session_state.author_page_num = 1
+if 'author_page_cursors' not in st.session_state:
+    # Like page_cursors, for the pages of the author being browsed
+    st.session_state.author_page_cursors = {1: None}
 if 'dark_mode' not in st.session_state:
     st.session_state.dark_mode = False
 if 'liked_posts' not in st.session_state:
     st.session_state.liked_posts = set()
 
 # Apply theme CSS AFTER session state is initialized
-st.markdown(get_theme_css(), unsafe_allow_html=True)
+st.markdown(fragments.get_or_render(("theme_css", st.session_state.dark_mode), get_theme_css),
+            unsafe_allow_html=True)
 
 def navigate_to(page, post_id=None):
     """Navigate to a specific page"""
     st.session_state.current_page = page
+    # A new visit to the edit page starts from the post's current version
+    st.session_state.pop("edit_base_version", None)
     if post_id:
         st.session_state.current_post_id = post_id
     st.rerun()
 
+def select_author(author):
+    """Switch to the first page of an author's posts; callers outside callbacks then st.rerun()"""
+    st.session_state.current_page = "author"
+    st.session_state.current_author = author
+    st.session_state.author_page_num = 1
+    st.session_state.author_page_cursors = {1: None}
+
+def select_more_author():
+    """Callback of the sidebar's author picker"""
+    author = st.session_state.more_authors
+    st.session_state.more_authors = ""
+    if author:
+        select_author(author)
+
+@timed("app.main")
 def main():
+    # Confirmation of a publish or update, which redirects straight to the home page
+    notice = st.session_state.pop("notice", None)
+    if notice:
+        st.toast(notice)
+    
     # Enhanced sidebar navigation with custom styling
     st.sidebar.markdown("""
     <div class="sidebar-header">
@@ -337,18 +123,43 @@ def main():
         st.session_state.current_page_num = 1
         st.rerun()
     
-    # Blog statistics
-    total_posts = blog_manager.get_post_count()
-    total_likes = blog_manager.get_total_likes()
+    search_sort = st.sidebar.radio("Sort results by:", ["Relevance", "Newest"],
+                                   index=["Relevance", "Newest"].index(st.session_state.search_sort),
+                                   horizontal=True)
+    if search_sort != st.session_state.search_sort:
+        st.session_state.search_sort = search_sort
+        st.session_state.current_page_num = 1
+        st.rerun()
+    
+    # Blog statistics, maintained by storage so they cost the same for any number of posts
+    stats = cached.get_stats(blog_manager)
+    latest_post = format_date(stats['latest_post_at']) if stats['latest_post_at'] else "—"
     st.sidebar.markdown(f"""
     <div class="stats-container">
         <h4>📊 Blog Stats</h4>
-        <p><strong>Total Posts:</strong> {total_posts}</p>
-        <p><strong>Total Likes:</strong> ❤️ {total_likes}</p>
+        <p><strong>Total Posts:</strong> {stats['post_count']}</p>
+        <p><strong>Total Likes:</strong> ❤️ {stats['total_likes']}</p>
+        <p><strong>Latest Post:</strong> {latest_post}</p>
         <p><strong>Page:</strong> {st.session_state.current_page_num}</p>
     </div>
     """, unsafe_allow_html=True)
     
+    # Author facet, most prolific first: the top authors as links to their
+    # posts, everyone else in a picker
+    authors = sorted(stats['authors'].values(), key=lambda a: (-a['posts'], -a['likes'], a['author'].lower()))
+    if authors:
+        with st.sidebar.expander("👥 Authors"):
+            for author in authors[:5]:
+                if st.button(f"{author['author']} — 📝 {author['posts']} | ❤️ {author['likes']}",
+                             key=f"author_{author['author'].lower()}", use_container_width=True):
+                    select_author(author['author'])
+                    st.rerun()
+            if len(authors) > 5:
+                post_counts = {author['author']: author['posts'] for author in authors[5:]}
+                st.selectbox("More authors", [""] + list(post_counts), key="more_authors",
+                             format_func=lambda name: f"{name} ({post_counts[name]})" if name else f"…and {len(post_counts)} more",
+                             on_change=select_more_author)
+    
     # Settings section
     st.sidebar.markdown("### ⚙️ Settings")
     
@@ -366,6 +177,7 @@ def main():
     if posts_per_page != st.session_state.posts_per_page:
         st.session_state.posts_per_page = posts_per_page
         st.session_state.current_page_num = 1
+        st.session_state.page_cursors = {1: None}
         st.rerun()
     
     # Main content area
@@ -379,7 +191,10 @@ def main():
         show_manage_page()
     elif st.session_state.current_page == "view":
         show_view_page()
+    elif st.session_state.current_page == "author":
+        show_author_page()
 
+@timed("app.show_home_page")
 def show_home_page():
     """Display the home page with blog posts"""
     # Enhanced welcome header
@@ -390,16 +205,37 @@ def show_home_page():
     </div>
     """, unsafe_allow_html=True)
     
-    # Get all posts
-    all_posts = blog_manager.get_all_posts()
+    # Calculate start and end indices for current page
+    start_idx = (st.session_state.current_page_num - 1) * st.session_state.posts_per_page
+    end_idx = start_idx + st.session_state.posts_per_page
+    
+    # Get posts, filtered through the search index if a query exists
+    if st.session_state.search_query and st.session_state.search_sort == "Relevance":
+        # Ranked search only scores and fetches the posts for the current page
+        posts_to_show, total_posts = cached.search_posts_ranked(
+            blog_manager, st.session_state.search_query, st.session_state.current_page_num, st.session_state.posts_per_page)
+        has_next_page = end_idx < total_posts
+    elif st.session_state.search_query:
+        all_posts = cached.search_posts(blog_manager, st.session_state.search_query)
+        total_posts = len(all_posts)
+        posts_to_show = all_posts[start_idx:end_idx]
+        has_next_page = end_idx < total_posts
+    else:
+        # Keyset pagination: only the current page is fetched, starting from
+        # the cursor remembered when this page was reached with Next
+        if st.session_state.current_page_num not in st.session_state.page_cursors:
+            st.session_state.current_page_num = 1
+        cursor = st.session_state.page_cursors[st.session_state.current_page_num]
+        posts_to_show, next_cursor, total_posts = cached.get_posts_page(blog_manager, cursor, st.session_state.posts_per_page)
+        has_next_page = next_cursor is not None
+        if has_next_page:
+            st.session_state.page_cursors[st.session_state.current_page_num + 1] = next_cursor
     
-    # Apply search filter if query exists
     if st.session_state.search_query:
-        all_posts = search_posts(all_posts, st.session_state.search_query)
-        if all_posts:
+        if total_posts:
             st.markdown(f"""
             <div class="search-highlight">
-                <strong>🔍 Search Results:</strong> Found {len(all_posts)} post(s) matching '{st.session_state.search_query}'
+                <strong>🔍 Search Results:</strong> Found {total_posts} post(s) matching '{st.session_state.search_query}'
             </div>
             """, unsafe_allow_html=True)
         else:
@@ -412,7 +248,7 @@ def show_home_page():
             """, unsafe_allow_html=True)
             return
     
-    if not all_posts:
+    if not total_posts:
         st.markdown("""
         <div class="empty-state">
             <h3>📝 No Posts Yet</h3>
@@ -423,7 +259,6 @@ def show_home_page():
         return
     
     # Pagination
-    total_posts = len(all_posts)
     total_pages = (total_posts - 1) // st.session_state.posts_per_page + 1
     
     # Enhanced pagination controls
@@ -443,39 +278,20 @@ def show_home_page():
         st.markdown(f"<div style='text-align: center; padding: 10px;'><strong>Page {st.session_state.current_page_num} of {total_pages}</strong></div>", unsafe_allow_html=True)
     
     with col3:
-        if st.session_state.current_page_num < total_pages:
+        if has_next_page:
             if st.button("Next →", type="secondary"):
                 st.session_state.current_page_num += 1
                 st.rerun()
     
     st.markdown("</div>", unsafe_allow_html=True)
     
-    # Calculate start and end indices for current page
-    start_idx = (st.session_state.current_page_num - 1) * st.session_state.posts_per_page
-    end_idx = start_idx + st.session_state.posts_per_page
-    posts_to_show = all_posts[start_idx:end_idx]
-    
-    # Display posts with enhanced styling
-    for post in posts_to_show:
-        # Import utils for reading time calculation
-        from utils import count_reading_time
-        reading_time = count_reading_time(post['content'])
-        likes_count = post.get('likes', 0)
-        
-        st.markdown(f"""
-        <div class="post-container">
-            <div class="post-title">{post['title']}</div>
-            <div class="post-meta">
-                📅 {format_date(post['created_at'])} | 
-                👤 {post['author']} | 
-                <span class="reading-time">⏱️ {reading_time} min read</span> |
-                ❤️ {likes_count} likes
-            </div>
-            <div class="post-content">
-                {truncate_content(post['content'], 200)}
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+    show_post_cards(posts_to_show)
+
+def show_post_cards(posts):
+    """Display post previews with Read More and Like buttons"""
+    for post in posts:
+        st.markdown(fragments.get_or_render(post_fragment_key(post, "card"), lambda: render_post_card(post)),
+                    unsafe_allow_html=True)
         
         col1, col2, col3 = st.columns([1, 1, 3])
         with col1:
@@ -493,6 +309,60 @@ def show_home_page():
                     st.session_state.liked_posts.add(post['id'])
                 st.rerun()
 
+@timed("app.show_author_page")
+def show_author_page():
+    """Display one author's posts, a page at a time"""
+    author = st.session_state.current_author
+    if not author:
+        navigate_to("home")
+    
+    # Only the current page is fetched, through the storage's author index
+    if st.session_state.author_page_num not in st.session_state.author_page_cursors:
+        st.session_state.author_page_num = 1
+    cursor = st.session_state.author_page_cursors[st.session_state.author_page_num]
+    posts_to_show, next_cursor, total_posts = cached.get_posts_page(
+        blog_manager, cursor, st.session_state.posts_per_page, author)
+    if next_cursor is not None:
+        st.session_state.author_page_cursors[st.session_state.author_page_num + 1] = next_cursor
+    
+    author_stats = cached.get_stats(blog_manager)['authors'].get(author.lower())
+    total_likes = author_stats['likes'] if author_stats else 0
+    st.markdown(f"""
+    <div class="welcome-banner">
+        <h1>👤 {author}</h1>
+        <p>📝 {total_posts} post(s) | ❤️ {total_likes} likes</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    if not total_posts:
+        st.markdown("""
+        <div class="empty-state">
+            <h3>📝 No Posts</h3>
+            <p>This author has no posts (any more)</p>
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        total_pages = (total_posts - 1) // st.session_state.posts_per_page + 1
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.session_state.author_page_num > 1:
+                if st.button("← Previous", type="secondary"):
+                    st.session_state.author_page_num -= 1
+                    st.rerun()
+        with col2:
+            st.markdown(f"<div style='text-align: center; padding: 10px;'><strong>Page {st.session_state.author_page_num} of {total_pages}</strong></div>", unsafe_allow_html=True)
+        with col3:
+            if next_cursor is not None:
+                if st.button("Next →", type="secondary"):
+                    st.session_state.author_page_num += 1
+                    st.rerun()
+        
+        show_post_cards(posts_to_show)
+    
+    if st.button("← Back to Home", type="secondary"):
+        navigate_to("home")
+
+@timed("app.show_create_page")
 def show_create_page():
     """Display the create post page"""
     st.markdown("""
@@ -511,8 +381,8 @@ def show_create_page():
         
         # Show word count
         if content:
-            word_count = len(content.split())
-            reading_time = max(1, round(word_count / 200))
+            word_count = count_words(content)
+            reading_time = reading_time_for_words(word_count)
             st.markdown(f"<small>📊 Words: {word_count} | ⏱️ Reading time: ~{reading_time} min</small>", unsafe_allow_html=True)
         
         submitted = st.form_submit_button("📝 Publish Post", type="primary")
@@ -524,13 +394,8 @@ def show_create_page():
                 st.error("Please enter content for your post.")
             else:
                 try:
-                    post_id = blog_manager.create_post(title.strip(), content.strip(), author.strip())
-                    st.success(f"🎉 Post '{title}' published successfully!")
-                    st.info("Redirecting to home page...")
-                    st.balloons()
-                    # Add a small delay before redirect
-                    import time
-                    time.sleep(1)
+                    blog_manager.create_post(title.strip(), content.strip(), author.strip())
+                    st.session_state.notice = f"🎉 Post '{title}' published successfully!"
                     navigate_to("home")
                 except Exception as e:
                     st.error(f"❌ Error creating post: {str(e)}")
@@ -541,6 +406,7 @@ def show_create_page():
     if st.button("← Back to Home", type="secondary"):
         navigate_to("home")
 
+@timed("app.show_edit_page")
 def show_edit_page():
     """Display the edit post page"""
     if not st.session_state.current_post_id:
@@ -549,13 +415,18 @@ def show_edit_page():
             navigate_to("home")
         return
     
-    post = blog_manager.get_post(st.session_state.current_post_id)
+    post = cached.get_post(blog_manager, st.session_state.current_post_id)
     if not post:
         st.error("Post not found.")
         if st.button("← Back to Home"):
             navigate_to("home")
         return
     
+    # Remember the version the edit started from, so saving can't silently
+    # overwrite changes made elsewhere in the meantime
+    if "edit_base_version" not in st.session_state:
+        st.session_state.edit_base_version = post.get('version', 1)
+    
     st.markdown(f"""
     <div class="main-header">
         <h1>✏️ Edit Post</h1>
@@ -570,10 +441,13 @@ def show_edit_page():
         author = st.text_input("👤 Author", value=post['author'])
         content = st.text_area("📄 Content", value=post['content'], height=300)
         
-        # Show word count
+        # Show word count, reusing the stored figures while the content is unchanged
         if content:
-            word_count = len(content.split())
-            reading_time = max(1, round(word_count / 200))
+            if content == post['content']:
+                word_count, reading_time = post['word_count'], post['reading_time']
+            else:
+                word_count = count_words(content)
+                reading_time = reading_time_for_words(word_count)
             st.markdown(f"<small>📊 Words: {word_count} | ⏱️ Reading time: ~{reading_time} min</small>", unsafe_allow_html=True)
         
         col1, col2 = st.columns(2)
@@ -589,12 +463,14 @@ def show_edit_page():
                 st.error("Please enter content for your post.")
             else:
                 try:
-                    blog_manager.update_post(st.session_state.current_post_id, title.strip(), content.strip(), author.strip())
-                    st.success("🎉 Post updated successfully!")
-                    st.info("Redirecting to home page...")
-                    import time
-                    time.sleep(1)
+                    blog_manager.update_post(st.session_state.current_post_id, title.strip(), content.strip(), author.strip(),
+                                             expected_version=st.session_state.edit_base_version)
+                    st.session_state.notice = "🎉 Post updated successfully!"
                     navigate_to("home")
+                except VersionConflict:
+                    st.session_state.edit_base_version = post.get('version', 1)
+                    st.warning("⚠️ This post was changed elsewhere while you were editing it. "
+                               "Your text is still in the form; press Update again to overwrite the newer version.")
                 except Exception as e:
                     st.error(f"❌ Error updating post: {str(e)}")
         
@@ -603,6 +479,7 @@ def show_edit_page():
     
     st.markdown('</div>', unsafe_allow_html=True)
 
+@timed("app.show_manage_page")
 def show_manage_page():
     """Display the manage posts page"""
     st.markdown("""
@@ -612,7 +489,7 @@ def show_manage_page():
     </div>
     """, unsafe_allow_html=True)
     
-    posts = blog_manager.get_all_posts()
+    posts = cached.get_post_summaries(blog_manager)
     
     if not posts:
         st.markdown("""
@@ -629,20 +506,8 @@ def show_manage_page():
     
     # Display posts in enhanced format
     for post in posts:
-        from utils import count_reading_time
-        reading_time = count_reading_time(post['content'])
-        likes_count = post.get('likes', 0)
-        
-        st.markdown(f"""
-        <div class="manage-post-item">
-            <div class="post-title">{post['title']}</div>
-            <div class="post-meta">
-                👤 {post['author']} | 📅 {format_date(post['created_at'])} | ⏱️ {reading_time} min read | ❤️ {likes_count} likes
-            </div>
-            {f'<div class="post-meta">📝 Updated: {format_date(post["updated_at"])}</div>' if post['updated_at'] else ''}
-            <div class="post-content">{truncate_content(post['content'], 100)}</div>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(fragments.get_or_render(post_fragment_key(post, "manage"), lambda: render_manage_item(post)),
+                    unsafe_allow_html=True)
         
         col1, col2, col3 = st.columns([1, 1, 3])
         
@@ -668,6 +533,7 @@ def show_manage_page():
     if st.button("← Back to Home", type="secondary"):
         navigate_to("home")
 
+@timed("app.show_view_page")
 def show_view_page():
     """Display individual post page"""
     if not st.session_state.current_post_id:
@@ -676,7 +542,7 @@ def show_view_page():
             navigate_to("home")
         return
     
-    post = blog_manager.get_post(st.session_state.current_post_id)
+    post = cached.get_post(blog_manager, st.session_state.current_post_id)
     if not post:
         st.error("❌ Post not found.")
         if st.button("← Back to Home", type="secondary"):
@@ -684,28 +550,12 @@ def show_view_page():
         return
     
     # Enhanced post display
-    from utils import count_reading_time
-    reading_time = count_reading_time(post['content'])
     likes_count = post.get('likes', 0)
-    
-    st.markdown(f"""
-    <div class="post-container" style="margin-bottom: 2rem;">
-        <div class="post-title" style="font-size: 2rem; margin-bottom: 1rem;">{post['title']}</div>
-        <div class="post-meta" style="margin-bottom: 2rem;">
-            👤 <strong>{post['author']}</strong> | 
-            📅 {format_date(post['created_at'])} | 
-            ⏱️ {reading_time} min read | 
-            ❤️ {likes_count} likes
-        </div>
-        {f'<div class="post-meta" style="margin-bottom: 2rem;">📝 <em>Last Updated: {format_date(post["updated_at"])}</em></div>' if post['updated_at'] else ''}
-        <div class="post-content" style="font-size: 1.1rem; line-height: 1.8;">
-            {post['content'].replace(chr(10), '<br>')}
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(fragments.get_or_render(post_fragment_key(post, "view"), lambda: render_post_view(post)),
+                unsafe_allow_html=True)
     
     # Navigation and interaction buttons
-    col1, col2, col3 = st.columns([1, 1, 1])
+    col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
     with col1:
         if st.button("← Back to Home", type="secondary"):
             navigate_to("home")
@@ -723,6 +573,41 @@ def show_view_page():
     with col3:
         if st.button("✏️ Edit Post", type="primary"):
             navigate_to("edit", post['id'])
+    with col4:
+        if st.button(f"👤 More by {post['author']}", type="secondary"):
+            select_author(post['author'])
+            st.rerun()
+    
+    # History is only read once asked for
+    if st.toggle("🕘 Revision history", key=f"history_{post['id']}"):
+        show_revision_history(post)
+
+def show_revision_history(post):
+    """List a post's earlier versions, showing the selected one with an option to restore it"""
+    revisions = blog_manager.get_post_revisions(post['id'])
+    if not revisions:
+        st.info("This post hasn't been edited yet.")
+        return
+    
+    revisions.reverse()
+    selected = st.selectbox(
+        f"🕘 {len(revisions)} earlier version(s)", revisions,
+        format_func=lambda revision: f"#{revision['revision']} · {revision['title']} · {format_date(revision['edited_at'])}")
+    revision = blog_manager.get_post_revision(post['id'], selected['revision'])
+    st.markdown(f"<small>👤 {revision['author']} | 📝 Written {format_date(revision['edited_at'])} | "
+                f"🔁 Replaced {format_date(revision['saved_at'])}</small>", unsafe_allow_html=True)
+    st.text_area("📄 Content", value=revision['content'], height=300, disabled=True,
+                 key=f"revision_{post['id']}_{revision['revision']}")
+    
+    if st.button("↩️ Restore this version", type="primary"):
+        try:
+            blog_manager.restore_post_revision(post['id'], revision['revision'], expected_version=post.get('version', 1))
+            st.session_state.notice = f"↩️ Restored version #{revision['revision']}"
+            st.rerun()
+        except VersionConflict:
+            st.warning("⚠️ This post was changed elsewhere in the meantime; check the latest version and try again.")
+        except Exception as e:
+            st.error(f"❌ Error restoring version: {str(e)}")
 
 if __name__ == "__main__":
     main()
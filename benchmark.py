@@ -0,0 +1,445 @@
+"""Benchmarks for BlogManager and utils on a synthetic corpus
+
+Usage:
+    python benchmark.py [--posts 1000] [--storage-mode json] [--output results.json]
+    python benchmark.py --posts 100000 --compare baseline.json
+    python benchmark.py --metrics jsonl:metrics.jsonl
+    python benchmark.py --posts 10000 --compression-report
+    python benchmark.py --posts 100000 --memory
+
+The corpus is generated deterministically from --seed, so runs with the same
+options are comparable across commits, and is streamed straight into
+storage, so the harness never holds it in memory. Results are printed (or
+written to --output) as JSON; --compare reports operations whose throughput
+dropped by more than --threshold against an earlier result file and exits
+with status 1. --memory repeats the run in a subprocess with tracemalloc on
+and adds each operation's memory use to its results; the timings always
+come from the untraced run. --compression-report compares the json storage
+with compressed storage instead: file size, write and load time, and
+full-post reads.
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import metrics
+from blog_manager import BlogManager
+from storage import CODECS, STORAGE_BACKENDS, create_storage
+from utils import MAX_CONTENT_LENGTH, count_reading_time, derive_post_fields, truncate_content
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SYLLABLES = ("ka", "lo", "mi", "ren", "to", "shi", "va", "dor", "pel", "qua",
+             "zen", "bri", "stu", "fo", "gla", "nix", "tor", "ba", "el", "um")
+FIRST_NAMES = ("Ada", "Linus", "Grace", "Guido", "Barbara", "Ken", "Margaret", "Dennis",
+               "Frances", "Alan", "Radia", "Edsger", "Sophie", "Donald", "Katherine", "Niklaus")
+LAST_NAMES = ("Lovelace", "Torvalds", "Hopper", "Rossum", "Liskov", "Thompson", "Hamilton",
+              "Ritchie", "Allen", "Turing", "Perlman", "Dijkstra", "Wilson", "Knuth", "Johnson", "Wirth")
+VOCABULARY_SIZE = 5000
+WORDS_PER_PARAGRAPH = 60
+
+def _vocabulary(rng, size):
+    """Distinct pseudo-words, most common first"""
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    return words
+
+def _zipf_weights(size):
+    """Cumulative weights giving rank r a probability proportional to 1/r"""
+    total = 0.0
+    weights = []
+    for rank in range(1, size + 1):
+        total += 1.0 / rank
+        weights.append(total)
+    return weights
+
+def _author_names(count):
+    """count distinct author names"""
+    names = [f"{first} {last}" for last in LAST_NAMES for first in FIRST_NAMES]
+    names += [f"{name} {number}" for number in range(2, count // len(names) + 2) for name in names]
+    return names[:count]
+
+def _text(rng, vocabulary, weights, length):
+    """Paragraphs of Zipf-distributed words, cut at a word boundary near length"""
+    words = rng.choices(vocabulary, cum_weights=weights, k=max(1, length // 5))
+    paragraphs = [" ".join(words[start:start + WORDS_PER_PARAGRAPH])
+                  for start in range(0, len(words), WORDS_PER_PARAGRAPH)]
+    text = "\n\n".join(paragraphs)
+    if len(text) > length:
+        cut = text.rfind(" ", 0, length)
+        text = text[:cut if cut > 0 else length]
+    return text
+
+def generate_corpus(count, seed=0, authors=50, median_length=1500, max_length=MAX_CONTENT_LENGTH):
+    """Yield count synthetic posts, identical for the same arguments
+    
+    Content lengths follow a log-normal distribution around median_length,
+    clipped to max_length (the validation limit by default), and both words
+    and authors are Zipf distributed, so a few authors write most posts.
+    Posts come with their derived fields, oldest first.
+    """
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(rng, VOCABULARY_SIZE)
+    word_weights = _zipf_weights(len(vocabulary))
+    author_names = _author_names(authors)
+    author_weights = _zipf_weights(len(author_names))
+    created_at = datetime(2020, 1, 1)
+    
+    for number in range(count):
+        created_at += timedelta(seconds=rng.randint(60, 6 * 3600))
+        length = min(max_length, max(20, int(rng.lognormvariate(math.log(median_length), 1.0))))
+        post = {
+            "id": corpus_post_id(seed, number),
+            "title": _text(rng, vocabulary, word_weights, rng.randint(20, 80)).replace("\n\n", " ").title(),
+            "content": _text(rng, vocabulary, word_weights, length),
+            "author": rng.choices(author_names, cum_weights=author_weights)[0],
+            "created_at": created_at.isoformat(),
+            "updated_at": None,
+            "likes": 0,
+            "version": 1,
+        }
+        post.update(derive_post_fields(post))
+        yield post
+
+def corpus_post_id(seed, number):
+    """ID of the post generate_corpus yields as number (counting from 0) for a seed"""
+    return f"bench-{seed}-{number:07d}"
+
+class CorpusStream:
+    """Iterable over a generated corpus that notes what the benchmarks need from it on the way
+    
+    Only running totals and a fixed-size sample are kept, so the corpus can
+    be written straight into storage without the harness holding on to it.
+    seconds is the time spent generating posts, content_bytes their total
+    UTF-8 content size and samples the content of up to sample_size posts
+    picked uniformly with rng (reservoir sampling).
+    """
+    
+    def __init__(self, corpus, rng, sample_size=0):
+        self.corpus = corpus
+        self.rng = rng
+        self.sample_size = sample_size
+        self.seconds = 0.0
+        self.content_bytes = 0
+        self.samples = []
+    
+    def __iter__(self):
+        posts = iter(self.corpus)
+        for number in range(sys.maxsize):
+            start = time.perf_counter()
+            post = next(posts, None)
+            self.seconds += time.perf_counter() - start
+            if post is None:
+                return
+            self.content_bytes += len(post["content"].encode("utf-8"))
+            if number < self.sample_size:
+                self.samples.append(post["content"])
+            elif self.sample_size:
+                slot = self.rng.randrange(number + 1)
+                if slot < self.sample_size:
+                    self.samples[slot] = post["content"]
+            yield post
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far, or None where unavailable
+    
+    A whole-process high-water mark, so it can't tell one operation's memory
+    from another's; see measure's trace_memory for that.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def measure(operation, arguments, trace_memory=False):
+    """Call operation once per argument tuple and summarize the latencies
+    
+    With trace_memory (tracemalloc must be tracing), also reports
+    peak_alloc_bytes, the most memory any one call had allocated at once
+    beyond what was allocated when it started, and retained_bytes, what the
+    calls left allocated in total. Tracing slows every allocation down, so
+    latencies measured this way aren't comparable with untraced ones.
+    """
+    latencies = []
+    peak_alloc = 0
+    retained = 0
+    for args in arguments:
+        if trace_memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        operation(*args)
+        latencies.append(time.perf_counter() - start)
+        if trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            peak_alloc = max(peak_alloc, peak - before)
+            retained += current - before
+    latencies.sort()
+    total = sum(latencies)
+    result = {
+        "ops": len(latencies),
+        "ops_per_sec": len(latencies) / total if total else None,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": total / len(latencies) * 1000,
+    }
+    if trace_memory:
+        result["peak_alloc_bytes"] = peak_alloc
+        result["retained_bytes"] = retained
+    return result
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(posts=1000, storage_mode="json", seed=0, authors=50, median_length=1500,
+                   max_length=MAX_CONTENT_LENGTH, ops=200, scan_ops=10, buffer_likes=False, write_behind=False,
+                   trace_memory=False):
+    """Seed a temporary store with a synthetic corpus and time the main operations
+    
+    ops calls are made for cheap per-post operations and scan_ops for the
+    ones that touch every post (get_all_posts, get_post_summaries, search_posts). flush times
+    writing out whatever create_post left staged with write_behind. With
+    trace_memory the operations run under tracemalloc and their results
+    include memory use (see measure). Returns the JSON-serializable report.
+    """
+    rng = random.Random(seed + 1)
+    results = {}
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_file = Path(temp_dir) / "blog_posts.json"
+        corpus = CorpusStream(generate_corpus(posts, seed, authors, median_length, max_length), rng, ops)
+        start = time.perf_counter()
+        create_storage(storage_mode, data_file).save_posts(corpus)
+        seed_seconds = time.perf_counter() - start - corpus.seconds
+        
+        def post_ids(count):
+            return [(corpus_post_id(seed, rng.randrange(posts)),) for _ in range(count)]
+        samples = corpus.samples
+        queries = [word for word in _vocabulary(random.Random(seed), VOCABULARY_SIZE)[10:200] if len(word) >= 4]
+        
+        def timed(operation, arguments):
+            return measure(operation, arguments, trace_memory)
+        
+        if trace_memory:
+            tracemalloc.start()
+        try:
+            managers = []
+            results["open"] = timed(lambda: managers.append(BlogManager(str(data_file), storage_mode=storage_mode,
+                                                                        buffer_likes=buffer_likes,
+                                                                        write_behind=write_behind)), [()])
+            manager = managers[0]
+            # The search index loads or builds in the background; let it finish before timing anything else
+            results["search_index_build"] = timed(manager.search_index.wait, [()])
+            results["get_all_posts"] = timed(manager.get_all_posts, [()] * scan_ops)
+            results["get_post_summaries"] = timed(manager.get_post_summaries, [()] * scan_ops)
+            results["get_post"] = timed(manager.get_post, post_ids(ops))
+            results["like_post"] = timed(manager.like_post, post_ids(ops))
+            manager.flush_likes()
+            results["search_index_sync"] = timed(manager.search_index.sync, [()])
+            results["search_posts"] = timed(manager.search_posts, [(rng.choice(queries),) for _ in range(scan_ops)])
+            results["create_post"] = timed(manager.create_post,
+                                           [(f"Benchmark post {number}", text, "Benchmark")
+                                            for number, text in enumerate(samples[:ops])])
+            results["flush"] = timed(manager.flush, [()])
+            results["count_reading_time"] = timed(count_reading_time, [(text,) for text in samples])
+            results["truncate_content"] = timed(truncate_content, [(text, 200) for text in samples])
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+    
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "posts": posts,
+                "storage_mode": storage_mode,
+                "seed": seed,
+                "authors": authors,
+                "median_length": median_length,
+                "max_length": max_length,
+                "ops": ops,
+                "scan_ops": scan_ops,
+                "buffer_likes": buffer_likes,
+                "write_behind": write_behind,
+                "trace_memory": trace_memory,
+            },
+            "content_bytes": corpus.content_bytes,
+            "generate_seconds": corpus.seconds,
+            "seed_seconds": seed_seconds,
+            "peak_rss_bytes": peak_rss_bytes(),
+        },
+        "results": results,
+    }
+
+def run_compression_report(posts=1000, seed=0, authors=50, median_length=1500,
+                           max_length=MAX_CONTENT_LENGTH, reads=200):
+    """Write the same corpus with json storage and compressed storage with each codec, and compare them
+    
+    For each, records the file size, the time to write it and to load it
+    with nothing cached, and the latency of full-post reads (decompressed
+    on first read, then served from the body cache); the savings are
+    relative to json storage.
+    """
+    rng = random.Random(seed + 1)
+    post_ids = [corpus_post_id(seed, number) for number in rng.sample(range(posts), min(reads, posts))]
+    results = {}
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for mode, options in [("json", {})] + [("compressed", {"codec": codec}) for codec in sorted(CODECS)]:
+            name = "-".join([mode, *options.values()])
+            storage = create_storage(mode, Path(temp_dir) / f"{name}.json", **options)
+            # Generated afresh for each storage rather than kept, and not counted as writing
+            corpus = CorpusStream(generate_corpus(posts, seed, authors, median_length, max_length), rng)
+            start = time.perf_counter()
+            storage.save_posts(corpus)
+            write_seconds = time.perf_counter() - start - corpus.seconds
+            # Drop the posts save_posts cached, so the load below parses the file
+            storage._invalidate_cache()
+            start = time.perf_counter()
+            storage.load_post_summaries()
+            load_seconds = time.perf_counter() - start
+            results[name] = {
+                "file_bytes": storage.data_file.stat().st_size,
+                "write_seconds": write_seconds,
+                "load_seconds": load_seconds,
+                "get_post": measure(storage.get_post, [(post_id,) for post_id in post_ids]),
+                "get_post_cached": measure(storage.get_post, [(post_id,) for post_id in post_ids[-32:]]),
+            }
+            # So only one storage's posts are held at a time
+            storage._invalidate_cache()
+    
+    baseline = results["json"]
+    for result in results.values():
+        result["file_bytes_saved"] = 1 - result["file_bytes"] / baseline["file_bytes"]
+        result["load_seconds_saved"] = 1 - result["load_seconds"] / baseline["load_seconds"]
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {"posts": posts, "seed": seed, "authors": authors, "median_length": median_length,
+                       "max_length": max_length, "reads": reads},
+        },
+        "results": results,
+    }
+
+def compare(current, baseline, threshold=0.2):
+    """List operations whose ops/sec fell more than threshold below the baseline"""
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before or not before.get("ops_per_sec") or not result.get("ops_per_sec"):
+            continue
+        change = result["ops_per_sec"] / before["ops_per_sec"] - 1
+        if change < -threshold:
+            regressions.append({"operation": name, "baseline_ops_per_sec": before["ops_per_sec"],
+                                "ops_per_sec": result["ops_per_sec"], "change": change})
+    return regressions
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark BlogManager and utils on a synthetic corpus")
+    parser.add_argument("--posts", type=int, default=1000, help="Corpus size (100 to 1,000,000)")
+    parser.add_argument("--storage-mode", choices=sorted(STORAGE_BACKENDS), default="json")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--authors", type=int, default=50, help="Number of distinct authors")
+    parser.add_argument("--median-length", type=int, default=1500, help="Median content length in characters")
+    parser.add_argument("--max-length", type=int, default=MAX_CONTENT_LENGTH, help="Longest content length")
+    parser.add_argument("--ops", type=int, default=200, help="Calls per per-post operation")
+    parser.add_argument("--scan-ops", type=int, default=10, help="Calls per full-scan operation")
+    parser.add_argument("--buffer-likes", action="store_true", help="Buffer likes like the app does")
+    parser.add_argument("--write-behind", action="store_true", help="Write behind like the app does")
+    parser.add_argument("--memory", action="store_true",
+                        help="Also measure each operation's memory in a traced subprocess run")
+    parser.add_argument("--trace-memory", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--compression-report", action="store_true",
+                        help="Compare json and compressed storage instead (uses --ops as the number of reads)")
+    parser.add_argument("--metrics", metavar="SPEC",
+                        help="Record metrics during the run with these sinks, e.g. jsonl:metrics.jsonl")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", metavar="BASELINE", help="Earlier JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative ops/sec drop that counts as a regression")
+    return parser
+
+def measure_memory(args):
+    """Repeat the benchmark run in a subprocess with tracemalloc on
+    
+    Kept out of the timed run because tracing slows every allocation down,
+    and out of this process so its heap doesn't count towards the results.
+    Returns the traced run's per-operation results.
+    """
+    command = [sys.executable, str(Path(__file__).resolve()), "--trace-memory",
+               "--posts", str(args.posts), "--storage-mode", args.storage_mode, "--seed", str(args.seed),
+               "--authors", str(args.authors), "--median-length", str(args.median_length),
+               "--max-length", str(args.max_length), "--ops", str(args.ops), "--scan-ops", str(args.scan_ops)]
+    if args.buffer_likes:
+        command.append("--buffer-likes")
+    if args.write_behind:
+        command.append("--write-behind")
+    result = subprocess.run(command, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)["results"]
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    metrics.configure(args.metrics)
+    if args.compression_report:
+        report = run_compression_report(args.posts, args.seed, args.authors, args.median_length,
+                                        args.max_length, args.ops)
+    else:
+        report = run_benchmarks(args.posts, args.storage_mode, args.seed, args.authors, args.median_length,
+                                args.max_length, args.ops, args.scan_ops, args.buffer_likes, args.write_behind,
+                                args.trace_memory)
+        if args.memory:
+            for name, traced in measure_memory(args).items():
+                for key in ("peak_alloc_bytes", "retained_bytes"):
+                    report["results"][name][key] = traced[key]
+    if metrics.registry.enabled:
+        report["metrics"] = metrics.registry.snapshot()
+    
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            report["regressions"] = compare(report, json.load(f), args.threshold)
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    
+    for regression in report.get("regressions", []):
+        print(f"Regression: {regression['operation']} {regression['change']:.0%} "
+              f"({regression['baseline_ops_per_sec']:.1f} -> {regression['ops_per_sec']:.1f} ops/sec)",
+              file=sys.stderr)
+    return 1 if report.get("regressions") else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
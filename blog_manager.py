@@ -1,40 +1,191 @@
-import json
-import os
 from datetime import datetime
-from pathlib import Path
+import threading
 import uuid
 
+from like_counter import get_like_counter
+from metrics import timed
+from post import Post
+from revisions import get_revision_store
+from search_index import get_search_index
+from storage import create_storage
+from utils import derive_post_fields, search_posts, validate_post_data
+from write_queue import get_write_queue
+
+# Stores whose posts have already been checked for missing derived fields
+_backfilled_stores = set()
+_backfilled_stores_lock = threading.Lock()
+
+# One data version per underlying store, shared by every BlogManager in the process
+_data_versions = {}
+_data_versions_lock = threading.Lock()
+
+class DataVersion:
+    """Counter that increases whenever the posts of one store may have changed
+    
+    Writes through a BlogManager bump it directly (buffered likes never reach
+    storage, so storage alone can't tell); writes by other processes are
+    noticed when the storage change token moves.
+    """
+    
+    def __init__(self):
+        self.value = 0
+        self._token = None
+        self._lock = threading.Lock()
+    
+    def bump(self):
+        with self._lock:
+            self.value += 1
+    
+    def check(self, token):
+        """Return the current version, bumping it first if token differs from the last one seen"""
+        with self._lock:
+            # Without a change token there is no way to tell, so every call is a new version
+            if token is None or token != self._token:
+                self._token = token
+                self.value += 1
+            return self.value
+
+def _copy_post(post):
+    """Plain dict copy of a post as returned by storage"""
+    return post.to_dict() if type(post) is Post else dict(post)
+
+def _get_data_version(storage):
+    with _data_versions_lock:
+        version = _data_versions.get(storage.storage_key)
+        if version is None:
+            version = _data_versions[storage.storage_key] = DataVersion()
+        return version
+
 class BlogManager:
-    def __init__(self, data_file="data/blog_posts.json"):
-        self.data_file = Path(data_file)
-        self.data_file.parent.mkdir(exist_ok=True)
-        self._ensure_data_file_exists()
+    def __init__(self, data_file="data/blog_posts.json", storage_mode="json", storage=None,
+                 buffer_likes=False, like_flush_interval=2.0, like_flush_threshold=100,
+                 write_behind=False, write_flush_interval=0.5, **storage_options):
+        """Create a manager backed by the given storage
+        
+        storage_mode picks a backend from storage.STORAGE_BACKENDS ("json",
+        "journal" or "sqlite"); pass storage to use an already built backend.
+        With buffer_likes, likes go through a process-wide LikeCounter and are
+        written in batches instead of one write per click. With write_behind,
+        mutations of backends that support it (json and journal) update the
+        shared in-memory posts at once and are written by a background
+        thread shortly after; call flush() where they must be on disk.
+        """
+        self.storage = storage or create_storage(storage_mode, data_file, **storage_options)
+        self.search_index = get_search_index(self.storage)
+        self.revisions = get_revision_store(self.storage)
+        self._data_version = _get_data_version(self.storage)
+        self.like_counter = None
+        if buffer_likes:
+            # Data versions are shared per store like the counter, so any manager's one will do
+            self.like_counter = get_like_counter(self.storage, like_flush_interval, like_flush_threshold,
+                                                 on_flush=self._data_version.bump)
+        self.write_queue = None
+        if write_behind and self.storage.WRITE_BEHIND:
+            self.write_queue = get_write_queue(self.storage, write_flush_interval)
+        
+        with _backfilled_stores_lock:
+            needs_backfill = self.storage.storage_key not in _backfilled_stores
+            _backfilled_stores.add(self.storage.storage_key)
+        if needs_backfill:
+            self.backfill_derived_fields()
     
-    def _ensure_data_file_exists(self):
-        """Ensure the data file exists and is properly formatted"""
-        if not self.data_file.exists():
-            self._save_posts([])
+    def data_version(self):
+        """Number that increases whenever what this manager returns may have changed
+        
+        Results read at the same data version are identical, so they can be
+        cached under it with no expiry: any write, including a buffered like
+        or a write by another process, moves the version on.
+        """
+        return self._data_version.check(self.storage.change_token())
     
+    @timed("BlogManager._load_posts")
     def _load_posts(self):
-        """Load posts from JSON file"""
-        try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
+        """Load all posts from storage"""
+        return self.storage.load_posts()
     
+    @timed("BlogManager._save_posts")
     def _save_posts(self, posts):
-        """Save posts to JSON file"""
-        try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(posts, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            raise Exception(f"Error saving posts: {str(e)}")
+        """Replace all posts in storage"""
+        self.storage.save_posts(posts)
     
+    @timed("BlogManager.backfill_derived_fields")
+    def backfill_derived_fields(self):
+        """Store derived display fields on posts written before they existed
+        
+        Returns the number of posts that were updated.
+        """
+        missing = [post["id"] for post in self.storage.iter_post_summaries() if post.get("word_count") is None]
+        if not missing:
+            return 0
+        updates = {post["id"]: derive_post_fields(post) for post in self.storage.get_posts(missing)}
+        if updates:
+            self.storage.update_posts(updates)
+            self._data_version.bump()
+        return len(updates)
+    
+    @timed("BlogManager.compact")
+    def compact(self):
+        """Compact the underlying storage"""
+        self.flush_likes()
+        self.storage.compact()
+    
+    @timed("BlogManager.flush_likes")
+    def flush_likes(self):
+        """Write any buffered likes to storage"""
+        if self.like_counter is not None:
+            self.like_counter.flush()
+    
+    @timed("BlogManager.flush")
+    def flush(self):
+        """Write buffered likes and staged mutations; every earlier change is on disk once this returns"""
+        self.flush_likes()
+        self.storage.flush_writes()
+    
+    def _with_pending_likes(self, post):
+        """Return a copy of the post with buffered likes added
+        
+        Always a copy: file storages return the posts they cache for the whole
+        process, which a caller changing its result must not touch.
+        """
+        if post is None:
+            return None
+        post = _copy_post(post)
+        if self.like_counter is not None:
+            delta = self.like_counter.pending_delta(post["id"])
+            if delta:
+                post["likes"] = max(0, post.get("likes", 0) + delta)
+        return post
+    
+    def _with_pending_likes_all(self, posts):
+        """Copy a list of posts with buffered likes added (see _with_pending_likes)"""
+        deltas = self.like_counter.pending_deltas() if self.like_counter is not None else {}
+        posts = list(map(_copy_post, posts))
+        if deltas:
+            for post in posts:
+                delta = deltas.get(post["id"])
+                if delta:
+                    post["likes"] = max(0, post.get("likes", 0) + delta)
+        return posts
+    
+    def _change_likes(self, post_id, delta):
+        """Like or unlike a post, returning its new like count"""
+        if self.like_counter is None:
+            likes = self.storage.adjust_likes(post_id, delta)
+            if likes is None:
+                raise Exception("Post not found")
+            self._data_version.bump()
+            return likes
+        
+        post = self.storage.get_post(post_id)
+        if post is None:
+            raise Exception("Post not found")
+        self.like_counter.add(post_id, delta)
+        self._data_version.bump()
+        return self._with_pending_likes(post).get("likes", 0)
+    
+    @timed("BlogManager.create_post")
     def create_post(self, title, content, author="Anonymous"):
         """Create a new blog post"""
-        posts = self._load_posts()
-        
         new_post = {
             "id": str(uuid.uuid4()),
             "title": title,
@@ -42,90 +193,252 @@ class BlogManager:
             "author": author,
             "created_at": datetime.now().isoformat(),
             "updated_at": None,
-            "likes": 0
+            "likes": 0,
+            "version": 1
         }
+        new_post.update(derive_post_fields(new_post))
         
-        posts.append(new_post)
-        self._save_posts(posts)
+        self.storage.insert_post(new_post)
+        self._data_version.bump()
+        self.search_index.add_post(new_post)
         return new_post["id"]
     
+    @timed("BlogManager.import_posts")
+    def import_posts(self, records):
+        """Validate posts and store the valid ones in a single write
+        
+        records is an iterable of (source, record) pairs as produced by the
+        bulk module's readers, consumed one at a time. Records may carry an
+        id, created_at, updated_at and likes to keep; missing ones get the
+        same defaults as create_post. Returns (imported count, rejected),
+        where rejected lists (source, errors) for records that failed
+        validation or reused an existing post ID.
+        """
+        post_ids = set(self.storage.get_post_stamps())
+        rejected = []
+        
+        def valid_posts():
+            for source, record in records:
+                if isinstance(record, Exception):
+                    rejected.append((source, [str(record)]))
+                    continue
+                title, content, author = (record.get(field) if isinstance(record.get(field), str) else None
+                                          for field in ("title", "content", "author"))
+                errors = validate_post_data(title, content, author)
+                post_id = str(record.get("id") or uuid.uuid4())
+                if post_id in post_ids:
+                    errors.append("A post with this ID already exists")
+                created_at = record.get("created_at") or datetime.now().isoformat()
+                updated_at = record.get("updated_at")
+                for timestamp in (created_at, updated_at):
+                    try:
+                        if timestamp is not None:
+                            datetime.fromisoformat(timestamp)
+                    except (TypeError, ValueError):
+                        errors.append(f"Invalid date: {timestamp}")
+                if errors:
+                    rejected.append((source, errors))
+                    continue
+                
+                post_ids.add(post_id)
+                likes = record.get("likes")
+                post = {
+                    "id": post_id,
+                    "title": title.strip(),
+                    "content": content.strip(),
+                    "author": author.strip(),
+                    "created_at": created_at,
+                    "updated_at": updated_at,
+                    "likes": likes if isinstance(likes, int) and likes > 0 else 0,
+                    "version": 1
+                }
+                post.update(derive_post_fields(post))
+                yield post
+        
+        imported = self.storage.insert_posts(valid_posts())
+        if imported:
+            self._data_version.bump()
+        return imported, rejected
+    
+    def export_posts(self):
+        """Yield every full post in storage order, reading as few at a time as the backend allows"""
+        self.flush_likes()
+        yield from map(_copy_post, self.storage.iter_posts())
+    
+    @timed("BlogManager.get_all_posts")
     def get_all_posts(self):
-        """Get all posts sorted by creation date (newest first)"""
-        posts = self._load_posts()
-        return sorted(posts, key=lambda x: x['created_at'], reverse=True)
+        """Get all posts, with their content, sorted by creation date (newest first)"""
+        posts = sorted(self.storage.load_posts(), key=lambda x: (x['created_at'], x['id']), reverse=True)
+        return self._with_pending_likes_all(posts)
+    
+    @timed("BlogManager.get_post_summaries")
+    def get_post_summaries(self):
+        """Like get_all_posts, but posts may come without their content
+        
+        For listings that only show titles and previews: backends that store
+        bodies separately (split, compressed, sqlite) then never read them.
+        """
+        return self._with_pending_likes_all(self.storage.list_posts())
+    
+    @timed("BlogManager.get_posts_page")
+    def get_posts_page(self, cursor=None, limit=5, author=None):
+        """Get one page of posts (newest first) without loading or sorting the rest
+        
+        Returns (posts, next_cursor, total_posts); pass next_cursor back to get
+        the following page; it is None on the last page. With author, only
+        that author's posts are paged through (and counted), using the
+        storage's author index.
+        """
+        posts, next_cursor = self.storage.get_posts_page(cursor, limit, author)
+        return self._with_pending_likes_all(posts), next_cursor, self.storage.count_posts(author)
     
+    @timed("BlogManager.get_post")
     def get_post(self, post_id):
         """Get a specific post by ID"""
-        posts = self._load_posts()
-        for post in posts:
-            if post["id"] == post_id:
-                return post
-        return None
-    
-    def update_post(self, post_id, title, content, author):
-        """Update an existing post"""
-        posts = self._load_posts()
-        
-        for i, post in enumerate(posts):
-            if post["id"] == post_id:
-                posts[i].update({
-                    "title": title,
-                    "content": content,
-                    "author": author,
-                    "updated_at": datetime.now().isoformat()
-                })
-                self._save_posts(posts)
-                return True
-        
-        raise Exception("Post not found")
+        return self._with_pending_likes(self.storage.get_post(post_id))
+    
+    @timed("BlogManager.update_post")
+    def update_post(self, post_id, title, content, author, expected_version=None):
+        """Update an existing post
+        
+        Pass the version the post had when the edit started as expected_version
+        to get storage.VersionConflict instead of overwriting someone else's
+        changes made in the meantime. The replaced state is kept as a revision
+        (see get_post_revisions) whenever the title, content or author change.
+        """
+        post = self.storage.get_post(post_id)
+        if post is None:
+            raise Exception("Post not found")
+        # File storages update the very post object they returned
+        previous = dict(post)
+        
+        fields = {
+            "title": title,
+            "content": content,
+            "author": author,
+            "updated_at": datetime.now().isoformat()
+        }
+        fields.update(derive_post_fields(dict(post, **fields)))
+        updated = self.storage.update_post(post_id, fields, expected_version)
+        if updated is None:
+            raise Exception("Post not found")
+        self._data_version.bump()
+        self.search_index.add_post(updated, previous)
+        if (title, content, author) != (previous["title"], previous["content"], previous["author"]):
+            self.revisions.record(previous)
+        return True
+    
+    @timed("BlogManager.get_post_revisions")
+    def get_post_revisions(self, post_id):
+        """Earlier versions of a post, oldest first, without their content
+        
+        Each is a dict with revision, title, author, version, edited_at (when
+        that version was written) and saved_at (when it was replaced).
+        """
+        return self.revisions.list_revisions(post_id)
+    
+    @timed("BlogManager.get_post_revision")
+    def get_post_revision(self, post_id, revision):
+        """One earlier version of a post with its content, or None if there is no such revision"""
+        return self.revisions.get_revision(post_id, revision)
     
+    @timed("BlogManager.restore_post_revision")
+    def restore_post_revision(self, post_id, revision, expected_version=None):
+        """Make an earlier version of a post current again; the version it replaces becomes a revision too"""
+        old = self.revisions.get_revision(post_id, revision)
+        if old is None:
+            raise Exception("Revision not found")
+        return self.update_post(post_id, old["title"], old["content"], old["author"], expected_version)
+    
+    @timed("BlogManager.delete_post")
     def delete_post(self, post_id):
         """Delete a post by ID"""
-        posts = self._load_posts()
-        
-        for i, post in enumerate(posts):
-            if post["id"] == post_id:
-                posts.pop(i)
-                self._save_posts(posts)
-                return True
+        # Lets the search index drop just the deleted post's own postings
+        post = self.storage.get_post(post_id)
+        if not self.storage.delete_post(post_id):
+            raise Exception("Post not found")
+        self._data_version.bump()
+        self.search_index.remove_post(post_id, post)
+        return True
+    
+    @timed("BlogManager.search_posts")
+    def search_posts(self, query):
+        """Search posts by title, content, or author (newest first)
         
-        raise Exception("Post not found")
+        The search index narrows the query down to candidate posts, so only
+        those are read and checked; short queries fall back to a full scan.
+        """
+        candidates = self.search_index.candidates(query) if query else None
+        if candidates is None:
+            posts = sorted(self.storage.load_posts(), key=lambda x: x['created_at'], reverse=True)
+            return self._with_pending_likes_all(search_posts(posts, query))
+        if not candidates:
+            return []
+        posts = self.storage.get_posts(candidates)
+        posts.sort(key=lambda x: x['created_at'], reverse=True)
+        return self._with_pending_likes_all(search_posts(posts, query))
     
+    @timed("BlogManager.search_posts_ranked")
+    def search_posts_ranked(self, query, page=1, per_page=5):
+        """Search posts ranked by relevance, returning (posts on the page, total matches)"""
+        offset = (page - 1) * per_page
+        total, post_ids = self.search_index.ranked(query, per_page, offset)
+        if not post_ids:
+            return [], total
+        posts = {post["id"]: post for post in self._with_pending_likes_all(self.storage.get_posts(post_ids))}
+        return [posts[post_id] for post_id in post_ids if post_id in posts], total
+    
+    @timed("BlogManager.get_posts_by_author")
     def get_posts_by_author(self, author):
-        """Get all posts by a specific author"""
-        posts = self._load_posts()
-        return [post for post in posts if post["author"].lower() == author.lower()]
+        """Get all posts by a specific author (case-insensitive), oldest first"""
+        return self._with_pending_likes_all(self.storage.get_posts_by_author(author))
     
+    @timed("BlogManager.get_post_count")
     def get_post_count(self):
         """Get total number of posts"""
-        return len(self._load_posts())
+        return self.storage.count_posts()
     
+    @timed("BlogManager.like_post")
     def like_post(self, post_id):
         """Add a like to a post"""
-        posts = self._load_posts()
-        
-        for i, post in enumerate(posts):
-            if post["id"] == post_id:
-                posts[i]["likes"] = posts[i].get("likes", 0) + 1
-                self._save_posts(posts)
-                return posts[i]["likes"]
-        
-        raise Exception("Post not found")
+        return self._change_likes(post_id, 1)
     
+    @timed("BlogManager.unlike_post")
     def unlike_post(self, post_id):
         """Remove a like from a post"""
-        posts = self._load_posts()
-        
-        for i, post in enumerate(posts):
-            if post["id"] == post_id:
-                current_likes = posts[i].get("likes", 0)
-                posts[i]["likes"] = max(0, current_likes - 1)
-                self._save_posts(posts)
-                return posts[i]["likes"]
-        
-        raise Exception("Post not found")
+        return self._change_likes(post_id, -1)
     
+    @timed("BlogManager.get_total_likes")
     def get_total_likes(self):
         """Get total likes across all posts"""
-        posts = self._load_posts()
-        return sum(post.get("likes", 0) for post in posts)
+        return self.storage.total_likes() + sum(change for _, change in self._pending_like_changes())
+    
+    @timed("BlogManager.get_stats")
+    def get_stats(self):
+        """Get post count, total likes, latest post time and per-author counts
+        
+        See StorageBackend.get_stats; buffered likes are included, which only
+        costs a lookup of the posts that have likes pending.
+        """
+        stats = self.storage.get_stats()
+        for post, change in self._pending_like_changes():
+            author = stats["authors"].get(post["author"].lower())
+            if author is not None:
+                author["likes"] += change
+                stats["total_likes"] += change
+        return stats
+    
+    def _pending_like_changes(self):
+        """(post, change) for each post with buffered likes
+        
+        change is what the buffered delta adds to the stored count once the
+        post's likes are clamped at 0, as get_post reports them.
+        """
+        deltas = self.like_counter.pending_deltas() if self.like_counter is not None else {}
+        if not deltas:
+            return []
+        changes = []
+        for post in self.storage.get_posts(deltas):
+            likes = post.get("likes", 0)
+            changes.append((post, max(0, likes + deltas[post["id"]]) - likes))
+        return changes
@@ -0,0 +1,136 @@
+"""Streaming import and export of posts as NDJSON or a directory of Markdown files
+
+Readers yield (source, record) pairs one post at a time, where source names
+the line or file the record came from (for error messages) and record is the
+post's fields, or a ValueError if it couldn't be parsed; feed them to
+BlogManager.import_posts. Writers take any iterable of posts, such as
+StorageBackend.iter_posts(), and write them as they go, so neither side holds
+more than one post in memory.
+
+A Markdown post is its content preceded by front matter, one "field: value"
+line per field with the value JSON encoded:
+
+    ---
+    title: "Hello"
+    author: "Ada"
+    created_at: "2024-01-31T09:30:00"
+    ---
+
+    The content...
+
+Hand-written files may use bare values, leave out the front matter or take
+their title from a leading "# Heading" or, failing that, the file name.
+"""
+import json
+import sys
+from pathlib import Path
+
+from utils import sanitize_filename
+
+# Fields written by the exporters; derived fields are recomputed on import
+EXPORT_FIELDS = ("id", "title", "content", "author", "created_at", "updated_at", "likes")
+MARKDOWN_SUFFIXES = (".md", ".markdown")
+
+def read_ndjson(path):
+    """Yield (source, record) for each non-blank line of an NDJSON file ("-" reads stdin)"""
+    f = sys.stdin if str(path) == "-" else open(path, 'r', encoding='utf-8')
+    try:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            source = f"{path}:{number}"
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield source, ValueError(f"Invalid JSON: {e}")
+                continue
+            if not isinstance(record, dict):
+                yield source, ValueError("Expected a JSON object")
+                continue
+            yield source, record
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def _front_matter_value(value):
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return value
+
+def parse_markdown(text, default_title=None):
+    """Turn a Markdown post into a record of its front matter fields and content"""
+    record = {}
+    body = text
+    if text.startswith("---\n"):
+        end = text.find("\n---\n", 3)
+        if end != -1:
+            for line in text[4:end].splitlines():
+                key, separator, value = line.partition(":")
+                if separator and key.strip():
+                    record[key.strip()] = _front_matter_value(value.strip())
+            body = text[end + 5:]
+            # Undo the blank line after the front matter and the final newline export adds
+            if body.startswith("\n"):
+                body = body[1:]
+    if body.endswith("\n"):
+        body = body[:-1]
+    
+    if "title" not in record:
+        first_line, _, rest = body.lstrip("\n").partition("\n")
+        if first_line.startswith("# "):
+            record["title"] = first_line[2:].strip()
+            body = rest.lstrip("\n")
+        else:
+            record["title"] = default_title
+    record["content"] = body
+    return record
+
+def read_markdown_dir(directory):
+    """Yield (source, record) for each Markdown file in a directory, in file name order"""
+    for path in sorted(Path(directory).iterdir()):
+        if path.suffix.lower() not in MARKDOWN_SUFFIXES or not path.is_file():
+            continue
+        try:
+            text = path.read_text(encoding='utf-8')
+        except (OSError, UnicodeDecodeError) as e:
+            yield str(path), ValueError(f"Can't read file: {e}")
+            continue
+        yield str(path), parse_markdown(text, default_title=path.stem)
+
+def _export_record(post):
+    return {field: post.get(field) for field in EXPORT_FIELDS}
+
+def write_ndjson(posts, path):
+    """Write posts as one JSON object per line ("-" writes stdout), returning how many"""
+    count = 0
+    f = sys.stdout if str(path) == "-" else open(path, 'w', encoding='utf-8')
+    try:
+        for post in posts:
+            f.write(json.dumps(_export_record(post), ensure_ascii=False) + "\n")
+            count += 1
+    finally:
+        if f is not sys.stdout:
+            f.close()
+    return count
+
+def markdown_filename(post):
+    """File name for an exported post: its date, title and ID, so names never clash"""
+    return f"{post['created_at'][:10]}-{sanitize_filename(post['title'])[:60]}-{sanitize_filename(post['id'])}.md"
+
+def format_markdown(post):
+    """Render a post as front matter followed by its content"""
+    record = _export_record(post)
+    content = record.pop("content") or ""
+    front_matter = "".join(f"{field}: {json.dumps(value, ensure_ascii=False)}\n" for field, value in record.items())
+    return f"---\n{front_matter}---\n\n{content}\n"
+
+def write_markdown_dir(posts, directory):
+    """Write each post to its own Markdown file in directory, returning how many"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    count = 0
+    for post in posts:
+        (directory / markdown_filename(post)).write_text(format_markdown(post), encoding='utf-8')
+        count += 1
+    return count
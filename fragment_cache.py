@@ -0,0 +1,73 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import metrics
+
+class FragmentCache:
+    """LRU cache of rendered HTML fragments, bounded by their total size in bytes
+    
+    Keys must change whenever the rendered output would, e.g. by including
+    the post's version, so entries never need invalidating; outdated ones
+    simply stop being used and are evicted first.
+    """
+    
+    def __init__(self, max_bytes=8 * 1024 * 1024, name="fragments"):
+        self.max_bytes = max_bytes
+        # Label of the cache's hits and misses in metrics
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+    
+    def get_or_render(self, key, render):
+        """Return the cached fragment for key, calling render() to build it on a miss"""
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.cache_lookup(self.name, True)
+                return html
+            self.misses += 1
+        metrics.cache_lookup(self.name, False)
+        
+        # Rendered outside the lock; two sessions racing on the same key just
+        # both render it
+        html = render()
+        size = sys.getsizeof(html)
+        if size > self.max_bytes:
+            return html
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= sys.getsizeof(previous)
+            self._entries[key] = html
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= sys.getsizeof(evicted)
+        return html
+    
+    @property
+    def size(self):
+        """Total size of the cached fragments in bytes"""
+        return self._size
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+def post_fragment_key(post, view):
+    """Cache key for a rendered post that changes whenever anything it shows can
+    
+    The version covers stored changes; likes are included as well because
+    buffered likes are shown before they are written (and versioned).
+    """
+    return (post["id"], post.get("version", 1), post.get("updated_at"), post.get("likes", 0), view)
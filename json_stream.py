@@ -0,0 +1,90 @@
+"""Incremental reader for files holding one large JSON array
+
+json.load needs the whole file as a string before it builds any object, so
+peak memory is the file size plus every parsed post. iter_json_array reads
+the file in chunks and yields the array's elements one at a time, so only
+the current chunk and whatever the caller keeps stay in memory, and a caller
+that stops early never reads the rest of the file.
+"""
+import json
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+# What may follow an array element
+_DELIMITERS = _WHITESPACE + ",]"
+
+def iter_json_array(f, chunk_size=CHUNK_SIZE, object_pairs_hook=None):
+    """Yield the elements of the JSON array in text file f one at a time
+    
+    object_pairs_hook works as for json.load, e.g. to build objects other
+    than dicts. Raises json.JSONDecodeError if the file isn't a well-formed
+    array; an empty file counts as an empty array.
+    """
+    decoder = _decoder if object_pairs_hook is None else json.JSONDecoder(object_pairs_hook=object_pairs_hook)
+    buffer = f.read(chunk_size)
+    eof = not buffer
+    position = 0
+    
+    def skip_whitespace():
+        nonlocal buffer, position, eof
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position < len(buffer) or eof:
+                return
+            buffer = f.read(chunk_size)
+            position = 0
+            eof = not buffer
+    
+    skip_whitespace()
+    if position == len(buffer):
+        return
+    if buffer[position] != "[":
+        raise json.JSONDecodeError("Expected '['", buffer, position)
+    position += 1
+    
+    expect_element = True
+    first = True
+    while True:
+        skip_whitespace()
+        if position == len(buffer):
+            raise json.JSONDecodeError("Unterminated array", buffer, position)
+        char = buffer[position]
+        if char == "]" and (first or not expect_element):
+            position += 1
+            skip_whitespace()
+            if position < len(buffer):
+                raise json.JSONDecodeError("Extra data", buffer, position)
+            return
+        if not expect_element:
+            if char != ",":
+                raise json.JSONDecodeError("Expected ',' or ']'", buffer, position)
+            position += 1
+            expect_element = True
+            continue
+        
+        while True:
+            try:
+                element, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = None
+            # A number cut by the end of the buffer decodes early ("1." as 1),
+            # so an element only counts once a delimiter follows it, or at EOF
+            if end is not None and (eof or (end < len(buffer) and buffer[end] in _DELIMITERS)):
+                break
+            # Drop what has been consumed and read at least as much again as
+            # is buffered, so a huge element is parsed a bounded number of times
+            buffer = buffer[position:]
+            position = 0
+            more = f.read(max(chunk_size, len(buffer)))
+            eof = not more
+            buffer += more
+        
+        yield element
+        position = end
+        expect_element = False
+        first = False
@@ -0,0 +1,108 @@
+import atexit
+import threading
+
+# One counter per underlying store, shared by every BlogManager (and so every
+# Streamlit session) in the process
+_counters = {}
+_counters_lock = threading.Lock()
+
+class LikeCounter:
+    """Buffers like/unlike deltas in memory and writes their net effect in one batch
+    
+    Deltas are flushed to storage once flush_threshold clicks have accumulated
+    or flush_interval seconds after the first buffered click, whichever comes
+    first, and at interpreter exit. Until then readers add pending_delta() to
+    the stored count. on_flush, if given, is called after every flush that
+    wrote something, once readers no longer count the written deltas as
+    pending.
+    """
+    
+    def __init__(self, storage, flush_interval=2.0, flush_threshold=100, on_flush=None):
+        self.storage = storage
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.on_flush = on_flush
+        self._pending = {}
+        self._pending_clicks = 0
+        # Deltas taken out of _pending by a flush that hasn't reached storage yet;
+        # readers still count them so totals never dip mid-flush
+        self._in_flight = {}
+        self._timer = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+    
+    def add(self, post_id, delta):
+        """Buffer a like (delta=1) or unlike (delta=-1) for a post"""
+        with self._lock:
+            self._pending[post_id] = self._pending.get(post_id, 0) + delta
+            self._pending_clicks += 1
+            flush_now = self._pending_clicks >= self.flush_threshold
+            if not flush_now and self._timer is None and self.flush_interval:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if flush_now:
+            self.flush()
+    
+    def pending_delta(self, post_id):
+        """Net delta for a post that hasn't been written to storage yet"""
+        with self._lock:
+            return self._pending.get(post_id, 0) + self._in_flight.get(post_id, 0)
+    
+    def pending_deltas(self):
+        """All unwritten deltas as {post_id: delta}"""
+        with self._lock:
+            deltas = dict(self._in_flight)
+            for post_id, delta in self._pending.items():
+                deltas[post_id] = deltas.get(post_id, 0) + delta
+        return {post_id: delta for post_id, delta in deltas.items() if delta}
+    
+    def flush(self):
+        """Write all buffered deltas to storage in a single batch"""
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                self._in_flight = {post_id: delta for post_id, delta in self._pending.items() if delta}
+                self._pending = {}
+                self._pending_clicks = 0
+                deltas = self._in_flight
+            
+            if not deltas:
+                return
+            try:
+                self.storage.apply_like_deltas(deltas)
+            except Exception:
+                # Put the deltas back so the next flush retries them
+                with self._lock:
+                    for post_id, delta in deltas.items():
+                        self._pending[post_id] = self._pending.get(post_id, 0) + delta
+                    self._in_flight = {}
+                raise
+            with self._lock:
+                self._in_flight = {}
+            # A reader between the write and the line above counted the deltas
+            # twice, in storage and in flight; let anything it cached expire
+            if self.on_flush is not None:
+                self.on_flush()
+
+def get_like_counter(storage, flush_interval=2.0, flush_threshold=100, on_flush=None):
+    """Get the process-wide like counter for a storage backend, creating it if needed"""
+    with _counters_lock:
+        counter = _counters.get(storage.storage_key)
+        if counter is None:
+            counter = LikeCounter(storage, flush_interval, flush_threshold, on_flush)
+            _counters[storage.storage_key] = counter
+        return counter
+
+@atexit.register
+def flush_all():
+    """Flush every like counter so no buffered likes are lost on shutdown"""
+    with _counters_lock:
+        counters = list(_counters.values())
+    for counter in counters:
+        try:
+            counter.flush()
+        except Exception:
+            pass
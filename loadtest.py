@@ -0,0 +1,183 @@
+"""Load test for the JSON API (api.py)
+
+Usage:
+    python loadtest.py [--mode json] [--connections 200] [--duration 10] [--conditional] [DATA_FILE]
+    python loadtest.py --url http://127.0.0.1:8080 [--no-gzip] [--output results.json]
+
+Without --url the API is started on DATA_FILE on a free local port and
+stopped afterwards. Each of --connections keep-alive connections sends
+requests back to back for --duration seconds, cycling through a mix of
+listing pages, single posts, searches and author pages picked from the data.
+With --conditional, every connection repeats requests with If-None-Match and
+the ETag it got last time, like a polling client would, so most answers are
+304s. The report (JSON, as from benchmark.py) gives throughput, latency
+percentiles, status counts and bytes received.
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+from benchmark import percentile
+from storage import STORAGE_BACKENDS
+
+# Seconds to wait for a started API to accept connections
+STARTUP_TIMEOUT = 30.0
+
+async def request(reader, writer, host, target, gzip=True, etag=None):
+    """Send one GET on a keep-alive connection, returning (status, headers, body)"""
+    lines = [f"GET {target} HTTP/1.1", f"Host: {host}"]
+    if gzip:
+        lines.append("Accept-Encoding: gzip")
+    if etag:
+        lines.append(f"If-None-Match: {etag}")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+    await writer.drain()
+    head = (await reader.readuntil(b"\r\n\r\n")).decode('latin-1').split("\r\n")
+    status = int(head[0].split(" ")[1])
+    headers = {}
+    for line in head[1:]:
+        name, _, value = line.partition(":")
+        if name:
+            headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers, body
+
+async def discover_targets(host, port, sample):
+    """Request paths to drive: listing pages, then posts, searches and authors found in them"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        targets = ["/posts", "/authors"]
+        posts = []
+        cursor = None
+        while len(posts) < sample:
+            target = "/posts?limit=100" + (f"&cursor={cursor}" if cursor else "")
+            _, _, body = await request(reader, writer, host, target, gzip=False)
+            page = json.loads(body)
+            posts.extend(page["posts"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+            targets.append(f"/posts?limit=10&cursor={cursor}")
+    finally:
+        writer.close()
+    rng = random.Random(0)
+    for post in rng.sample(posts, min(sample, len(posts))):
+        targets.append(f"/posts/{quote(post['id'], safe='')}")
+        targets.append(f"/authors/{quote(post['author'], safe='')}/posts")
+        words = [word for word in post["title"].split() if len(word) > 3]
+        if words:
+            targets.append(f"/search?q={quote(rng.choice(words))}")
+    return targets
+
+async def client(host, port, targets, deadline, gzip, conditional, results):
+    """One connection sending requests until the deadline; appends (seconds, status, bytes) to results"""
+    reader, writer = await asyncio.open_connection(host, port)
+    etags = {}
+    rng = random.Random()
+    try:
+        while time.perf_counter() < deadline:
+            target = rng.choice(targets)
+            start = time.perf_counter()
+            status, headers, body = await request(reader, writer, host, target, gzip, etags.get(target))
+            results.append((time.perf_counter() - start, status, len(body)))
+            if conditional and "etag" in headers:
+                etags[target] = headers["etag"]
+    finally:
+        writer.close()
+
+async def run_load(host, port, connections, duration, gzip=True, conditional=False, sample=200):
+    """Drive the API at host:port and summarize the results"""
+    targets = await discover_targets(host, port, sample)
+    results = []
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(*(client(host, port, targets, deadline, gzip, conditional, results)
+                                      for _ in range(connections)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    latencies = sorted(seconds for seconds, _, _ in results)
+    statuses = {}
+    for _, status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        "connections": connections,
+        "duration_sec": elapsed,
+        "targets": len(targets),
+        "requests": len(results),
+        "requests_per_sec": len(results) / elapsed if elapsed else None,
+        "statuses": statuses,
+        "connection_errors": sum(1 for outcome in outcomes if isinstance(outcome, Exception)),
+        "bytes_received": sum(size for _, _, size in results),
+        "p50_ms": percentile(latencies, 0.50) * 1000 if latencies else None,
+        "p90_ms": percentile(latencies, 0.90) * 1000 if latencies else None,
+        "p99_ms": percentile(latencies, 0.99) * 1000 if latencies else None,
+        "max_ms": latencies[-1] * 1000 if latencies else None,
+    }
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_api(data_file, mode):
+    """Start api.py on a free local port, returning (process, port) once it accepts connections"""
+    port = _free_port()
+    api = Path(__file__).with_name("api.py")
+    process = subprocess.Popen([sys.executable, str(api), "--mode", mode, "--port", str(port), data_file])
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process, port
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError("The API didn't start") from None
+            time.sleep(0.1)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Load test the blog's JSON API")
+    parser.add_argument("data_file", nargs="?", default="data/blog_posts.json", help="Data file to serve")
+    parser.add_argument("--mode", choices=sorted(STORAGE_BACKENDS), default="json")
+    parser.add_argument("--url", help="Test an API that is already running instead of starting one")
+    parser.add_argument("--connections", type=int, default=200, help="Concurrent keep-alive connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to send requests for")
+    parser.add_argument("--conditional", action="store_true", help="Revalidate with If-None-Match like a poller")
+    parser.add_argument("--no-gzip", action="store_true", help="Don't accept gzip responses")
+    parser.add_argument("--sample", type=int, default=200, help="Posts to pick request targets from")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    process = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        process, port = start_api(args.data_file, args.mode)
+        host = "127.0.0.1"
+    try:
+        report = asyncio.run(run_load(host, port, args.connections, args.duration,
+                                      not args.no_gzip, args.conditional, args.sample))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
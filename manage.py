@@ -0,0 +1,150 @@
+"""Command line maintenance tasks for the blog data
+
+Usage:
+    python manage.py migrate [--source-mode json] [--target-mode sqlite] [--codec zlib|lzma]
+                             [--scheme month|hash] [--shards 16] SOURCE TARGET
+    python manage.py reshard [--scheme month|hash] [--shards 16] [DATA_FILE]
+    python manage.py backfill [--mode json] [DATA_FILE]
+    python manage.py import [--mode json] SOURCE [DATA_FILE]
+    python manage.py export [--mode json] [--format ndjson|markdown] TARGET [DATA_FILE]
+    python manage.py build [--mode json] [--per-page 10] [--dark] [--workers N] [--force] TARGET [DATA_FILE]
+
+SOURCE and TARGET are an NDJSON file ("-" for stdin/stdout) or a directory of
+Markdown files; see bulk.py for the formats. build renders the blog to static
+HTML in the TARGET directory, re-rendering only what changed since the last
+build there; see static_site.py. reshard rewrites the sharded store of
+DATA_FILE with another scheme or shard count; stop the app while it runs.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import bulk
+import static_site
+from blog_manager import BlogManager
+from storage import (CODECS, SHARD_COUNT, SHARD_SCHEMES, STORAGE_BACKENDS, create_storage, migrate_posts,
+                     reshard_storage, storage_path)
+from utils import derive_post_fields
+
+def cmd_migrate(args):
+    """Copy all posts from one storage backend into another"""
+    source = create_storage(args.source_mode, args.source)
+    options = {}
+    if args.target_mode == "compressed" and args.codec:
+        options = {"codec": args.codec}
+    elif args.target_mode == "sharded":
+        options = {"scheme": args.scheme, "shards": args.shards}
+    target = create_storage(args.target_mode, args.target, **options)
+    count = migrate_posts(source, target)
+    print(f"Migrated {count} post(s) from {args.source} ({args.source_mode}) to {args.target} ({args.target_mode})")
+
+def cmd_reshard(args):
+    """Rewrite a sharded store with another shard scheme or count"""
+    data_dir = storage_path("sharded", args.data_file)
+    count = reshard_storage(data_dir, args.scheme, args.shards)
+    layout = f"{args.shards} hash shards" if args.scheme == "hash" else "one shard per month"
+    print(f"Resharded {count} post(s) in {data_dir} into {layout}")
+
+def cmd_backfill(args):
+    """Recompute the stored display fields of every post"""
+    storage = create_storage(args.mode, args.data_file)
+    updates = {post["id"]: derive_post_fields(post) for post in storage.load_posts()}
+    if updates:
+        storage.update_posts(updates)
+    print(f"Backfilled derived fields for {len(updates)} post(s) in {args.data_file} ({args.mode})")
+
+def cmd_import(args):
+    """Validate and add posts from NDJSON or Markdown files in a single write"""
+    if Path(args.source).is_dir():
+        records = bulk.read_markdown_dir(args.source)
+    else:
+        records = bulk.read_ndjson(args.source)
+    manager = BlogManager(args.data_file, storage_mode=args.mode)
+    imported, rejected = manager.import_posts(records)
+    for source, errors in rejected:
+        print(f"Skipped {source}: {'; '.join(errors)}", file=sys.stderr)
+    print(f"Imported {imported} post(s) into {args.data_file} ({args.mode}), skipped {len(rejected)}",
+          file=sys.stderr)
+    return 1 if rejected else 0
+
+def cmd_export(args):
+    """Write every post to NDJSON or one Markdown file per post"""
+    export_format = args.format
+    if export_format is None:
+        # A directory (existing or to be created) gets Markdown files, anything else NDJSON
+        target = Path(args.target)
+        export_format = "markdown" if target.is_dir() or (args.target != "-" and not target.suffix) else "ndjson"
+    manager = BlogManager(args.data_file, storage_mode=args.mode)
+    if export_format == "markdown":
+        count = bulk.write_markdown_dir(manager.export_posts(), args.target)
+    else:
+        count = bulk.write_ndjson(manager.export_posts(), args.target)
+    print(f"Exported {count} post(s) from {args.data_file} ({args.mode}) to {args.target}", file=sys.stderr)
+
+def cmd_build(args):
+    """Render the blog to static HTML, re-rendering only the pages that changed"""
+    manager = BlogManager(args.data_file, storage_mode=args.mode)
+    result = static_site.build_site(manager, args.target, per_page=args.per_page, dark_mode=args.dark,
+                                    workers=args.workers, force=args.force)
+    print(f"Built {args.target} from {args.data_file} ({args.mode}): rendered {result['rendered']} page(s), "
+          f"{result['unchanged']} unchanged, removed {result['removed']}")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Personal blog maintenance tasks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    migrate = subparsers.add_parser("migrate", help="Copy posts between storage backends")
+    migrate.add_argument("source", nargs="?", default="data/blog_posts.json", help="Source data file")
+    migrate.add_argument("target", nargs="?", default="data/blog_posts.db", help="Target data file")
+    migrate.add_argument("--source-mode", choices=sorted(STORAGE_BACKENDS), default="json")
+    migrate.add_argument("--target-mode", choices=sorted(STORAGE_BACKENDS), default="sqlite")
+    migrate.add_argument("--codec", choices=sorted(CODECS), help="Body compression for --target-mode compressed")
+    migrate.add_argument("--scheme", choices=SHARD_SCHEMES, default="month",
+                         help="How --target-mode sharded splits posts: by month of creation or by ID hash")
+    migrate.add_argument("--shards", type=int, default=SHARD_COUNT, help="Shard count for --scheme hash")
+    migrate.set_defaults(func=cmd_migrate)
+    
+    reshard = subparsers.add_parser("reshard", help="Rewrite a sharded store with another layout (offline)")
+    reshard.add_argument("data_file", nargs="?", default="data/blog_posts.json", help="Data file")
+    reshard.add_argument("--scheme", choices=SHARD_SCHEMES, default="month",
+                         help="Split posts by month of creation or by ID hash")
+    reshard.add_argument("--shards", type=int, default=SHARD_COUNT, help="Shard count for --scheme hash")
+    reshard.set_defaults(func=cmd_reshard)
+    
+    backfill = subparsers.add_parser("backfill", help="Recompute stored word counts, previews and display dates")
+    backfill.add_argument("data_file", nargs="?", default="data/blog_posts.json", help="Data file")
+    backfill.add_argument("--mode", choices=sorted(STORAGE_BACKENDS), default="json")
+    backfill.set_defaults(func=cmd_backfill)
+    
+    import_parser = subparsers.add_parser("import", help="Add posts from NDJSON or a directory of Markdown files")
+    import_parser.add_argument("source", help="NDJSON file, - for stdin, or directory of .md files")
+    import_parser.add_argument("data_file", nargs="?", default="data/blog_posts.json", help="Data file")
+    import_parser.add_argument("--mode", choices=sorted(STORAGE_BACKENDS), default="json")
+    import_parser.set_defaults(func=cmd_import)
+    
+    export = subparsers.add_parser("export", help="Write all posts to NDJSON or a directory of Markdown files")
+    export.add_argument("target", help="NDJSON file, - for stdout, or directory for .md files")
+    export.add_argument("data_file", nargs="?", default="data/blog_posts.json", help="Data file")
+    export.add_argument("--mode", choices=sorted(STORAGE_BACKENDS), default="json")
+    export.add_argument("--format", choices=["ndjson", "markdown"],
+                        help="Output format (default: markdown for a directory or a path without suffix)")
+    export.set_defaults(func=cmd_export)
+    
+    build = subparsers.add_parser("build", help="Render the blog to static HTML pages")
+    build.add_argument("target", help="Output directory")
+    build.add_argument("data_file", nargs="?", default="data/blog_posts.json", help="Data file")
+    build.add_argument("--mode", choices=sorted(STORAGE_BACKENDS), default="json")
+    build.add_argument("--per-page", type=int, default=10, help="Posts per listing page")
+    build.add_argument("--dark", action="store_true", help="Use the dark theme")
+    build.add_argument("--workers", type=int, help="Rendering processes (default: one per CPU)")
+    build.add_argument("--force", action="store_true", help="Render every page, not just the changed ones")
+    build.set_defaults(func=cmd_build)
+    
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args) or 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""Operation metrics: counters, latency histograms, bytes read/written and cache hits
+
+Metrics are off by default and every recording call returns after a single
+flag check until configure() or enable() turns them on. Recorded values are
+kept in the process-wide registry and handed to its sinks:
+
+    jsonl:PATH         one JSON line per observation
+    prometheus:PATH    the registry in Prometheus text format, rewritten every few seconds
+    http:PORT          the same text served at http://HOST:PORT/metrics
+
+configure() takes a comma-separated list of these, e.g. the BLOG_METRICS
+environment variable: BLOG_METRICS=prometheus:data/metrics.prom,jsonl:data/metrics.jsonl
+"""
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROMETHEUS_WRITE_INTERVAL = 10.0
+
+OPERATION_SECONDS = "blog_operation_seconds"
+OPERATION_ERRORS = "blog_operation_errors_total"
+BYTES_READ = "blog_storage_bytes_read_total"
+BYTES_WRITTEN = "blog_storage_bytes_written_total"
+CACHE_HITS = "blog_cache_hits_total"
+CACHE_MISSES = "blog_cache_misses_total"
+
+HELP = {
+    OPERATION_SECONDS: "Time spent in BlogManager methods, storage reads and page renders",
+    OPERATION_ERRORS: "Operations that raised",
+    BYTES_READ: "Bytes read from data files",
+    BYTES_WRITTEN: "Bytes written to data files",
+    CACHE_HITS: "Cache lookups that found an entry",
+    CACHE_MISSES: "Cache lookups that had to load or render",
+}
+
+class MetricsRegistry:
+    """Counters and histograms for the process, keyed by metric name and labels"""
+    
+    def __init__(self):
+        self.enabled = False
+        self.sinks = []
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+    
+    def increment(self, name, value=1, labels=()):
+        """Add value to a counter; labels is a tuple of (label, value) pairs"""
+        if not self.enabled:
+            return
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        self._emit("counter", name, labels, value)
+    
+    def observe(self, name, value, labels=()):
+        """Record one value, e.g. a latency in seconds, in a histogram"""
+        if not self.enabled:
+            return
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # [count per bucket..., count above the last bucket, count, sum]
+                histogram = self._histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0, 0.0]
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    break
+            else:
+                index = len(LATENCY_BUCKETS)
+            histogram[index] += 1
+            histogram[-2] += 1
+            histogram[-1] += value
+        self._emit("histogram", name, labels, value)
+    
+    def _emit(self, kind, name, labels, value):
+        for sink in self.sinks:
+            sink.record(kind, name, labels, value)
+    
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+    
+    def snapshot(self):
+        """All current values as a JSON-serializable dict, with cache hit ratios"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(values) for key, values in self._histograms.items()}
+        
+        result = {"counters": [], "histograms": [], "cache_hit_ratios": {}}
+        for (name, labels), value in sorted(counters.items()):
+            result["counters"].append({"name": name, "labels": dict(labels), "value": value})
+        for (name, labels), values in sorted(histograms.items()):
+            result["histograms"].append({"name": name, "labels": dict(labels), "count": values[-2],
+                                         "sum": values[-1], "buckets": values[:-2]})
+        for (name, labels), hits in counters.items():
+            if name == CACHE_HITS:
+                lookups = hits + counters.get((CACHE_MISSES, labels), 0)
+                result["cache_hit_ratios"][dict(labels)["cache"]] = hits / lookups
+        return result
+    
+    def prometheus_text(self):
+        """Render every metric in the Prometheus text exposition format"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(values) for key, values in self._histograms.items()}
+        
+        lines = []
+        described = set()
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+        
+        for (name, labels), value in sorted(counters.items()):
+            describe(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), values in sorted(histograms.items()):
+            describe(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, values):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(bound)),))} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {values[-2]}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {values[-1]}")
+            lines.append(f"{name}_count{_format_labels(labels)} {values[-2]}")
+        return "\n".join(lines) + "\n"
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{label}="{value}"' for (label, _), value in zip(labels, escaped)) + "}"
+
+# The process-wide registry every module records into
+registry = MetricsRegistry()
+
+def timed(operation):
+    """Decorator recording the latency (and any exception) of each call as operation"""
+    labels = (("operation", operation),)
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                registry.increment(OPERATION_ERRORS, 1, labels)
+                raise
+            finally:
+                registry.observe(OPERATION_SECONDS, time.perf_counter() - start, labels)
+        return wrapper
+    return decorator
+
+class timer:
+    """Context manager recording the latency of its block as operation, like timed"""
+    
+    def __init__(self, operation):
+        self.labels = (("operation", operation),)
+        self.start = None
+    
+    def __enter__(self):
+        if registry.enabled:
+            self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.start is not None:
+            if exc_type is not None:
+                registry.increment(OPERATION_ERRORS, 1, self.labels)
+            registry.observe(OPERATION_SECONDS, time.perf_counter() - self.start, self.labels)
+
+def bytes_read(count):
+    if registry.enabled:
+        registry.increment(BYTES_READ, count)
+
+def bytes_written(count):
+    if registry.enabled:
+        registry.increment(BYTES_WRITTEN, count)
+
+def cache_lookup(cache, hit):
+    """Count a hit or miss of the named cache"""
+    if registry.enabled:
+        registry.increment(CACHE_HITS if hit else CACHE_MISSES, 1, (("cache", cache),))
+
+class JsonLinesSink:
+    """Appends every observation to a file as one JSON object per line"""
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8', buffering=1)
+        self._lock = threading.Lock()
+    
+    def record(self, kind, name, labels, value):
+        line = json.dumps({"ts": time.time(), "type": kind, "name": name, "labels": dict(labels), "value": value})
+        with self._lock:
+            self._file.write(line + "\n")
+    
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+class PrometheusFileSink:
+    """Rewrites a Prometheus text file with the registry's values every interval seconds
+    
+    The file is replaced atomically, so it can be picked up by node_exporter's
+    textfile collector or read by hand at any time.
+    """
+    
+    def __init__(self, path, interval=PROMETHEUS_WRITE_INTERVAL, metrics_registry=None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.interval = interval
+        self.registry = metrics_registry or registry
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-prometheus-file", daemon=True)
+        self._thread.start()
+    
+    def record(self, kind, name, labels, value):
+        pass
+    
+    def write(self):
+        temp_file = Path(f"{self.path}.tmp")
+        temp_file.write_text(self.registry.prometheus_text(), encoding='utf-8')
+        os.replace(temp_file, self.path)
+    
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.write()
+    
+    def close(self):
+        self._stopped.set()
+        self.write()
+
+class PrometheusHttpSink:
+    """Serves the registry in Prometheus text format at /metrics from a background thread"""
+    
+    def __init__(self, port, host="127.0.0.1", metrics_registry=None):
+        metrics_registry = metrics_registry or registry
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics_registry.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer((host, int(port)), Handler)
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+    
+    def record(self, kind, name, labels, value):
+        pass
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+SINKS = {
+    "jsonl": JsonLinesSink,
+    "prometheus": PrometheusFileSink,
+    "http": PrometheusHttpSink,
+}
+
+def enable(*sinks):
+    """Start recording, sending observations to the given sinks as well"""
+    registry.sinks.extend(sinks)
+    registry.enabled = True
+
+def disable():
+    """Stop recording and close all sinks; values recorded so far are kept"""
+    registry.enabled = False
+    sinks, registry.sinks = registry.sinks, []
+    for sink in sinks:
+        sink.close()
+
+def configure(spec):
+    """Enable metrics with the sinks in a spec like "prometheus:metrics.prom,jsonl:metrics.jsonl"
+    
+    An empty or None spec leaves metrics disabled. Returns the created sinks.
+    """
+    sinks = []
+    for entry in (spec or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        kind, _, target = entry.partition(":")
+        if kind not in SINKS or not target:
+            raise ValueError(f"Unknown metrics sink {entry!r}; use jsonl:PATH, prometheus:PATH or http:PORT")
+        sinks.append(SINKS[kind](target))
+    if sinks:
+        enable(*sinks)
+    return sinks
+
+atexit.register(disable)
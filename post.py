@@ -0,0 +1,144 @@
+"""Compact in-memory representation of a blog post
+
+File-backed storages keep every post of a store in memory, where a dict per
+post costs far more than the values it holds: each dict carries its own hash
+table, and a file parsed incrementally even has its own copies of the key
+strings. Post stores the known fields in __slots__ instead, interns author
+names (which repeat across posts) and still behaves like the dict it
+replaces, so templates, utils.search_posts and dict(post) keep working.
+Posts stay inside the storages: BlogManager hands out plain dict copies
+(to_dict), so callers can serialise and change them like before.
+"""
+import sys
+from collections.abc import MutableMapping
+
+# Display values computed once when a post is written (see utils.derive_post_fields)
+DERIVED_FIELDS = ("word_count", "reading_time", "preview", "short_preview",
+                  "created_display", "updated_display")
+POST_FIELDS = ("id", "title", "content", "author", "created_at", "updated_at", "likes", "version") + DERIVED_FIELDS
+# Values for fields missing from posts written by older versions
+FIELD_DEFAULTS = {"likes": 0, "version": 1}
+# Everything list views need; only the full post view reads content
+SUMMARY_FIELDS = tuple(field for field in POST_FIELDS if field != "content")
+
+_FIELD_SET = frozenset(POST_FIELDS)
+_MISSING = object()
+
+class Post(MutableMapping):
+    """A post as a mutable mapping backed by slots
+    
+    Missing fields are simply unset slots, so "likes" in post and
+    post.get("likes", 0) behave as they do for a dict without that key.
+    Fields this version doesn't know about are kept in a small side dict.
+    """
+    
+    __slots__ = POST_FIELDS + ("_extra",)
+    
+    def __init__(self, fields=()):
+        """Build a post from a mapping or (key, value) pairs, e.g. as json's object_pairs_hook"""
+        self._extra = None
+        # Inlined __setitem__, since every post loaded from a file passes through here
+        for key, value in (fields.items() if hasattr(fields, "items") else fields):
+            if key in _FIELD_SET:
+                setattr(self, key, value)
+            else:
+                if self._extra is None:
+                    self._extra = {}
+                self._extra[key] = value
+        author = getattr(self, "author", None)
+        if type(author) is str:
+            self.author = sys.intern(author)
+    
+    @classmethod
+    def of(cls, post):
+        """Return post itself if it already is a Post, otherwise a Post copy of it"""
+        return post if type(post) is cls else cls(post)
+    
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+    
+    def __setitem__(self, key, value):
+        if key in _FIELD_SET:
+            if key == "author" and type(value) is str:
+                value = sys.intern(value)
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+    
+    def __delitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+            if not self._extra:
+                self._extra = None
+        else:
+            raise KeyError(key)
+    
+    def __contains__(self, key):
+        if key in _FIELD_SET:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+    
+    def __iter__(self):
+        for key in POST_FIELDS:
+            if hasattr(self, key):
+                yield key
+        if self._extra:
+            yield from self._extra
+    
+    def __len__(self):
+        return sum(1 for _ in self)
+    
+    def get(self, key, default=None):
+        # Overridden for speed; the Mapping version goes through a KeyError per miss
+        if key in _FIELD_SET:
+            return getattr(self, key, default)
+        if self._extra is None:
+            return default
+        return self._extra.get(key, default)
+    
+    def update(self, other=(), **fields):
+        for key, value in (other.items() if hasattr(other, "items") else other):
+            self[key] = value
+        for key, value in fields.items():
+            self[key] = value
+    
+    def copy(self):
+        return Post(self)
+    
+    def to_dict(self):
+        fields = {key: value for key in POST_FIELDS if (value := getattr(self, key, _MISSING)) is not _MISSING}
+        if self._extra:
+            fields.update(self._extra)
+        return fields
+    
+    def __getstate__(self):
+        return self.to_dict()
+    
+    def __setstate__(self, state):
+        self._extra = None
+        self.update(state)
+    
+    def __repr__(self):
+        return f"Post({self.to_dict()!r})"
+    
+    __hash__ = None
+
+def json_default(value):
+    """json.dump default= hook that writes Posts as plain objects"""
+    if isinstance(value, Post):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,182 @@
+"""Revision history of posts, kept out of band as compressed deltas
+
+Every update records the state it replaces in an append-only .revisions file
+next to the data, so the data file that every request parses never grows
+with history, and listing or viewing posts never opens it. Each entry is a
+JSON header line (post ID, revision number, title, author, version, times)
+followed by a zlib-compressed payload: either the full content (a keyframe)
+or a line-based difflib delta against the post's previous revision.
+
+A keyframe is written at least every KEYFRAME_INTERVAL revisions, so
+rebuilding any revision reads one keyframe and at most KEYFRAME_INTERVAL - 1
+deltas, however long the history is. Revision lists come from the headers
+alone and never decompress anything.
+"""
+import difflib
+import json
+import os
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+import metrics
+from storage import get_file_lock
+
+# Most revisions rebuilt from deltas before the next keyframe
+KEYFRAME_INTERVAL = 10
+
+# One store per underlying post store, shared by every BlogManager in the process
+_stores = {}
+_stores_lock = threading.Lock()
+
+def make_delta(old, new):
+    """Delta turning old into new: a list of [start, end] line ranges to copy from old and strings to insert"""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    delta = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old_lines, new_lines).get_opcodes():
+        if tag == "equal":
+            delta.append([i1, i2])
+        elif j2 > j1:
+            delta.append("".join(new_lines[j1:j2]))
+    return delta
+
+def apply_delta(old, delta):
+    """Rebuild the new text from old and a delta made by make_delta"""
+    old_lines = old.splitlines(keepends=True)
+    parts = []
+    for step in delta:
+        if isinstance(step, str):
+            parts.append(step)
+        else:
+            parts.extend(old_lines[step[0]:step[1]])
+    return "".join(parts)
+
+class RevisionStore:
+    """Append-only revision history for the posts of one store
+    
+    The file is indexed (headers only) on first use and afterwards only its
+    new tail is scanned, so revisions recorded by other processes show up.
+    Appends take a lock file, so several processes can record at once.
+    """
+    
+    def __init__(self, path):
+        self.path = Path(path) if path is not None else None
+        self._entries = {}
+        self._indexed_size = 0
+        self._lock = threading.RLock()
+        self._write_lock = get_file_lock(f"{self.path}.lock") if self.path is not None else None
+    
+    def _catch_up(self):
+        """Index the entries appended since the last scan"""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            f.seek(self._indexed_size)
+            while True:
+                header_line = f.readline()
+                if not header_line.endswith(b"\n"):
+                    break
+                metrics.bytes_read(len(header_line))
+                header = json.loads(header_line)
+                header["offset"] = f.tell()
+                # An entry still being written by another process is picked up next time
+                if header["offset"] + header["length"] > size:
+                    break
+                f.seek(header["length"], os.SEEK_CUR)
+                self._entries.setdefault(header["post_id"], []).append(header)
+                self._indexed_size = f.tell()
+    
+    def _read_payload(self, f, header):
+        f.seek(header["offset"])
+        data = f.read(header["length"])
+        metrics.bytes_read(len(data))
+        return zlib.decompress(data).decode('utf-8')
+    
+    def _content(self, f, entries, index):
+        """Rebuild the content of entries[index] from its keyframe and the deltas after it"""
+        start = index
+        while entries[start]["kind"] != "full":
+            start -= 1
+        content = self._read_payload(f, entries[start])
+        for entry in entries[start + 1:index + 1]:
+            content = apply_delta(content, json.loads(self._read_payload(f, entry)))
+        return content
+    
+    def record(self, post):
+        """Append the given state of a post as its next revision, returning the revision number"""
+        if self.path is None:
+            return None
+        with self._lock, self._write_lock:
+            self._catch_up()
+            entries = self._entries.get(post["id"], [])
+            content = post.get("content", "")
+            payload = zlib.compress(content.encode('utf-8'))
+            kind = "full"
+            keyframe = max((i for i, entry in enumerate(entries) if entry["kind"] == "full"), default=None)
+            if keyframe is not None and len(entries) - keyframe < KEYFRAME_INTERVAL:
+                with open(self.path, 'rb') as f:
+                    previous = self._content(f, entries, len(entries) - 1)
+                delta = zlib.compress(json.dumps(make_delta(previous, content), ensure_ascii=False).encode('utf-8'))
+                if len(delta) < len(payload):
+                    kind, payload = "delta", delta
+            
+            header = {
+                "post_id": post["id"],
+                "revision": len(entries) + 1,
+                "kind": kind,
+                "length": len(payload),
+                "title": post["title"],
+                "author": post["author"],
+                "version": post.get("version", 1),
+                "edited_at": post.get("updated_at") or post["created_at"],
+                "saved_at": datetime.now().isoformat(),
+            }
+            data = json.dumps(header, ensure_ascii=False).encode('utf-8') + b"\n" + payload
+            with open(self.path, 'ab') as f:
+                # Everything up to _indexed_size is whole entries; drop what a writer that died mid-append left
+                f.truncate(self._indexed_size)
+                f.write(data)
+            metrics.bytes_written(len(data))
+            header["offset"] = self._indexed_size + len(data) - len(payload)
+            self._indexed_size += len(data)
+            self._entries.setdefault(post["id"], []).append(header)
+            return header["revision"]
+    
+    def list_revisions(self, post_id):
+        """Every revision of a post, oldest first, without content"""
+        if self.path is None:
+            return []
+        with self._lock:
+            self._catch_up()
+            return [{key: value for key, value in entry.items() if key not in ("kind", "offset", "length")}
+                    for entry in self._entries.get(post_id, [])]
+    
+    def get_revision(self, post_id, revision):
+        """One revision of a post with its content, or None if there is no such revision"""
+        if self.path is None:
+            return None
+        with self._lock:
+            self._catch_up()
+            entries = self._entries.get(post_id, [])
+            if not 1 <= revision <= len(entries):
+                return None
+            with open(self.path, 'rb') as f:
+                content = self._content(f, entries, revision - 1)
+            entry = entries[revision - 1]
+        result = {key: value for key, value in entry.items() if key not in ("kind", "offset", "length")}
+        result["content"] = content
+        return result
+
+def get_revision_store(storage):
+    """Get the process-wide revision store for a storage backend, creating it if needed"""
+    with _stores_lock:
+        store = _stores.get(storage.storage_key)
+        if store is None:
+            store = RevisionStore(storage.sidecar_path(".revisions"))
+            _stores[storage.storage_key] = store
+        return store
@@ -0,0 +1,603 @@
+import atexit
+import gc
+import heapq
+import json
+import math
+import os
+import re
+import sys
+import threading
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from itertools import accumulate, chain, filterfalse
+from operator import sub
+
+# One index per underlying store, shared by every BlogManager in the process
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+INDEX_FORMAT_VERSION = 5
+INDEX_MAGIC = b"BLOGIDX\n"
+# Fast levels already shrink the posting gaps to a byte or two each
+INDEX_COMPRESSION_LEVEL = 1
+SEARCH_FIELDS = ("title", "content", "author")
+GRAM_SIZE = 3
+# Posts indexed per batch by a sync; bounds the lists _add_posts collects postings in
+INDEX_BATCH_SIZE = 1000
+# Removals of more posts at once than this filter every posting list instead
+# of binary-searching each list for each post
+SWEEP_SEARCH_LIMIT = 32
+
+# BM25F parameters for ranked search; matches in the title count the most
+FIELD_WEIGHTS = (3.0, 1.0, 1.5)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TERM_RE = re.compile(r"\w+")
+
+def _post_stamp(post):
+    """Value that changes whenever a post's searchable text can have changed"""
+    return (post["created_at"], post.get("updated_at"))
+
+def _post_grams(post):
+    """All trigrams of the lowercased searchable fields of a post
+    
+    Fields are tokenized separately so no trigram spans two fields, matching
+    utils.search_posts which checks each field on its own.
+    """
+    grams = set()
+    for field in SEARCH_FIELDS:
+        text = post[field].lower()
+        grams.update(map(''.join, zip(text, text[1:], text[2:])))
+    return grams
+
+def tokenize(text):
+    """Split text into lowercased word terms for ranked search"""
+    return _TERM_RE.findall(text.lower())
+
+def _post_terms(post):
+    """Per-field term frequencies and field lengths of a post
+    
+    Returns ({term: (title_tf, content_tf, author_tf)}, (title_len, content_len, author_len)).
+    """
+    title, content, author = (tokenize(post[field]) for field in SEARCH_FIELDS)
+    # Nearly every term is only in the content, so start from its counts and
+    # patch in the few title and author terms rather than merging all three
+    frequencies = {term: (0, count, 0) for term, count in Counter(content).items()}
+    for term, count in Counter(title).items():
+        frequencies[term] = (count,) + frequencies.get(term, (0, 0, 0))[1:]
+    for term, count in Counter(author).items():
+        frequencies[term] = frequencies.get(term, (0, 0, 0))[:2] + (count,)
+    return frequencies, (len(title), len(content), len(author))
+
+def _json_value(value):
+    """value as it reads back from JSON, e.g. a change token with its tuples as lists"""
+    return json.loads(json.dumps(value))
+
+def _to_little_endian(values):
+    """Bytes of an array of 32-bit integers in little-endian order"""
+    if sys.byteorder == "big":
+        values = values[:]
+        values.byteswap()
+    return values.tobytes()
+
+def _from_little_endian(typecode, data):
+    """Array of 32-bit integers read from little-endian bytes"""
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+@contextmanager
+def _gc_paused():
+    """Pause the cyclic GC while building millions of small containers"""
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+def _contains(numbers, number):
+    """Whether a sorted array holds number"""
+    i = bisect_left(numbers, number)
+    return i < len(numbers) and numbers[i] == number
+
+def _discard(numbers, number):
+    """Remove number from a sorted array, returning where it was, or None if it wasn't there"""
+    i = bisect_left(numbers, number)
+    if i < len(numbers) and numbers[i] == number:
+        del numbers[i]
+        return i
+    return None
+
+class SearchIndex:
+    """Trigram index narrowing substring search to a few candidate posts
+    
+    Every query trigram must occur in a matching post, so intersecting the
+    posting lists of the query's trigrams gives a superset of the matches
+    that utils.search_posts then verifies exactly. Queries shorter than three
+    characters can't be narrowed and fall back to a full scan.
+    
+    Alongside the trigrams it keeps word-level posting lists with per-field
+    term frequencies and per-post field lengths, so ranked() can score BM25F
+    relevance by touching only the posts that contain a query term.
+    
+    Posts are numbered as they are indexed, and posting lists are sorted
+    arrays of those numbers (with a parallel array of the three frequencies
+    for terms): a few bytes per entry, where sets of post ID strings took
+    tens. A reindexed post gets a new number; removed posts' numbers are
+    left unused.
+    
+    The index is kept up to date incrementally by BlogManager and reconciled
+    against storage (by each post's created_at/updated_at stamp) whenever the
+    storage change token moves, so writes from other processes are picked up
+    without a rebuild. It is saved next to the data file and loaded, or
+    built, by a background thread started with start(); until that is done
+    candidates() returns None, ranked() waits, and updates are queued.
+    """
+    
+    def __init__(self, storage, path=None):
+        self.storage = storage
+        self.path = path
+        self._reset()
+        self._token = None
+        self._loaded = False
+        self._dirty = False
+        self._lock = threading.RLock()
+        # Cleared while the background build runs; _queued holds the updates made meanwhile
+        self._ready = threading.Event()
+        self._ready.set()
+        self._queued = []
+        self._queue_lock = threading.Lock()
+        # Serializes saves, which encode and write without holding _lock
+        self._save_lock = threading.Lock()
+    
+    def _reset(self):
+        """Empty the index"""
+        self._ids = []
+        self._numbers = {}
+        self._stamps = {}
+        self._postings = {}
+        self._term_postings = {}
+        self._doc_lengths = array('I')
+        self._total_lengths = [0, 0, 0]
+    
+    def _load(self):
+        """Read the persisted index, if there is a usable one
+        
+        The file holds only JSON and integers (see save), so a tampered or
+        foreign one can at worst give wrong search results, never run code.
+        Anything that isn't a well-formed index of this format version is
+        ignored and rebuilt.
+        """
+        self._loaded = True
+        if self.path is None:
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                    return
+                header = json.loads(f.read(int.from_bytes(f.read(4), "little")))
+                body = zlib.decompress(f.read())
+        except (FileNotFoundError, ValueError, zlib.error):
+            return
+        try:
+            if header["version"] != INDEX_FORMAT_VERSION:
+                return
+            ids, grams, terms = header["ids"], header["grams"], header["terms"]
+            gram_counts, term_counts = header["gram_counts"], header["term_counts"]
+            gram_total, term_total = sum(gram_counts), sum(term_counts)
+            if not (len(ids) == len(header["stamps"]) and len(grams) == len(gram_counts)
+                    and len(terms) == len(term_counts) and min(gram_counts + term_counts, default=1) > 0
+                    and len(body) == 4 * (3 * len(ids) + gram_total + 4 * term_total)):
+                return
+            lengths = _from_little_endian('I', body[:12 * len(ids)])
+            gaps = _from_little_endian('i', body[12 * len(ids):4 * (3 * len(ids) + gram_total + term_total)])
+            counts = _from_little_endian('I', body[4 * (3 * len(ids) + gram_total + term_total):])
+            if gaps and min(gaps) < 0:
+                return
+            
+            with _gc_paused():
+                numbers = {post_id: number for number, post_id in enumerate(ids) if post_id is not None}
+                stamps = {post_id: tuple(stamp) for post_id, stamp in zip(ids, header["stamps"])
+                          if post_id is not None}
+                postings = {}
+                offset = 0
+                for gram, count in zip(grams, gram_counts):
+                    postings[gram] = array('i', accumulate(gaps[offset:offset + count]))
+                    offset += count
+                term_postings = {}
+                for term, count in zip(terms, term_counts):
+                    term_postings[term] = (array('i', accumulate(gaps[offset:offset + count])),
+                                           counts[3 * (offset - gram_total):3 * (offset - gram_total + count)])
+                    offset += count
+            # Gaps aren't negative, so the last number of each list shows whether all are in range
+            if not all(values[-1] < len(ids)
+                       for values in chain(postings.values(), (values for values, _ in term_postings.values()))):
+                return
+            token = header["token"]
+        except (KeyError, TypeError, ValueError, OverflowError, AttributeError):
+            return
+        
+        self._ids = ids
+        self._numbers = numbers
+        self._stamps = stamps
+        self._postings = postings
+        self._term_postings = term_postings
+        self._doc_lengths = lengths
+        self._total_lengths = [sum(lengths[position::3]) for position in range(3)]
+        # Saved with the storage change token it was last in sync with: if the
+        # data hasn't changed since, the first sync needn't compare every post
+        current = self.storage.change_token()
+        if token is not None and token == _json_value(current):
+            self._token = current
+    
+    def save(self):
+        """Write the index next to the data file
+        
+        The file is INDEX_MAGIC, the byte length and then the JSON of a
+        header (format version, change token, post IDs and stamps by number,
+        the trigrams and terms with their posting counts), followed by one
+        zlib stream of little-endian 32-bit integers: every post's field
+        lengths, the trigram and then the term postings as gaps between
+        consecutive numbers, which compress to a byte or two each, and the
+        term frequencies. Only copying the arrays holds up searches; the
+        encoding and writing happen outside the index lock.
+        """
+        if self.path is None:
+            return
+        with self._save_lock:
+            with self._lock:
+                if not self._loaded:
+                    return
+                header = {
+                    "version": INDEX_FORMAT_VERSION,
+                    "token": _json_value(self._token),
+                    "ids": list(self._ids),
+                    "stamps": [None if post_id is None else self._stamps[post_id] for post_id in self._ids],
+                    "grams": list(self._postings),
+                    "terms": list(self._term_postings),
+                }
+                lengths = self._doc_lengths[:]
+                gram_postings = [numbers[:] for numbers in self._postings.values()]
+                term_postings = [(numbers[:], counts[:]) for numbers, counts in self._term_postings.values()]
+                self._dirty = False
+            
+            header["gram_counts"] = list(map(len, gram_postings))
+            header["term_counts"] = [len(numbers) for numbers, _ in term_postings]
+            gaps = array('i')
+            for numbers in chain(gram_postings, (numbers for numbers, _ in term_postings)):
+                gaps.extend(map(sub, numbers, chain((0,), numbers)))
+            counts = array('I')
+            for _, term_counts in term_postings:
+                counts += term_counts
+            compressor = zlib.compressobj(INDEX_COMPRESSION_LEVEL)
+            body = [compressor.compress(_to_little_endian(values)) for values in (lengths, gaps, counts)]
+            body.append(compressor.flush())
+            header = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+            
+            temp_file = f"{self.path}.tmp"
+            with open(temp_file, 'wb') as f:
+                f.write(INDEX_MAGIC)
+                f.write(len(header).to_bytes(4, "little"))
+                f.write(header)
+                f.writelines(body)
+            os.replace(temp_file, self.path)
+    
+    def _save_in_background(self):
+        threading.Thread(target=self.save, name="search-index-save", daemon=True).start()
+    
+    def start(self):
+        """Load or build the index in a background thread, unless that has happened already"""
+        with self._queue_lock:
+            if self._loaded or not self._ready.is_set():
+                return
+            self._ready.clear()
+        threading.Thread(target=self._build, name="search-index", daemon=True).start()
+    
+    def _build(self):
+        try:
+            self.sync()
+        finally:
+            with self._lock, self._queue_lock:
+                for post_id, post, previous in self._queued:
+                    self._apply(post_id, post, previous)
+                self._queued = []
+                self._ready.set()
+    
+    def wait(self):
+        """Block until the background build, if any, has finished"""
+        self._ready.wait()
+    
+    def sync(self):
+        """Bring the index in line with storage if storage changed since the last sync"""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            token = self.storage.change_token()
+            if token is not None and token == self._token:
+                return
+            
+            stamps = self.storage.get_post_stamps()
+            stale = [post_id for post_id, stamp in stamps.items() if self._stamps.get(post_id) != tuple(stamp)]
+            removed = [post_id for post_id in self._stamps if post_id not in stamps]
+            rebuilt = len(stale) > 0 and len(stale) == len(stamps)
+            with _gc_paused():
+                if rebuilt:
+                    # Nothing in the index is still current, so start numbering afresh
+                    self._reset()
+                else:
+                    self._remove_posts(removed + stale)
+                posts = self.storage.get_posts(stale) if stale else []
+                for start in range(0, len(posts), INDEX_BATCH_SIZE):
+                    self._add_posts(posts[start:start + INDEX_BATCH_SIZE])
+            
+            self._token = token
+        
+        # A (re)build is expensive enough to persist straight away, though not
+        # on the thread that asked; small changes are saved at exit
+        if rebuilt:
+            self._save_in_background()
+    
+    def _add_posts(self, posts):
+        """Index posts that aren't in the index yet
+        
+        Their postings are collected in lists, which grow much faster than
+        arrays, and appended to the arrays once per trigram and term: new
+        numbers are the highest yet, so the arrays stay sorted.
+        """
+        new_postings = defaultdict(list)
+        new_term_postings = defaultdict(lambda: ([], []))
+        ids = self._ids
+        for post in posts:
+            post_id = post["id"]
+            number = len(ids)
+            ids.append(post_id)
+            self._numbers[post_id] = number
+            for postings in map(new_postings.__getitem__, _post_grams(post)):
+                postings.append(number)
+            
+            frequencies, lengths = _post_terms(post)
+            for term, counts in frequencies.items():
+                numbers, term_counts = new_term_postings[term]
+                numbers.append(number)
+                term_counts += counts
+            self._doc_lengths.extend(lengths)
+            for position, length in enumerate(lengths):
+                self._total_lengths[position] += length
+            self._stamps[post_id] = _post_stamp(post)
+        
+        postings_by_gram = self._postings
+        for gram, numbers in new_postings.items():
+            postings = postings_by_gram.get(gram)
+            if postings is None:
+                postings_by_gram[gram] = array('i', numbers)
+            else:
+                postings.fromlist(numbers)
+        term_postings = self._term_postings
+        for term, (numbers, counts) in new_term_postings.items():
+            postings = term_postings.get(term)
+            if postings is None:
+                term_postings[term] = (array('i', numbers), array('I', counts))
+            else:
+                postings[0].fromlist(numbers)
+                postings[1].fromlist(counts)
+        self._dirty = True
+    
+    def _forget_post(self, post_id):
+        """Drop a post's number, lengths and stamp once it is out of every posting list"""
+        number = self._numbers.pop(post_id)
+        self._ids[number] = None
+        for position in range(3):
+            self._total_lengths[position] -= self._doc_lengths[3 * number + position]
+            self._doc_lengths[3 * number + position] = 0
+        del self._stamps[post_id]
+        self._dirty = True
+    
+    def _discard_term(self, term, number):
+        """Remove a post's number and frequencies from a term's postings"""
+        postings = self._term_postings.get(term)
+        if postings is None:
+            return
+        numbers, counts = postings
+        i = _discard(numbers, number)
+        if i is not None:
+            del counts[3 * i:3 * i + 3]
+            if not numbers:
+                del self._term_postings[term]
+    
+    def _remove_post(self, post):
+        """Drop a post from the posting lists of its own trigrams and terms
+        
+        post must hold the text the post was indexed with, so this only
+        touches the lists the post is in.
+        """
+        number = self._numbers[post["id"]]
+        for gram in _post_grams(post):
+            postings = self._postings.get(gram)
+            if postings is not None and _discard(postings, number) is not None and not postings:
+                del self._postings[gram]
+        for term in _post_terms(post)[0]:
+            self._discard_term(term, number)
+        self._forget_post(post["id"])
+    
+    def _remove_posts(self, post_ids):
+        """Drop posts whose indexed text isn't known from every posting list in a single pass
+        
+        Posts don't remember their own trigrams (that would double the index
+        size), so removal sweeps all posting lists once per batch instead:
+        a binary search per list and post for a few posts, a filter of each
+        list for more.
+        """
+        post_ids = [post_id for post_id in post_ids if post_id in self._numbers]
+        if not post_ids:
+            return
+        numbers = sorted(self._numbers[post_id] for post_id in post_ids)
+        
+        if len(numbers) <= SWEEP_SEARCH_LIMIT:
+            for gram, postings in list(self._postings.items()):
+                for number in numbers:
+                    _discard(postings, number)
+                if not postings:
+                    del self._postings[gram]
+            for term in list(self._term_postings):
+                for number in numbers:
+                    self._discard_term(term, number)
+        else:
+            removed = set(numbers)
+            for gram, postings in list(self._postings.items()):
+                kept = array('i', filterfalse(removed.__contains__, postings))
+                if not kept:
+                    del self._postings[gram]
+                elif len(kept) < len(postings):
+                    self._postings[gram] = kept
+            for term, (postings, counts) in list(self._term_postings.items()):
+                kept = [i for i, number in enumerate(postings) if number not in removed]
+                if not kept:
+                    del self._term_postings[term]
+                elif len(kept) < len(postings):
+                    self._term_postings[term] = (array('i', map(postings.__getitem__, kept)),
+                                                 array('I', [count for i in kept for count in counts[3 * i:3 * i + 3]]))
+        for post_id in post_ids:
+            self._forget_post(post_id)
+    
+    def _unindex(self, post_id, previous):
+        """Remove a post, through its own postings if previous is the version that was indexed"""
+        if post_id not in self._stamps:
+            return
+        if previous is not None and self._stamps[post_id] == _post_stamp(previous):
+            self._remove_post(previous)
+        else:
+            self._remove_posts([post_id])
+    
+    def _apply(self, post_id, post, previous):
+        """Reindex a post as post, or drop it if post is None"""
+        if self._loaded:
+            self._unindex(post_id, previous)
+            if post is not None:
+                self._add_posts([post])
+    
+    def _update(self, post_id, post, previous):
+        with self._queue_lock:
+            if not self._ready.is_set():
+                # The build may or may not see this change; applying it afterwards is right either way
+                self._queued.append((post_id, post, previous))
+                return
+        with self._lock:
+            self._apply(post_id, post, previous)
+    
+    def add_post(self, post, previous=None):
+        """Index a newly created or updated post
+        
+        For an update, pass the post as it was before as previous, so only
+        the postings of its old text have to be removed.
+        """
+        self._update(post["id"], post, previous)
+    
+    def remove_post(self, post_id, previous=None):
+        """Drop a deleted post from the index; previous is the deleted post, if known"""
+        self._update(post_id, None, previous)
+    
+    def candidates(self, query):
+        """Ids of posts that may contain query, or None if it can't be narrowed down
+        
+        None too while the index is still being built, rather than waiting for it.
+        """
+        query = query.lower()
+        if len(query) < GRAM_SIZE or not self._ready.is_set():
+            return None
+        self.sync()
+        with self._lock:
+            grams = set(map(''.join, zip(query, query[1:], query[2:])))
+            postings = sorted((self._postings.get(gram, ()) for gram in grams), key=len)
+            result = set(postings[0])
+            for numbers in postings[1:]:
+                if not result:
+                    break
+                if len(result) * 16 < len(numbers):
+                    # Few candidates left: binary-search each rather than walk the whole array
+                    result = {number for number in result if _contains(numbers, number)}
+                else:
+                    result.intersection_update(numbers)
+            ids = self._ids
+            return {ids[number] for number in result}
+    
+    def ranked(self, query, limit, offset=0):
+        """Rank posts by BM25F relevance to query
+        
+        Returns (total, post_ids) where total counts the posts containing any
+        query term and post_ids holds only the ranks offset..offset+limit, best
+        first. A bounded heap keeps just the top offset+limit scores.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return 0, []
+        self.wait()
+        self.sync()
+        with self._lock:
+            doc_count = len(self._stamps)
+            if not doc_count:
+                return 0, []
+            average_lengths = [max(total / doc_count, 1e-9) for total in self._total_lengths]
+            doc_lengths = self._doc_lengths
+            
+            scores = {}
+            for term in terms:
+                postings = self._term_postings.get(term)
+                if postings is None:
+                    continue
+                numbers, counts = postings
+                idf = math.log(1 + (doc_count - len(numbers) + 0.5) / (len(numbers) + 0.5))
+                for i, number in enumerate(numbers):
+                    weighted_tf = 0.0
+                    for position in range(3):
+                        frequency = counts[3 * i + position]
+                        if frequency:
+                            normalizer = (1 - BM25_B + BM25_B * doc_lengths[3 * number + position]
+                                          / average_lengths[position])
+                            weighted_tf += FIELD_WEIGHTS[position] * frequency / normalizer
+                    scores[number] = scores.get(number, 0.0) + idf * weighted_tf / (BM25_K1 + weighted_tf)
+            
+            # Equal scores fall back to newest first, like the unranked listing
+            ids, stamps = self._ids, self._stamps
+            top = heapq.nlargest(offset + limit, scores.items(),
+                                 key=lambda item: (item[1], stamps[ids[item[0]]][0]))
+            return len(scores), [ids[number] for number, _ in top[offset:]]
+    
+    def save_if_dirty(self):
+        # Not while the background build runs: at exit that would wait for it to finish
+        if not self._ready.is_set():
+            return
+        # A background save already under way counts as clean; let it finish
+        # so the interpreter doesn't kill its thread halfway at exit
+        with self._save_lock:
+            pass
+        if self._dirty:
+            self.save()
+
+def get_search_index(storage):
+    """Get the process-wide search index for a storage backend, creating it if needed"""
+    with _indexes_lock:
+        index = _indexes.get(storage.storage_key)
+        if index is None:
+            index = SearchIndex(storage, storage.sidecar_path(".search.idx"))
+            _indexes[storage.storage_key] = index
+            index.start()
+        return index
+
+@atexit.register
+def save_all():
+    """Persist every index that changed since it was last saved"""
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        try:
+            index.save_if_dirty()
+        except Exception:
+            pass
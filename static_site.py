@@ -0,0 +1,268 @@
+"""Static HTML export of the blog
+
+build_site renders the home page listing, a page per post, a listing per
+author and an author index to plain HTML files any web server can serve,
+with the app's theme CSS and post templates (templates.py) and the display
+fields utils.derive_post_fields stores with each post.
+
+Builds are incremental. A manifest in the output directory keeps a
+fingerprint of what every page was rendered from: a hash of the fields a
+post page shows, content included, and for a listing page a hash of its
+cards and its place in the pagination. A rebuild renders only the pages
+whose fingerprint changed (an edit or a like re-renders the post's page and
+the listing pages its card is on), removes the pages of deleted posts and
+authors, and leaves every other file alone. Rendering is fanned out over a
+process pool.
+"""
+import hashlib
+import html
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import quote
+
+from templates import render_post_card, render_post_view, theme_css
+from utils import sanitize_filename, truncate_content
+
+MANIFEST_NAME = ".build.json"
+# Bump whenever the page markup below changes, so the next build renders every page
+BUILD_FORMAT = 1
+# Pages rendered per process pool task; smaller builds are rendered in this process
+BATCH_SIZE = 100
+AUTHORS_INDEX = "authors/index.html"
+
+# Fields shown on a post card, and on a post's own page
+CARD_FIELDS = ("title", "author", "created_display", "reading_time", "likes", "preview")
+PAGE_FIELDS = ("title", "author", "created_display", "reading_time", "likes", "updated_at", "updated_display",
+               "content")
+
+# Page layout around the theme, which otherwise relies on Streamlit's own styles
+PAGE_CSS = {
+    False: """
+        body { margin: 0; font-family: sans-serif; background: #ffffff; color: #262730; }
+        .site { max-width: 900px; margin: 0 auto; padding: 1rem; }
+        .site-nav, .pagination-container { display: flex; gap: 20px; margin: 1rem 0; }
+        .site-nav a, .pagination-container a, .author-list a { color: #667eea; text-decoration: none; }
+        a.post-link { color: inherit; text-decoration: none; }
+    """,
+    True: """
+        body { margin: 0; font-family: sans-serif; background: #1a1a1a; color: #ffffff; }
+        .site { max-width: 900px; margin: 0 auto; padding: 1rem; }
+        .site-nav, .pagination-container { display: flex; gap: 20px; margin: 1rem 0; }
+        .site-nav a, .pagination-container a, .author-list a { color: #a3bffa; text-decoration: none; }
+        a.post-link { color: inherit; text-decoration: none; }
+    """,
+}
+
+def home_path(page):
+    """Path of a home page listing, relative to the output directory"""
+    return "index.html" if page == 1 else f"page/{page}.html"
+
+def post_path(post_id):
+    """Path of a post's page, relative to the output directory"""
+    return f"posts/{sanitize_filename(post_id)}.html"
+
+def author_slug(author):
+    """File name stem of an author's pages: readable, and unique however names sanitize"""
+    key = author.lower()
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:8]
+    return f"{sanitize_filename(key).replace(' ', '-')[:60]}-{digest}"
+
+def author_path(slug, page):
+    """Path of an author's listing page, relative to the output directory"""
+    return f"authors/{slug}.html" if page == 1 else f"authors/{slug}-{page}.html"
+
+def _fingerprint(*parts):
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+def _escaped(post, fields):
+    """Copy of the given fields of a post with every string HTML-escaped"""
+    return {field: html.escape(value) if isinstance(value, str) else value
+            for field, value in ((field, post.get(field)) for field in fields)}
+
+def _root(path):
+    """Relative link from the page at path to the output directory"""
+    return "../" * path.count("/")
+
+def _href(root, path):
+    return html.escape(root + quote(path))
+
+def _document(path, title, body, dark_mode, description=None):
+    """A complete page around body; title and description must be escaped already"""
+    root = _root(path)
+    meta = f'<meta name="description" content="{description}">\n' if description else ""
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+{meta}<title>{title}</title>
+{theme_css(dark_mode)}
+<style>{PAGE_CSS[dark_mode]}</style>
+</head>
+<body>
+<div class="site">
+<nav class="site-nav"><a href="{_href(root, home_path(1))}">🏠 Home</a><a href="{_href(root, AUTHORS_INDEX)}">👥 Authors</a></nav>
+{body}
+</div>
+</body>
+</html>
+"""
+
+def render_post_page(path, post, description, slug, dark_mode):
+    """A post's own page; post holds escaped PAGE_FIELDS"""
+    body = f"""
+    {render_post_view(post)}
+    <nav class="pagination-container"><a href="{_href(_root(path), author_path(slug, 1))}">👤 More by {post['author']}</a></nav>
+    """
+    return _document(path, f"{post['title']} - Personal Blog", body, dark_mode, description)
+
+def render_listing_page(path, heading, cards, page, pages, page_paths, dark_mode):
+    """A page of post cards; heading is HTML, cards hold escaped CARD_FIELDS and their post's path"""
+    root = _root(path)
+    items = "".join(f'<a class="post-link" href="{_href(root, card["path"])}">{render_post_card(card)}</a>'
+                    for card in cards)
+    if not cards:
+        items = '<div class="empty-state"><h3>📝 No Posts Yet</h3></div>'
+    newer = f'<a href="{_href(root, page_paths[0])}">← Newer</a>' if page_paths[0] else ""
+    older = f'<a href="{_href(root, page_paths[1])}">Older →</a>' if page_paths[1] else ""
+    body = f"""
+    {heading}
+    {items}
+    <nav class="pagination-container">{newer}<span>Page {page} of {pages}</span>{older}</nav>
+    """
+    return _document(path, f"Personal Blog - Page {page}", body, dark_mode)
+
+def render_authors_page(path, authors, dark_mode):
+    """The author index; authors are (escaped name, slug, posts, likes) tuples"""
+    root = _root(path)
+    items = "".join(f'<li><a href="{_href(root, author_path(slug, 1))}">👤 {name}</a> - '
+                    f'📝 {posts} post(s) | ❤️ {likes} likes</li>'
+                    for name, slug, posts, likes in authors)
+    body = f"""
+    <div class="welcome-banner"><h1>👥 Authors</h1></div>
+    <ul class="author-list">{items}</ul>
+    """
+    return _document(path, "Personal Blog - Authors", body, dark_mode)
+
+def _write_pages(output_dir, jobs):
+    """Render and write a batch of (path, render function, arguments) jobs; runs in the pool's workers"""
+    for path, render, args in jobs:
+        target = Path(output_dir) / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so a server never sends a half-written page
+        temp_file = target.with_name(f"{target.name}.tmp")
+        temp_file.write_text(render(path, *args), encoding='utf-8')
+        os.replace(temp_file, target)
+    return len(jobs)
+
+def _listing_jobs(path_of, heading, cards, per_page, dark_mode):
+    """(path, fingerprint, job) for each page of a listing of cards"""
+    pages = max(1, -(-len(cards) // per_page))
+    for page in range(1, pages + 1):
+        page_cards = cards[(page - 1) * per_page:page * per_page]
+        page_paths = (path_of(page - 1) if page > 1 else None, path_of(page + 1) if page < pages else None)
+        path = path_of(page)
+        yield path, _fingerprint(heading, page_cards, page, pages), \
+            (path, render_listing_page, (heading, page_cards, page, pages, page_paths, dark_mode))
+
+def build_site(manager, output_dir, per_page=10, dark_mode=False, workers=None, force=False):
+    """Render the blog to static HTML in output_dir, re-rendering only pages that changed
+    
+    workers is the size of the process pool (default: one per CPU; 1 renders
+    everything in this process); force renders every page. Returns a dict
+    counting the pages rendered, left unchanged and removed.
+    """
+    output_dir = Path(output_dir)
+    manifest_file = output_dir / MANIFEST_NAME
+    settings = {"format": BUILD_FORMAT, "per_page": per_page, "dark_mode": dark_mode,
+                "theme": _fingerprint(theme_css(dark_mode), PAGE_CSS[dark_mode])}
+    previous = {}
+    if not force:
+        try:
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            # Pages rendered with other settings all look different now
+            if manifest.get("settings") == settings:
+                previous = manifest["pages"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+    
+    workers = workers or os.cpu_count() or 1
+    fingerprints = {}
+    batch = []
+    futures = []
+    executor = None
+    rendered = 0
+    
+    def schedule(path, fingerprint, job):
+        nonlocal executor, rendered, batch
+        fingerprints[path] = fingerprint
+        if previous.get(path) == fingerprint and (output_dir / path).exists():
+            return
+        batch.append(job)
+        rendered += 1
+        if len(batch) >= BATCH_SIZE and workers > 1:
+            if executor is None:
+                executor = ProcessPoolExecutor(workers)
+            futures.append(executor.submit(_write_pages, output_dir, batch))
+            batch = []
+    
+    try:
+        cards = []
+        # Posts are streamed, so only the pages still to render hold a post's content
+        for post in manager.export_posts():
+            page_post = _escaped(post, PAGE_FIELDS)
+            slug = author_slug(post["author"])
+            path = post_path(post["id"])
+            description = html.escape(truncate_content(post["content"], 160))
+            schedule(path, _fingerprint(page_post), (path, render_post_page, (page_post, description, slug, dark_mode)))
+            card = _escaped(post, CARD_FIELDS)
+            card["path"] = path
+            cards.append((post["created_at"], post["id"], slug, card))
+        cards.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        
+        for job in _listing_jobs(home_path, '<div class="welcome-banner"><h1>🌟 Welcome to My Personal Blog</h1></div>',
+                                 [card for _, _, _, card in cards], per_page, dark_mode):
+            schedule(*job)
+        
+        by_author = {}
+        for _, _, slug, card in cards:
+            by_author.setdefault(slug, []).append(card)
+        authors = []
+        for slug, author_cards in by_author.items():
+            # Posts newest first, so this is the spelling the author uses now
+            name = author_cards[0]["author"]
+            likes = sum(card["likes"] or 0 for card in author_cards)
+            authors.append((name, slug, len(author_cards), likes))
+            # Likes are totalled on the author index only, so a like doesn't re-render every page of its author
+            heading = f'<div class="welcome-banner"><h1>👤 {name}</h1><p>📝 {len(author_cards)} post(s)</p></div>'
+            for job in _listing_jobs(lambda page, slug=slug: author_path(slug, page), heading,
+                                     author_cards, per_page, dark_mode):
+                schedule(*job)
+        authors.sort(key=lambda author: (-author[2], author[0].lower()))
+        schedule(AUTHORS_INDEX, _fingerprint(authors), (AUTHORS_INDEX, render_authors_page, (authors, dark_mode)))
+        
+        if batch:
+            _write_pages(output_dir, batch)
+        for future in futures:
+            future.result()
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    
+    removed = 0
+    for path in previous.keys() - fingerprints.keys():
+        try:
+            (output_dir / path).unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+    
+    output_dir.mkdir(parents=True, exist_ok=True)
+    temp_file = manifest_file.with_name(f"{MANIFEST_NAME}.tmp")
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump({"settings": settings, "pages": fingerprints}, f)
+    os.replace(temp_file, manifest_file)
+    return {"rendered": rendered, "unchanged": len(fingerprints) - rendered, "removed": removed}
@@ -0,0 +1,2046 @@
+import base64
+import bisect
+import heapq
+import json
+import mmap
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from contextlib import closing
+from itertools import chain, islice
+from pathlib import Path
+
+import metrics
+from json_stream import iter_json_array
+from post import FIELD_DEFAULTS, POST_FIELDS, SUMMARY_FIELDS, Post, json_default
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within one process
+    fcntl = None
+
+try:
+    import lzma
+except ImportError:  # Python built without liblzma
+    lzma = None
+
+# Parsed posts shared by every file-backed storage in the process, keyed by
+# (resolved data file path, storage class). Each entry is
+# (storage_signature, PostSnapshot, journal_offset) and is only re-parsed when the
+# signature changes, e.g. after another process wrote the files.
+_post_cache = {}
+_post_cache_lock = threading.Lock()
+
+# JSON data files at least this big are streamed through for single queries
+# instead of being parsed whole (see JsonFileStorage)
+STREAM_THRESHOLD_BYTES = 32 * 1024 * 1024
+
+# CompressedStorage bodies shorter than this many characters aren't worth compressing
+COMPRESS_THRESHOLD = 1024
+# Decompressed bodies each CompressedStorage keeps for repeated reads
+BODY_CACHE_SIZE = 64
+
+# (compress, decompress) of bytes for each CompressedStorage codec
+CODECS = {"zlib": (zlib.compress, zlib.decompress)}
+if lzma is not None:
+    CODECS["lzma"] = (lzma.compress, lzma.decompress)
+
+# How ShardedStorage spreads posts over its shards, and its default number of hash shards
+SHARD_SCHEMES = ("month", "hash")
+SHARD_COUNT = 16
+_MONTH = re.compile(r"\d{4}-\d{2}")
+
+# Write locks shared by every storage in the process, keyed by lock file path
+_file_locks = {}
+_file_locks_lock = threading.Lock()
+
+class VersionConflict(Exception):
+    """Raised when a post changed since the version the caller based its update on"""
+    
+    def __init__(self, post_id, expected_version, actual_version):
+        super().__init__("Post was changed by someone else; reload it and try again")
+        self.post_id = post_id
+        self.expected_version = expected_version
+        self.actual_version = actual_version
+
+def _next_version(post, expected_version=None):
+    """Return the version a post gets on its next update, checking expected_version first"""
+    version = post.get("version", 1)
+    if expected_version is not None and version != expected_version:
+        raise VersionConflict(post["id"], expected_version, version)
+    return version + 1
+
+class FileLock:
+    """Exclusive advisory lock on a file, held across processes with fcntl.flock
+    
+    Re-entrant within a thread, so a locked mutation can call compact() which
+    locks again. Use get_file_lock so all storages in a process share one
+    instance per lock file.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+    
+    def __enter__(self):
+        self._lock.acquire()
+        if self._depth == 0:
+            try:
+                self._file = open(self.path, 'ab')
+                if fcntl is not None:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            except Exception:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._lock.release()
+                raise
+        self._depth += 1
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0:
+            # Closing the file releases the flock
+            self._file.close()
+            self._file = None
+        self._lock.release()
+
+def get_file_lock(path):
+    """Get the process-wide lock for a lock file"""
+    key = str(Path(path).resolve())
+    with _file_locks_lock:
+        lock = _file_locks.get(key)
+        if lock is None:
+            lock = FileLock(path)
+            _file_locks[key] = lock
+        return lock
+
+def _atomic_write_json(path, data, default=json_default, **dump_options):
+    """Write JSON to a temp file and move it over path, so readers never see a partial file"""
+    temp_file = Path(f"{path}.tmp")
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, default=default, **dump_options)
+        f.flush()
+        os.fsync(f.fileno())
+        metrics.bytes_written(f.tell())
+    os.replace(temp_file, path)
+
+def _file_signature(path):
+    """Return (mtime, size, inode) for a file, or None if it doesn't exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+def _apply_record(posts, by_id, record):
+    """Apply one journal record to posts and their by_id index, returning True if it removed a post"""
+    op = record.get("op")
+    if op in ("create", "create_many"):
+        for post in record["posts"] if op == "create_many" else [record["post"]]:
+            existing = by_id.get(post["id"])
+            if existing is not None:
+                # Replaying after an interrupted compaction; the snapshot already has it
+                existing.update(post)
+            else:
+                posts.append(post)
+                by_id[post["id"]] = post
+    elif op == "update":
+        post = by_id.get(record["id"])
+        if post is not None:
+            post.update(record["fields"])
+    elif op == "likes":
+        # Written by versions that still bumped the post version on likes
+        versions = record.get("versions", {})
+        for post_id, likes in record["likes"].items():
+            post = by_id.get(post_id)
+            if post is not None:
+                post["likes"] = likes
+                if post_id in versions:
+                    post["version"] = versions[post_id]
+    elif op == "update_many":
+        for post_id, fields in record["updates"].items():
+            post = by_id.get(post_id)
+            if post is not None:
+                post.update(fields)
+    elif op == "delete":
+        return by_id.pop(record["id"], None) is not None
+    return False
+
+def _apply_journal_records(posts, records):
+    """Replay journal records onto a list of posts in place"""
+    by_id = {post["id"]: post for post in posts}
+    removed = False
+    for record in records:
+        removed |= _apply_record(posts, by_id, record)
+    if removed:
+        posts[:] = [post for post in posts if by_id.get(post["id"]) is post]
+
+def _rebase_staged_records(posts, records):
+    """Replay staged records onto posts another process has written since they were staged
+    
+    Likes are re-applied as the deltas they were made from and edits'
+    versions are renumbered from each post's current one, so the other
+    process's likes and edits are added to rather than overwritten. Applies
+    the records to posts in place and returns them as applied, with absolute
+    counts and versions again like any journal record.
+    """
+    by_id = {post["id"]: post for post in posts}
+    removed = False
+    rebased = []
+    for record in records:
+        op = record["op"]
+        if op == "likes":
+            likes = {post_id: max(0, by_id[post_id].get("likes", 0) + delta)
+                     for post_id, delta in record["deltas"].items() if post_id in by_id}
+            record = dict(record, likes=likes)
+        elif op == "update":
+            post = by_id.get(record["id"])
+            if post is not None:
+                record = dict(record, fields=dict(record["fields"], version=_next_version(post)))
+        elif op == "update_many":
+            record = dict(record, updates={post_id: dict(fields, version=_next_version(by_id[post_id]))
+                                           for post_id, fields in record["updates"].items() if post_id in by_id})
+        removed |= _apply_record(posts, by_id, record)
+        rebased.append(record)
+    if removed:
+        posts[:] = [post for post in posts if by_id.get(post["id"]) is post]
+    return rebased
+
+class StorageBackend:
+    """Interface BlogManager uses to persist and query posts
+    
+    Backends only have to implement load_posts, save_posts and the three
+    mutations; the query methods fall back to scanning load_posts() and can be
+    overridden with something faster.
+    
+    get_post, get_posts and load_posts always return full posts. The listing
+    methods (list_posts, get_posts_page, get_posts_by_author) return post
+    summaries, which may leave out "content" on backends that store bodies
+    separately.
+    """
+    
+    # Whether mutations can be staged in memory and written later by a
+    # write_queue.WriteQueue; backends without it write every mutation at once
+    WRITE_BEHIND = False
+    # The WriteQueue staged mutations are handed to, attached by get_write_queue
+    write_queue = None
+    
+    @property
+    def storage_key(self):
+        """Identifies the underlying store, so process-wide state can be shared per store"""
+        return id(self)
+    
+    def change_token(self):
+        """Value that changes whenever the stored posts change, or None if unknown"""
+        return None
+    
+    def sidecar_path(self, suffix):
+        """Path for an auxiliary file stored next to the data, or None if not file based"""
+        return None
+    
+    def load_posts(self):
+        """Return every post in storage order; callers must not modify the list"""
+        raise NotImplementedError
+    
+    def load_post_summaries(self):
+        """Like load_posts, but posts may come without their content"""
+        return self.load_posts()
+    
+    def iter_posts(self):
+        """Yield every full post in storage order
+        
+        Backends that can read posts a few at a time override this, so
+        exporting a large store doesn't need all of it in memory at once.
+        """
+        yield from self.load_posts()
+    
+    def iter_post_summaries(self):
+        """Like iter_posts, but posts may come without their content"""
+        yield from self.load_post_summaries()
+    
+    def save_posts(self, posts):
+        """Replace the stored posts with the given list"""
+        raise NotImplementedError
+    
+    def insert_post(self, post):
+        """Store a new post"""
+        raise NotImplementedError
+    
+    def insert_posts(self, posts):
+        """Store several new posts from an iterable, ideally in one write; returns how many"""
+        count = 0
+        for post in posts:
+            self.insert_post(post)
+            count += 1
+        return count
+    
+    def update_post(self, post_id, fields, expected_version=None):
+        """Update fields of a post, returning the updated post or None if missing
+        
+        Every update bumps the post's version. With expected_version, the
+        update is a compare-and-swap: it raises VersionConflict instead if the
+        post's version has moved on since the caller read it. Likes aren't
+        versioned (see adjust_likes), so they never make an edit conflict.
+        """
+        raise NotImplementedError
+    
+    def delete_post(self, post_id):
+        """Delete a post, returning False if it didn't exist"""
+        raise NotImplementedError
+    
+    def update_posts(self, updates):
+        """Apply {post_id: fields} updates to several posts, ideally in one write"""
+        for post_id, fields in updates.items():
+            self.update_post(post_id, fields)
+    
+    def adjust_likes(self, post_id, delta):
+        """Add delta to a post's likes (never below zero) and return the new count
+        
+        Backends override this (and apply_like_deltas) to change the likes
+        without bumping the post's version, so a like landing while someone
+        edits the post doesn't turn their save into a VersionConflict. This
+        fallback only has update_post to work with, and so does bump it.
+        """
+        while True:
+            post = self.get_post(post_id)
+            if post is None:
+                return None
+            likes = max(0, post.get("likes", 0) + delta)
+            try:
+                self.update_post(post_id, {"likes": likes}, expected_version=post.get("version", 1))
+            except VersionConflict:
+                # Someone else changed the post in between; retry on the new value
+                continue
+            return likes
+    
+    def apply_like_deltas(self, deltas):
+        """Apply several like deltas at once, returning {post_id: new_likes} for posts that exist"""
+        results = {}
+        for post_id, delta in deltas.items():
+            likes = self.adjust_likes(post_id, delta)
+            if likes is not None:
+                results[post_id] = likes
+        return results
+    
+    def get_post(self, post_id):
+        """Get a post by ID"""
+        for post in self.load_posts():
+            if post["id"] == post_id:
+                return post
+        return None
+    
+    def get_posts(self, post_ids):
+        """Get several posts by ID in one pass, skipping missing ones"""
+        post_ids = set(post_ids)
+        return [post for post in self.load_posts() if post["id"] in post_ids]
+    
+    def get_post_stamps(self):
+        """Map every post ID to [created_at, updated_at] without reading post bodies"""
+        return {post["id"]: [post["created_at"], post.get("updated_at")] for post in self.load_post_summaries()}
+    
+    def list_posts(self):
+        """Get all posts sorted by creation date (newest first)"""
+        return sorted(self.load_post_summaries(), key=lambda x: (x['created_at'], x['id']), reverse=True)
+    
+    def get_posts_page(self, cursor=None, limit=5, author=None):
+        """Get one page of posts, newest first, using keyset pagination
+        
+        cursor is None for the first page, otherwise the next_cursor returned
+        with the previous page: a (created_at, id) key that the page starts
+        strictly below. With author, only that author's posts (compared
+        case-insensitively) are paged through. Returns (posts, next_cursor),
+        where next_cursor is None on the last page.
+        """
+        posts = self.list_posts()
+        if author is not None:
+            author = author.lower()
+            posts = [post for post in posts if post["author"].lower() == author]
+        if cursor is not None:
+            cursor = tuple(cursor)
+            posts = [post for post in posts if (post["created_at"], post["id"]) < cursor]
+        page = posts[:limit]
+        next_cursor = (page[-1]["created_at"], page[-1]["id"]) if len(posts) > limit else None
+        return page, next_cursor
+    
+    def get_posts_by_author(self, author):
+        """Get all posts by an author, compared case-insensitively, oldest first"""
+        author = author.lower()
+        return sorted((post for post in self.load_post_summaries() if post["author"].lower() == author),
+                      key=lambda x: (x['created_at'], x['id']))
+    
+    def count_posts(self, author=None):
+        """Get the number of stored posts, or of one author's posts"""
+        if author is not None:
+            return len(self.get_posts_by_author(author))
+        return len(self.load_post_summaries())
+    
+    def total_likes(self):
+        """Get the sum of likes across all posts"""
+        return sum(post.get("likes", 0) for post in self.load_post_summaries())
+    
+    def get_stats(self):
+        """Get blog-wide aggregates
+        
+        Returns {"post_count", "total_likes", "latest_post_at", "authors"},
+        where authors maps each lowercased author name to {"author", "posts",
+        "likes"}. Backends that keep the aggregates up to date answer without
+        looking at individual posts.
+        """
+        posts = self.load_post_summaries()
+        return PostStats(posts).as_dict(max((post["created_at"] for post in posts), default=None))
+    
+    def compact(self):
+        """Reclaim space or fold logs back into the main store, if applicable"""
+    
+    def flush_writes(self):
+        """Write any mutations staged for write-behind, returning once they are on disk"""
+
+class PostStats:
+    """Post count, like total and per-author counts, adjusted as posts change"""
+    
+    def __init__(self, posts=()):
+        self.post_count = 0
+        self.total_likes = 0
+        self.authors = {}
+        for post in posts:
+            self.add(post)
+    
+    def add(self, post):
+        likes = post.get("likes", 0)
+        author = self.authors.get(post["author"].lower())
+        if author is None:
+            author = self.authors[post["author"].lower()] = {"author": post["author"], "posts": 0, "likes": 0}
+        author["posts"] += 1
+        author["likes"] += likes
+        self.post_count += 1
+        self.total_likes += likes
+    
+    def remove(self, post):
+        likes = post.get("likes", 0)
+        key = post["author"].lower()
+        author = self.authors[key]
+        author["posts"] -= 1
+        author["likes"] -= likes
+        if author["posts"] == 0:
+            del self.authors[key]
+        self.post_count -= 1
+        self.total_likes -= likes
+    
+    def as_dict(self, latest_post_at):
+        """Copy the aggregates into the dict returned by StorageBackend.get_stats"""
+        return {
+            "post_count": self.post_count,
+            "total_likes": self.total_likes,
+            "latest_post_at": latest_post_at,
+            "authors": {key: dict(author) for key, author in self.authors.items()},
+        }
+
+class PostSnapshot:
+    """Posts loaded from a file store plus lookup structures derived from them
+    
+    by_id, order (ascending (created_at, id) keys), by_author (the same
+    keys per lowercased author) and stats are built on first use and then
+    kept up to date by the storage's own mutations, so lookups, keyset pages,
+    author pages and the sidebar totals don't rescan or resort the posts.
+    
+    unwritten holds the journal-style records of mutations applied to the
+    snapshot that haven't been written to disk yet (see
+    JsonFileStorage.flush_writes); it is only ever non-empty with write-behind.
+    """
+    
+    def __init__(self, posts):
+        # Stored as Posts, which take a fraction of the memory of dicts
+        posts[:] = map(Post.of, posts)
+        self.posts = posts
+        self._by_id = None
+        self._order = None
+        self._by_author = None
+        self._stats = None
+        self.unwritten = []
+    
+    @property
+    def by_id(self):
+        if self._by_id is None:
+            self._by_id = {post["id"]: post for post in self.posts}
+        return self._by_id
+    
+    @property
+    def order(self):
+        if self._order is None:
+            self._order = sorted((post["created_at"], post["id"]) for post in self.posts)
+        return self._order
+    
+    @property
+    def by_author(self):
+        if self._by_author is None:
+            by_author = {}
+            for post in self.posts:
+                by_author.setdefault(post["author"].lower(), []).append((post["created_at"], post["id"]))
+            for keys in by_author.values():
+                keys.sort()
+            self._by_author = by_author
+        return self._by_author
+    
+    def _index_author(self, post):
+        bisect.insort(self._by_author.setdefault(post["author"].lower(), []), (post["created_at"], post["id"]))
+    
+    def _unindex_author(self, post):
+        author = post["author"].lower()
+        keys = self._by_author.get(author, [])
+        key = (post["created_at"], post["id"])
+        i = bisect.bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            del keys[i]
+        if not keys:
+            self._by_author.pop(author, None)
+    
+    @property
+    def stats(self):
+        if self._stats is None:
+            self._stats = PostStats(self.posts)
+        return self._stats
+    
+    def add(self, post):
+        post = Post.of(post)
+        self.posts.append(post)
+        if self._by_id is not None:
+            self._by_id[post["id"]] = post
+        if self._order is not None:
+            bisect.insort(self._order, (post["created_at"], post["id"]))
+        if self._by_author is not None:
+            self._index_author(post)
+        if self._stats is not None:
+            self._stats.add(post)
+    
+    def update(self, post, fields):
+        """Change fields of a post in this snapshot"""
+        reindex = (self._by_author is not None and "author" in fields
+                   and fields["author"].lower() != post["author"].lower())
+        if reindex:
+            self._unindex_author(post)
+        if self._stats is not None and ("likes" in fields or "author" in fields):
+            self._stats.remove(post)
+            post.update(fields)
+            self._stats.add(post)
+        else:
+            post.update(fields)
+        if reindex:
+            self._index_author(post)
+    
+    def remove(self, post):
+        # Found by identity: list.remove would compare the post with every other one field by field
+        posts = self.posts
+        del posts[next(i for i, other in enumerate(posts) if other is post)]
+        if self._stats is not None:
+            self._stats.remove(post)
+        if self._by_id is not None:
+            del self._by_id[post["id"]]
+        if self._by_author is not None:
+            self._unindex_author(post)
+        if self._order is not None:
+            key = (post["created_at"], post["id"])
+            i = bisect.bisect_left(self._order, key)
+            if i < len(self._order) and self._order[i] == key:
+                del self._order[i]
+    
+    def page(self, cursor, limit, author=None):
+        """Up to limit posts older than cursor, newest first, and the next cursor
+        
+        With author (lowercased), only that author's posts are paged through.
+        """
+        order = self.order if author is None else self.by_author.get(author, [])
+        end = len(order) if cursor is None else bisect.bisect_left(order, tuple(cursor))
+        start = max(0, end - limit)
+        keys = order[start:end]
+        keys.reverse()
+        next_cursor = keys[-1] if keys and start > 0 else None
+        by_id = self.by_id
+        return [by_id[post_id] for _, post_id in keys], next_cursor
+
+class BlobSnapshot(PostSnapshot):
+    """Post summaries from a SplitStorage index plus where each body is stored
+    
+    blobs maps post IDs to [offset, length] of the UTF-8 body in blob_file.
+    """
+    
+    def __init__(self, posts, blob_file, blobs):
+        super().__init__(posts)
+        self.blob_file = blob_file
+        self.blobs = blobs
+
+class JsonFileStorage(StorageBackend):
+    """Posts stored as one JSON array, rewritten in full on every mutation
+    
+    Mutations run under an advisory lock on a .lock file next to the data, so
+    several processes can share the data file: each one re-reads the file if
+    another process changed it, applies its change and writes the result to a
+    temp file that atomically replaces the data file. Readers never take the
+    lock and never see a partially written file.
+    
+    With a write queue attached, a mutation only updates the cached snapshot
+    and stages its record there; the queue's writer thread writes whatever
+    has been staged in one go shortly after. Until then the cached snapshot
+    stays authoritative for this process. If another process wrote in the
+    meantime, the staged records are replayed onto the files as that process
+    left them: likes as deltas, so both processes' likes count. Edits made
+    with an expected_version are written through at once instead, after the
+    staged records, so their version check sees every other process's writes.
+    """
+    
+    # Whether data_file is a plain JSON array of every post, which queries can stream through
+    STREAMABLE = True
+    WRITE_BEHIND = True
+    
+    def __init__(self, data_file, stream_threshold=STREAM_THRESHOLD_BYTES):
+        self.data_file = Path(data_file)
+        self.data_file.parent.mkdir(exist_ok=True)
+        self.stream_threshold = stream_threshold
+        self._cache_key = (str(self.data_file.resolve()), type(self).__name__)
+        self._write_lock = get_file_lock(self.data_file.with_suffix(".lock"))
+        with self._write_lock:
+            self._ensure_data_file_exists()
+    
+    @property
+    def storage_key(self):
+        return self._cache_key
+    
+    def _ensure_data_file_exists(self):
+        """Ensure the data file exists and is properly formatted"""
+        if not self.data_file.exists():
+            # Written directly rather than via save_posts, which for the
+            # journal backend would also discard an existing journal
+            _atomic_write_json(self.data_file, [])
+    
+    def _signature(self):
+        """Signature of every file the posts are read from"""
+        return _file_signature(self.data_file)
+    
+    def change_token(self):
+        return self._signature()
+    
+    def sidecar_path(self, suffix):
+        return self.data_file.with_suffix(suffix)
+    
+    def _read_snapshot(self):
+        """Parse the data file
+        
+        A file that can't be parsed raises instead of reading as empty, so
+        the next write can't silently replace every post with an empty list.
+        """
+        return list(self._iter_data_file())
+    
+    def _iter_data_file(self):
+        """Yield the posts in the data file one at a time, parsing it incrementally"""
+        try:
+            with open(self.data_file, 'r', encoding='utf-8') as f:
+                try:
+                    # Parsed straight into Posts, so no per-post dict is ever built
+                    yield from iter_json_array(f, object_pairs_hook=Post)
+                finally:
+                    metrics.bytes_read(f.buffer.tell())
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError as e:
+            raise Exception(f"Error loading posts from {self.data_file}: {str(e)}")
+    
+    def _streamed_posts(self):
+        """Iterator over the data file's posts for a one-off query, or None to use the snapshot
+        
+        A file of stream_threshold bytes or more whose posts aren't cached
+        yet is streamed instead of parsed whole, so queries like get_post and
+        count_posts run in bounded memory (and get_post stops at its post).
+        Every such query reads the file again; anything that needs the
+        snapshot, such as paging or a write, loads and caches it as usual.
+        """
+        if not self.STREAMABLE or self.stream_threshold is None:
+            return None
+        signature = self._signature()
+        if signature is None or signature[1] < self.stream_threshold:
+            return None
+        with _post_cache_lock:
+            cached = _post_cache.get(self._cache_key)
+        if cached is not None and (cached[0] == signature or cached[1].unwritten):
+            return None
+        return self._iter_data_file()
+    
+    def _read_posts(self, cached, signature):
+        """Read posts from disk, returning (PostSnapshot, journal_offset)"""
+        return PostSnapshot(self._read_snapshot()), None
+    
+    def _load_snapshot(self):
+        """Load posts from the shared cache, re-reading storage only if it changed
+        
+        The returned snapshot is shared with other callers and must only be
+        modified by methods that commit it straight back to storage.
+        """
+        signature = self._signature()
+        with _post_cache_lock:
+            cached = _post_cache.get(self._cache_key)
+        # A snapshot with staged mutations is newer than the files until flush_writes
+        # writes them (merging in any change made by another process meanwhile)
+        if cached is not None and (cached[0] == signature or cached[1].unwritten):
+            metrics.cache_lookup("posts", True)
+            return cached[1]
+        metrics.cache_lookup("posts", False)
+        
+        # The signature is taken before reading, so a concurrent write at worst
+        # causes one extra re-read on the next call, never a stale cache hit
+        with metrics.timer(f"{type(self).__name__}.read_posts"):
+            snapshot, offset = self._read_posts(cached, signature)
+        with _post_cache_lock:
+            _post_cache[self._cache_key] = (signature, snapshot, offset)
+        return snapshot
+    
+    def load_posts(self):
+        return self._load_snapshot().posts
+    
+    def _invalidate_cache(self):
+        """Drop the cached posts so the next load re-reads the files"""
+        with _post_cache_lock:
+            _post_cache.pop(self._cache_key, None)
+    
+    def _write_posts(self, posts):
+        """Atomically replace the JSON file with posts"""
+        try:
+            _atomic_write_json(self.data_file, posts, indent=2)
+        except Exception as e:
+            raise Exception(f"Error saving posts: {str(e)}")
+    
+    def save_posts(self, posts):
+        """Save posts to JSON file"""
+        posts = list(posts)
+        with self._write_lock:
+            self._write_posts(posts)
+            with _post_cache_lock:
+                _post_cache[self._cache_key] = (self._signature(), PostSnapshot(posts), None)
+    
+    def _commit(self, snapshot, record, write_through=False):
+        """Persist a mutation already applied to the cached snapshot (under the write lock)
+        
+        With a write queue the record is only staged for its writer thread,
+        unless write_through is set.
+        """
+        snapshot.unwritten.append(record)
+        if not write_through and self.write_queue is not None and self.write_queue.notify():
+            return
+        try:
+            self._write_staged()
+        except Exception:
+            # Drop the unwritten mutation from memory too, so the cache matches the files again
+            self._invalidate_cache()
+            raise
+    
+    def _write_staged(self):
+        """Write the cached snapshot's unwritten records (under the write lock)"""
+        signature = self._signature()
+        with _post_cache_lock:
+            cached = _post_cache.get(self._cache_key)
+        if cached is None or not cached[1].unwritten:
+            return
+        snapshot = cached[1]
+        if cached[0] != signature:
+            # Another process wrote since the snapshot was read; replay ours onto its version.
+            # Read from scratch, since the cached posts already carry the staged changes
+            fresh, offset = self._read_posts(None, signature)
+            fresh.unwritten = _rebase_staged_records(fresh.posts, snapshot.unwritten)
+            # Replayed creates add the posts as they were passed in
+            fresh.posts[:] = map(Post.of, fresh.posts)
+            with _post_cache_lock:
+                _post_cache[self._cache_key] = (signature, fresh, offset)
+            snapshot = fresh
+        self._write_snapshot(snapshot)
+    
+    def _write_snapshot(self, snapshot):
+        """Write the snapshot, unwritten records included, and mark it current"""
+        self._write_posts(snapshot.posts)
+        with _post_cache_lock:
+            _post_cache[self._cache_key] = (self._signature(), snapshot, None)
+        snapshot.unwritten = []
+    
+    def flush_writes(self):
+        with self._write_lock:
+            self._write_staged()
+    
+    def insert_post(self, post):
+        with self._write_lock:
+            snapshot = self._load_snapshot()
+            snapshot.add(post)
+            self._commit(snapshot, {"op": "create", "post": post})
+    
+    def insert_posts(self, posts):
+        with self._write_lock:
+            snapshot = self._load_snapshot()
+            posts = list(posts)
+            if not posts:
+                return 0
+            for post in posts:
+                snapshot.add(post)
+            self._commit(snapshot, {"op": "create_many", "posts": posts})
+            return len(posts)
+    
+    def update_post(self, post_id, fields, expected_version=None):
+        with self._write_lock:
+            if expected_version is not None:
+                # Checked against the files as they are now, not a snapshot another process wrote past
+                self._write_staged()
+            snapshot = self._load_snapshot()
+            post = snapshot.by_id.get(post_id)
+            if post is None:
+                return None
+            fields = dict(fields, version=_next_version(post, expected_version))
+            snapshot.update(post, fields)
+            self._commit(snapshot, {"op": "update", "id": post_id, "fields": fields},
+                         write_through=expected_version is not None)
+            return post
+    
+    def delete_post(self, post_id):
+        with self._write_lock:
+            snapshot = self._load_snapshot()
+            post = snapshot.by_id.get(post_id)
+            if post is None:
+                return False
+            snapshot.remove(post)
+            self._commit(snapshot, {"op": "delete", "id": post_id})
+            return True
+    
+    def update_posts(self, updates):
+        with self._write_lock:
+            snapshot = self._load_snapshot()
+            updates = {post_id: dict(fields, version=_next_version(snapshot.by_id[post_id]))
+                       for post_id, fields in updates.items() if post_id in snapshot.by_id}
+            if not updates:
+                return
+            for post_id, fields in updates.items():
+                snapshot.update(snapshot.by_id[post_id], fields)
+            self._commit(snapshot, {"op": "update_many", "updates": updates})
+    
+    def apply_like_deltas(self, deltas):
+        with self._write_lock:
+            snapshot = self._load_snapshot()
+            results = {}
+            for post_id, delta in deltas.items():
+                post = snapshot.by_id.get(post_id)
+                if post is not None:
+                    results[post_id] = max(0, post.get("likes", 0) + delta)
+                    # The version is left alone: it only guards edits
+                    snapshot.update(post, {"likes": results[post_id]})
+            if results:
+                # The deltas let a write-behind replay add to another process's likes
+                self._commit(snapshot, {"op": "likes", "likes": results,
+                                        "deltas": {post_id: deltas[post_id] for post_id in results}})
+            return results
+    
+    def adjust_likes(self, post_id, delta):
+        return self.apply_like_deltas({post_id: delta}).get(post_id)
+    
+    def iter_posts(self):
+        posts = self._streamed_posts()
+        yield from self.load_posts() if posts is None else posts
+    
+    def iter_post_summaries(self):
+        posts = self._streamed_posts()
+        yield from self.load_post_summaries() if posts is None else posts
+    
+    def get_post(self, post_id):
+        posts = self._streamed_posts()
+        if posts is None:
+            return self._load_snapshot().by_id.get(post_id)
+        with closing(posts):
+            for post in posts:
+                if post["id"] == post_id:
+                    return post
+        return None
+    
+    def count_posts(self, author=None):
+        posts = self._streamed_posts()
+        if posts is None:
+            snapshot = self._load_snapshot()
+            if author is None:
+                return snapshot.stats.post_count
+            return len(snapshot.by_author.get(author.lower(), ()))
+        if author is None:
+            return sum(1 for _ in posts)
+        author = author.lower()
+        return sum(1 for post in posts if post["author"].lower() == author)
+    
+    def get_posts_by_author(self, author):
+        posts = self._streamed_posts()
+        author = author.lower()
+        if posts is None:
+            snapshot = self._load_snapshot()
+            by_id = snapshot.by_id
+            return [by_id[post_id] for _, post_id in snapshot.by_author.get(author, [])]
+        # In by_author's (created_at, id) order rather than the file's
+        return sorted((post for post in posts if post["author"].lower() == author),
+                      key=lambda x: (x['created_at'], x['id']))
+    
+    def get_posts(self, post_ids):
+        by_id = self._load_snapshot().by_id
+        return [by_id[post_id] for post_id in post_ids if post_id in by_id]
+    
+    def list_posts(self):
+        snapshot = self._load_snapshot()
+        by_id = snapshot.by_id
+        return [by_id[post_id] for _, post_id in reversed(snapshot.order)]
+    
+    def get_posts_page(self, cursor=None, limit=5, author=None):
+        return self._load_snapshot().page(cursor, limit, None if author is None else author.lower())
+    
+    def total_likes(self):
+        posts = self._streamed_posts()
+        if posts is None:
+            return self._load_snapshot().stats.total_likes
+        return sum(post.get("likes", 0) for post in posts)
+    
+    def get_stats(self):
+        snapshot = self._load_snapshot()
+        order = snapshot.order
+        return snapshot.stats.as_dict(order[-1][0] if order else None)
+
+class JournalStorage(JsonFileStorage):
+    """JSON snapshot plus an append-only journal of mutations
+    
+    Each mutation appends one small idempotent record to a journal file next
+    to the snapshot (likes carry the absolute count), so a like costs the same
+    no matter how big the blog is. The journal is folded back into the
+    snapshot once it outgrows compact_ratio of the snapshot size.
+    """
+    
+    # The snapshot file alone misses whatever the journal changed
+    STREAMABLE = False
+    
+    def __init__(self, data_file, compact_ratio=0.5, compact_min_bytes=64 * 1024):
+        self.journal_file = Path(data_file).with_suffix(".journal")
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        super().__init__(data_file)
+    
+    def _signature(self):
+        return (_file_signature(self.data_file), _file_signature(self.journal_file))
+    
+    def _replay_journal(self, posts, offset):
+        """Apply journal records from offset onwards, returning the new offset
+        
+        A trailing line without a newline is a record still being written by
+        another process, so it is left for the next load.
+        """
+        try:
+            with open(self.journal_file, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+        metrics.bytes_read(len(data))
+        
+        end = data.rfind(b"\n") + 1
+        records = []
+        for line in data[:end].splitlines():
+            if line.strip():
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        _apply_journal_records(posts, records)
+        return offset + end
+    
+    def _read_posts(self, cached, signature):
+        if cached is not None and self._journal_only_grew(cached, signature):
+            # Only new journal records were appended; replay just the tail
+            posts = cached[1].posts
+            offset = self._replay_journal(posts, cached[2])
+            return PostSnapshot(posts), offset
+        posts = self._read_snapshot()
+        offset = self._replay_journal(posts, 0)
+        return PostSnapshot(posts), offset
+    
+    def _journal_only_grew(self, cached, signature):
+        """Check whether storage changed only by appends to the journal"""
+        old_snapshot, old_journal = cached[0]
+        new_snapshot, new_journal = signature
+        return (old_snapshot == new_snapshot
+                and old_journal is not None and new_journal is not None
+                and old_journal[2] == new_journal[2]
+                and new_journal[1] >= cached[2])
+    
+    def _write_posts(self, posts):
+        """Write a fresh snapshot and empty the journal"""
+        try:
+            _atomic_write_json(self.data_file, posts, indent=2)
+            # If we crash here the journal is replayed onto the new snapshot,
+            # which is harmless because every record is idempotent
+            with open(self.journal_file, 'wb'):
+                pass
+        except Exception as e:
+            raise Exception(f"Error saving posts: {str(e)}")
+    
+    def save_posts(self, posts):
+        posts = list(posts)
+        with self._write_lock:
+            self._write_posts(posts)
+            with _post_cache_lock:
+                _post_cache[self._cache_key] = (self._signature(), PostSnapshot(posts), 0)
+    
+    def _write_snapshot(self, snapshot):
+        """Append the unwritten records to the journal in one write"""
+        data = "".join(json.dumps(record, ensure_ascii=False, default=json_default) + "\n"
+                       for record in snapshot.unwritten).encode("utf-8")
+        try:
+            with open(self.journal_file, 'ab') as f:
+                f.write(data)
+            metrics.bytes_written(len(data))
+        except Exception as e:
+            raise Exception(f"Error saving posts: {str(e)}")
+        
+        signature = self._signature()
+        with _post_cache_lock:
+            cached = _post_cache.get(self._cache_key)
+            # If the journal grew by more than our records (a writer that doesn't
+            # take the lock), keep the old offset so the next load replays the
+            # tail, our own records included, harmlessly
+            if (cached is not None and cached[1] is snapshot and signature[1] is not None
+                    and signature[1][1] == cached[2] + len(data)):
+                _post_cache[self._cache_key] = (signature, snapshot, signature[1][1])
+        snapshot.unwritten = []
+        
+        journal_size = signature[1][1] if signature[1] else 0
+        snapshot_size = signature[0][1] if signature[0] else 0
+        if journal_size > max(self.compact_min_bytes, snapshot_size * self.compact_ratio):
+            self.compact()
+    
+    def compact(self):
+        """Fold the journal into the snapshot and truncate it"""
+        with self._write_lock:
+            self._write_staged()
+            snapshot = self._load_snapshot()
+            self._write_posts(snapshot.posts)
+            with _post_cache_lock:
+                _post_cache[self._cache_key] = (self._signature(), snapshot, 0)
+
+class SplitStorage(JsonFileStorage):
+    """Post metadata in a compact JSON index, post bodies in a separate blob file
+    
+    The index (index.json in data_dir) holds every field except content,
+    previews included, so listing, paging, author filtering and the like
+    counters never read or parse a post body. Bodies are appended to a blob
+    file and read through mmap only when full posts are requested (get_post,
+    get_posts, load_posts).
+    
+    Rewritten and deleted bodies stay in the blob file as garbage until it
+    outgrows compact_ratio of the live bodies, when compact() copies the live
+    ones into a new blob file.
+    """
+    
+    # The index is an object, not an array of posts, and already leaves out the bodies
+    STREAMABLE = False
+    # Records replayed after another process's write would lack the blob locations
+    WRITE_BEHIND = False
+    
+    # Posts whose bodies are appended or read together by bulk inserts and iter_posts
+    BATCH_SIZE = 500
+    
+    def __init__(self, data_dir, compact_ratio=0.5, compact_min_bytes=1024 * 1024):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        super().__init__(self.data_dir / "index.json")
+    
+    def _ensure_data_file_exists(self):
+        if not self.data_file.exists():
+            self._write_index(BlobSnapshot([], "content.0.dat", {}))
+    
+    def _read_posts(self, cached, signature):
+        try:
+            with open(self.data_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+                metrics.bytes_read(os.fstat(f.fileno()).st_size)
+        except FileNotFoundError:
+            index = {}
+        except json.JSONDecodeError as e:
+            raise Exception(f"Error loading posts from {self.data_file}: {str(e)}")
+        return BlobSnapshot(index.get("posts", []), index.get("blob_file", "content.0.dat"),
+                            index.get("blobs", {})), None
+    
+    def _write_index(self, snapshot):
+        """Atomically replace the index with the snapshot's summaries and blob locations"""
+        index = {"blob_file": snapshot.blob_file, "posts": snapshot.posts, "blobs": snapshot.blobs}
+        try:
+            _atomic_write_json(self.data_file, index, separators=(',', ':'))
+        except Exception as e:
+            self._invalidate_cache()
+            raise Exception(f"Error saving posts: {str(e)}")
+    
+    def _append_blobs(self, snapshot, contents):
+        """Append {post_id: content} bodies to the blob file and record their locations"""
+        with open(self.data_dir / snapshot.blob_file, 'ab') as f:
+            f.seek(0, os.SEEK_END)
+            for post_id, content in contents.items():
+                data = content.encode('utf-8')
+                snapshot.blobs[post_id] = [f.tell(), len(data)]
+                f.write(data)
+                metrics.bytes_written(len(data))
+            # The index pointing at these bytes is written next
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def _read_blobs(self, snapshot, post_ids):
+        """Read the bodies of the given posts, mapping the blob file instead of reading it whole"""
+        locations = [(post_id, snapshot.blobs[post_id]) for post_id in post_ids if post_id in snapshot.blobs]
+        if not locations:
+            return {}
+        with open(self.data_dir / snapshot.blob_file, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return {post_id: "" for post_id, _ in locations}
+            metrics.bytes_read(sum(length for _, (_, length) in locations))
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as blob:
+                return {post_id: blob[offset:offset + length].decode('utf-8')
+                        for post_id, (offset, length) in locations}
+    
+    def _load_full_posts(self, post_ids=None):
+        """Load posts with their content, all of them in storage order if post_ids is None"""
+        for attempt in range(2):
+            snapshot = self._load_snapshot()
+            if post_ids is None:
+                posts = snapshot.posts
+            else:
+                by_id = snapshot.by_id
+                posts = [by_id[post_id] for post_id in post_ids if post_id in by_id]
+            try:
+                contents = self._read_blobs(snapshot, [post["id"] for post in posts])
+            except FileNotFoundError:
+                # Another process compacted into a new blob file after we read the index
+                if attempt:
+                    raise
+                self._invalidate_cache()
+                continue
+            return [dict(post, content=contents.get(post["id"], "")) for post in posts]
+    
+    def _rewrite(self, posts, contents, old_blob_file):
+        """Write contents to a fresh blob file and point a new index at it"""
+        generation = int(old_blob_file.split(".")[1]) + 1
+        snapshot = BlobSnapshot(posts, f"content.{generation}.dat", {})
+        try:
+            with open(self.data_dir / snapshot.blob_file, 'wb') as f:
+                for post in posts:
+                    data = contents.get(post["id"], "").encode('utf-8')
+                    snapshot.blobs[post["id"]] = [f.tell(), len(data)]
+                    f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+                metrics.bytes_written(f.tell())
+        except Exception as e:
+            raise Exception(f"Error saving posts: {str(e)}")
+        self._write_index(snapshot)
+        (self.data_dir / old_blob_file).unlink(missing_ok=True)
+        with _post_cache_lock:
+            _post_cache[self._cache_key] = (self._signature(), snapshot, None)
+    
+    def load_posts(self):
+        return self._load_full_posts()
+    
+    def iter_posts(self):
+        post_ids = [post["id"] for post in self._load_snapshot().posts]
+        for start in range(0, len(post_ids), self.BATCH_SIZE):
+            yield from self._load_full_posts(post_ids[start:start + self.BATCH_SIZE])
+    
+    def load_post_summaries(self):
+        return self._load_snapshot().posts
+    
+    def save_posts(self, posts):
+        summaries = [{key: value for key, value in post.items() if key != "content"} for post in posts]
+        contents = {post["id"]: post.get("content", "") for post in posts}
+        with self._write_lock:
+            self._rewrite(summaries, contents, self._load_snapshot().blob_file)
+    
+    def _commit(self, snapshot, record, write_through=False):
+        # Without write-behind every commit is written through, whatever write_through says
+        self._write_index(snapshot)
+        with _post_cache_lock:
+            _post_cache[self._cache_key] = (self._signature(), snapshot, None)
+        
+        blob_signature = _file_signature(self.data_dir / snapshot.blob_file)
+        live_size = sum(length for _, length in snapshot.blobs.values())
+        garbage_size = (blob_signature[1] if blob_signature else 0) - live_size
+        if garbage_size > max(self.compact_min_bytes, live_size * self.compact_ratio):
+            self.compact()
+    
+    def insert_post(self, post):
+        with self._write_lock:
+            snapshot = self._load_snapshot()
+            self._append_blobs(snapshot, {post["id"]: post.get("content", "")})
+            snapshot.add({key: value for key, value in post.items() if key != "content"})
+            self._commit(snapshot, {"op": "create", "post": post})
+    
+    def insert_posts(self, posts):
+        with self._write_lock:
+            snapshot = self._load_snapshot()
+            count = 0
+            # Bodies are appended in batches as they stream in; only the index is written at the end
+            batch = {}
+            for post in posts:
+                batch[post["id"]] = post.get("content", "")
+                snapshot.add({key: value for key, value in post.items() if key != "content"})
+                count += 1
+                if len(batch) >= self.BATCH_SIZE:
+                    self._append_blobs(snapshot, batch)
+                    batch = {}
+            if batch:
+                self._append_blobs(snapshot, batch)
+            if count:
+                self._commit(snapshot, {"op": "create_many"})
+            return count
+    
+    def update_post(self, post_id, fields, expected_version=None):
+        with self._write_lock:
+            snapshot = self._load_snapshot()
+            post = snapshot.by_id.get(post_id)
+            if post is None:
+                return None
+            fields = dict(fields, version=_next_version(post, expected_version))
+            content = fields.pop("content", None)
+            if content is not None:
+                self._append_blobs(snapshot, {post_id: content})
+            snapshot.update(post, fields)
+            self._commit(snapshot, {"op": "update", "id": post_id, "fields": fields})
+            if content is None:
+                return self.get_post(post_id)
+            return dict(post, content=content)
+    
+    def update_posts(self, updates):
+        with self._write_lock:
+            snapshot = self._load_snapshot()
+            updates = {post_id: dict(fields, version=_next_version(snapshot.by_id[post_id]))
+                       for post_id, fields in updates.items() if post_id in snapshot.by_id}
+            if not updates:
+                return
+            contents = {post_id: fields.pop("content") for post_id, fields in updates.items() if "content" in fields}
+            self._append_blobs(snapshot, contents)
+            for post_id, fields in updates.items():
+                snapshot.update(snapshot.by_id[post_id], fields)
+            self._commit(snapshot, {"op": "update_many", "updates": updates})
+    
+    def delete_post(self, post_id):
+        with self._write_lock:
+            snapshot = self._load_snapshot()
+            post = snapshot.by_id.get(post_id)
+            if post is None:
+                return False
+            snapshot.remove(post)
+            snapshot.blobs.pop(post_id, None)
+            self._commit(snapshot, {"op": "delete", "id": post_id})
+            return True
+    
+    def get_post(self, post_id):
+        posts = self._load_full_posts([post_id])
+        return posts[0] if posts else None
+    
+    def get_posts(self, post_ids):
+        return self._load_full_posts(list(post_ids))
+    
+    def compact(self):
+        """Copy the live post bodies into a new blob file, dropping the garbage"""
+        with self._write_lock:
+            snapshot = self._load_snapshot()
+            contents = self._read_blobs(snapshot, list(snapshot.blobs))
+            self._rewrite(snapshot.posts, contents, snapshot.blob_file)
+
+class CompressedSnapshot(PostSnapshot):
+    """Posts from a CompressedStorage file plus their compressed bodies
+    
+    bodies maps the IDs of posts stored without "content" to [codec, base64
+    of the compressed UTF-8 body].
+    """
+    
+    def __init__(self, posts, bodies=None):
+        super().__init__(posts)
+        self.bodies = bodies if bodies is not None else {}
+
+class CompressedStorage(JsonFileStorage):
+    """JSON array like JsonFileStorage, with large post bodies stored compressed
+    
+    Bodies of threshold characters or more are written as content_codec and
+    content_data (base64 of the zlib or lzma compressed text) instead of
+    content, which shrinks both the file and the bytes every write puts out.
+    They also stay compressed in memory: listings return the posts without
+    content, and a body is only decompressed when a full post is asked for,
+    with the cache_size most recently used bodies kept decompressed.
+    
+    New and edited bodies are compressed when the snapshot is written, so
+    with write-behind even that happens off the request path. Each body
+    records its codec, so changing codec needs no migration.
+    """
+    
+    # Bodies must be decompressed, which the raw stream doesn't do
+    STREAMABLE = False
+    
+    def __init__(self, data_file, codec="zlib", threshold=COMPRESS_THRESHOLD, cache_size=BODY_CACHE_SIZE):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec {codec!r}; use one of {', '.join(sorted(CODECS))}")
+        self.codec = codec
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self._bodies = OrderedDict()
+        self._bodies_lock = threading.Lock()
+        super().__init__(data_file)
+    
+    def _read_posts(self, cached, signature):
+        posts = self._read_snapshot()
+        bodies = {}
+        for post in posts:
+            codec = post.get("content_codec")
+            if codec is not None:
+                bodies[post["id"]] = [codec, post.pop("content_data")]
+                del post["content_codec"]
+        return CompressedSnapshot(posts, bodies), None
+    
+    def _compress_bodies(self, snapshot):
+        """Move large plain bodies of new and edited posts into snapshot.bodies"""
+        compress = CODECS[self.codec][0]
+        bodies = snapshot.bodies
+        compressed = 0
+        for post in snapshot.posts:
+            content = post.get("content")
+            if content is None:
+                compressed += 1
+            elif len(content) >= self.threshold:
+                data = base64.b64encode(compress(content.encode('utf-8'))).decode('ascii')
+                # The body is in place before content goes, so readers always find one of them
+                bodies[post["id"]] = [self.codec, data]
+                del post["content"]
+                compressed += 1
+            else:
+                bodies.pop(post["id"], None)
+        if len(bodies) > compressed:
+            # Bodies of deleted posts
+            for post_id in bodies.keys() - snapshot.by_id.keys():
+                del bodies[post_id]
+    
+    def _write_snapshot(self, snapshot):
+        self._compress_bodies(snapshot)
+        bodies = snapshot.bodies
+        
+        def encode(post):
+            fields = json_default(post)
+            body = bodies.get(fields["id"])
+            if body is not None and "content" not in fields:
+                fields["content_codec"], fields["content_data"] = body
+            return fields
+        
+        try:
+            _atomic_write_json(self.data_file, snapshot.posts, default=encode, indent=2)
+        except Exception as e:
+            raise Exception(f"Error saving posts: {str(e)}")
+        with _post_cache_lock:
+            _post_cache[self._cache_key] = (self._signature(), snapshot, None)
+        snapshot.unwritten = []
+    
+    def save_posts(self, posts):
+        with self._write_lock:
+            self._write_snapshot(CompressedSnapshot(list(posts)))
+    
+    def _body(self, snapshot, post_id, cache=True):
+        """Decompress a stored body, through the cache of recently used ones if cache is set"""
+        body = snapshot.bodies.get(post_id)
+        if body is None:
+            return ""
+        codec, data = body
+        # Keyed by the compressed data itself, so an edited body can never hit a stale entry
+        if cache:
+            with self._bodies_lock:
+                content = self._bodies.get(data)
+                if content is not None:
+                    self._bodies.move_to_end(data)
+            metrics.cache_lookup("bodies", content is not None)
+            if content is not None:
+                return content
+        content = CODECS[codec][1](base64.b64decode(data)).decode('utf-8')
+        if cache:
+            with self._bodies_lock:
+                self._bodies[data] = content
+                if len(self._bodies) > self.cache_size:
+                    self._bodies.popitem(last=False)
+        return content
+    
+    def _full_post(self, snapshot, post, cache=True):
+        """The post with its content, decompressed if need be
+        
+        Always a copy: a post's plain content is dropped from the snapshot
+        once it is compressed, which may happen while the caller uses it.
+        """
+        content = post.get("content")
+        if content is None:
+            content = self._body(snapshot, post["id"], cache)
+        return dict(post, content=content)
+    
+    def load_posts(self):
+        snapshot = self._load_snapshot()
+        return [self._full_post(snapshot, post, cache=False) for post in snapshot.posts]
+    
+    def iter_posts(self):
+        snapshot = self._load_snapshot()
+        for post in list(snapshot.posts):
+            yield self._full_post(snapshot, post, cache=False)
+    
+    def load_post_summaries(self):
+        return self._load_snapshot().posts
+    
+    def get_post(self, post_id):
+        snapshot = self._load_snapshot()
+        post = snapshot.by_id.get(post_id)
+        return None if post is None else self._full_post(snapshot, post)
+    
+    def get_posts(self, post_ids):
+        snapshot = self._load_snapshot()
+        by_id = snapshot.by_id
+        return [self._full_post(snapshot, by_id[post_id]) for post_id in post_ids if post_id in by_id]
+    
+    def update_post(self, post_id, fields, expected_version=None):
+        # Copied under the lock, so the writer thread can't compress the new body away first
+        with self._write_lock:
+            post = super().update_post(post_id, fields, expected_version)
+            return None if post is None else self._full_post(self._load_snapshot(), post)
+
+class ShardedStorage(StorageBackend):
+    """Posts spread over several JSON files, so a mutation rewrites only one of them
+    
+    data_dir holds one JsonFileStorage shard per month of created_at
+    (2024-01.json, ...) or, with the "hash" scheme, a fixed number of shards
+    picked by a CRC32 of the post ID (shard-000.json, ...); shards.json
+    records which. Every shard has its own lock and its own entry in the
+    process-wide post cache, so a mutation locks, rewrites and re-reads one
+    shard while the others stay parsed, in this process and in others.
+    
+    Newest-first reads merge the shards lazily with heapq.merge, a few posts
+    at a time from each, so a page stops reading once it is full. Month
+    shards don't overlap, so they are read one after another from the newest
+    and older months are never touched by the first pages. reshard_storage
+    rewrites a store with another scheme or shard count, offline.
+    
+    A post stays in the shard it was created in; like the other file
+    stores' indexes, the layout assumes created_at and id never change.
+    """
+    
+    # Each mutation already writes a single shard, not the whole store
+    WRITE_BEHIND = False
+    
+    MANIFEST_NAME = "shards.json"
+    # Posts read from a shard at a time by merged reads
+    MERGE_BATCH = 64
+    # Month shard for posts whose created_at doesn't start with YYYY-MM
+    UNDATED = "undated"
+    
+    def __init__(self, data_dir, scheme="month", shards=SHARD_COUNT):
+        """Open the store in data_dir, creating it with scheme and shards if it doesn't exist
+        
+        An existing store keeps the layout its manifest records; change that
+        with reshard_storage.
+        """
+        if scheme not in SHARD_SCHEMES:
+            raise ValueError(f"Unknown shard scheme: {scheme}")
+        if scheme == "hash" and shards < 1:
+            raise ValueError("A hash sharded store needs at least one shard")
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self._cache_key = (str(self.data_dir.resolve()), type(self).__name__)
+        self._write_lock = get_file_lock(self.data_dir / "shards.lock")
+        self._shards = {}
+        self._shards_lock = threading.Lock()
+        self._listing = (None, [])
+        
+        manifest_file = self.data_dir / self.MANIFEST_NAME
+        with self._write_lock:
+            if not manifest_file.exists():
+                _atomic_write_json(manifest_file, {"scheme": scheme, "shards": shards if scheme == "hash" else None},
+                                   indent=2)
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.scheme = manifest["scheme"]
+        self.shard_count = manifest.get("shards")
+        self._shard_pattern = re.compile(r"shard-\d+" if self.scheme == "hash" else rf"\d{{4}}-\d{{2}}|{self.UNDATED}")
+    
+    @property
+    def storage_key(self):
+        return self._cache_key
+    
+    def change_token(self):
+        # Writes replace shard files by renaming, which moves the directory's mtime too
+        return (_file_signature(self.data_dir),
+                tuple(_file_signature(self._shard(name).data_file) for name in self._shard_names()))
+    
+    def sidecar_path(self, suffix):
+        return self.data_dir / f"posts{suffix}"
+    
+    def _shard_name(self, post):
+        """Name of the shard a post belongs in"""
+        if self.scheme == "hash":
+            return f"shard-{zlib.crc32(post['id'].encode('utf-8')) % self.shard_count:03d}"
+        month = post["created_at"][:7]
+        return month if _MONTH.fullmatch(month) else self.UNDATED
+    
+    def _shard(self, name):
+        """The JsonFileStorage of a shard, creating its file if it doesn't exist yet"""
+        with self._shards_lock:
+            shard = self._shards.get(name)
+            if shard is None:
+                shard = self._shards[name] = JsonFileStorage(self.data_dir / f"{name}.json")
+            return shard
+    
+    def _shard_names(self):
+        """Names of the existing shards, in ascending order"""
+        signature = _file_signature(self.data_dir)
+        listed_signature, names = self._listing
+        if signature is None or signature != listed_signature:
+            names = sorted(path.stem for path in self.data_dir.glob("*.json")
+                           if self._shard_pattern.fullmatch(path.stem))
+            self._listing = (signature, names)
+        return names
+    
+    def _shard_newest_first(self, name, cursor, author):
+        """Yield a shard's posts below cursor, newest first, reading MERGE_BATCH at a time"""
+        shard = self._shard(name)
+        while True:
+            posts, cursor = shard.get_posts_page(cursor, self.MERGE_BATCH, author)
+            yield from posts
+            if cursor is None:
+                return
+    
+    def _newest_first(self, cursor=None, author=None):
+        """Lazily merged iterator over every post below cursor, newest first"""
+        cursor = None if cursor is None else tuple(cursor)
+        names = self._shard_names()
+        if self.scheme == "hash":
+            streams = [self._shard_newest_first(name, cursor, author) for name in names]
+        else:
+            # Every key in a later month sorts above every key in an earlier one,
+            # so month shards are chained; a shard is first read when reached
+            months = [name for name in reversed(names) if name != self.UNDATED
+                      and (cursor is None or name <= cursor[0][:7])]
+            streams = [chain.from_iterable(self._shard_newest_first(name, cursor, author) for name in months)]
+            if self.UNDATED in names:
+                streams.append(self._shard_newest_first(self.UNDATED, cursor, author))
+        return heapq.merge(*streams, key=lambda post: (post["created_at"], post["id"]), reverse=True)
+    
+    def _locate(self, post_ids):
+        """Map shard names to the given post IDs each of them holds (month shards are looked through)"""
+        located = {}
+        names = self._shard_names()
+        if self.scheme == "hash":
+            for post_id in post_ids:
+                name = self._shard_name({"id": post_id})
+                if name in names:
+                    located.setdefault(name, []).append(post_id)
+            return located
+        remaining = set(post_ids)
+        for name in reversed(names):
+            if not remaining:
+                break
+            # Intersecting with the shard's ID map walks the smaller of the two
+            found = remaining.intersection(self._shard(name)._load_snapshot().by_id)
+            if found:
+                located[name] = found
+                remaining.difference_update(found)
+        return located
+    
+    def _find(self, post_id):
+        """The shard holding a post, or None"""
+        for name in self._locate([post_id]):
+            shard = self._shard(name)
+            # A hash shard is where the post would be, not necessarily where it is
+            if shard.get_post(post_id) is not None:
+                return shard
+        return None
+    
+    def load_posts(self):
+        posts = []
+        for name in self._shard_names():
+            posts.extend(self._shard(name).load_posts())
+        return posts
+    
+    def iter_posts(self):
+        for name in self._shard_names():
+            yield from self._shard(name).iter_posts()
+    
+    def save_posts(self, posts):
+        groups = {}
+        for post in posts:
+            groups.setdefault(self._shard_name(post), []).append(post)
+        with self._write_lock:
+            # Shards left without posts are emptied rather than deleted, so no reader finds a file gone
+            for name in self._shard_names():
+                groups.setdefault(name, [])
+            for name, shard_posts in groups.items():
+                self._shard(name).save_posts(shard_posts)
+    
+    def insert_post(self, post):
+        self._shard(self._shard_name(post)).insert_post(post)
+    
+    def insert_posts(self, posts):
+        groups = {}
+        for post in posts:
+            groups.setdefault(self._shard_name(post), []).append(post)
+        return sum(self._shard(name).insert_posts(shard_posts) for name, shard_posts in groups.items())
+    
+    def update_post(self, post_id, fields, expected_version=None):
+        shard = self._find(post_id)
+        return None if shard is None else shard.update_post(post_id, fields, expected_version)
+    
+    def delete_post(self, post_id):
+        shard = self._find(post_id)
+        return shard is not None and shard.delete_post(post_id)
+    
+    def update_posts(self, updates):
+        for name, post_ids in self._locate(updates).items():
+            self._shard(name).update_posts({post_id: updates[post_id] for post_id in post_ids})
+    
+    def adjust_likes(self, post_id, delta):
+        shard = self._find(post_id)
+        return None if shard is None else shard.adjust_likes(post_id, delta)
+    
+    def apply_like_deltas(self, deltas):
+        results = {}
+        for name, post_ids in self._locate(deltas).items():
+            results.update(self._shard(name).apply_like_deltas({post_id: deltas[post_id] for post_id in post_ids}))
+        return results
+    
+    def get_post(self, post_id):
+        shard = self._find(post_id)
+        return None if shard is None else shard.get_post(post_id)
+    
+    def get_posts(self, post_ids):
+        posts = []
+        for name, shard_ids in self._locate(post_ids).items():
+            posts.extend(self._shard(name).get_posts(shard_ids))
+        return posts
+    
+    def get_post_stamps(self):
+        stamps = {}
+        for name in self._shard_names():
+            stamps.update(self._shard(name).get_post_stamps())
+        return stamps
+    
+    def list_posts(self):
+        return list(self._newest_first())
+    
+    def get_posts_page(self, cursor=None, limit=5, author=None):
+        posts = list(islice(self._newest_first(cursor, author), limit + 1))
+        page = posts[:limit]
+        next_cursor = (page[-1]["created_at"], page[-1]["id"]) if len(posts) > limit else None
+        return page, next_cursor
+    
+    def get_posts_by_author(self, author):
+        posts = list(self._newest_first(author=author))
+        posts.reverse()
+        return posts
+    
+    def count_posts(self, author=None):
+        return sum(self._shard(name).count_posts(author) for name in self._shard_names())
+    
+    def total_likes(self):
+        return sum(self._shard(name).total_likes() for name in self._shard_names())
+    
+    def get_stats(self):
+        stats = {"post_count": 0, "total_likes": 0, "latest_post_at": None, "authors": {}}
+        for name in self._shard_names():
+            shard_stats = self._shard(name).get_stats()
+            stats["post_count"] += shard_stats["post_count"]
+            stats["total_likes"] += shard_stats["total_likes"]
+            if shard_stats["latest_post_at"] is not None:
+                stats["latest_post_at"] = max(stats["latest_post_at"] or "", shard_stats["latest_post_at"])
+            for key, author in shard_stats["authors"].items():
+                total = stats["authors"].setdefault(key, {"author": author["author"], "posts": 0, "likes": 0})
+                total["posts"] += author["posts"]
+                total["likes"] += author["likes"]
+        return stats
+
+def reshard_storage(data_dir, scheme="month", shards=SHARD_COUNT):
+    """Rewrite a sharded store with another scheme or shard count, returning how many posts it holds
+    
+    Offline only: nothing else may use the store meanwhile. The new layout
+    is built in a directory next to data_dir, along with copies of the
+    store's other files (such as the revision history), and swapped in once
+    complete, so an interrupted run leaves the old layout in place.
+    """
+    data_dir = Path(data_dir)
+    if not (data_dir / ShardedStorage.MANIFEST_NAME).exists():
+        raise ValueError(f"{data_dir} is not a sharded store")
+    new_dir = data_dir.with_name(f"{data_dir.name}.reshard")
+    old_dir = data_dir.with_name(f"{data_dir.name}.old")
+    for leftover in (new_dir, old_dir):
+        shutil.rmtree(leftover, ignore_errors=True)
+    
+    source = ShardedStorage(data_dir)
+    target = ShardedStorage(new_dir, scheme, shards)
+    posts = source.load_posts()
+    target.save_posts(posts)
+    for path in data_dir.iterdir():
+        # Shard files, their locks and the manifest belong to the old layout
+        if (path.is_file() and path.name != ShardedStorage.MANIFEST_NAME
+                and path.suffix not in (".json", ".lock", ".tmp")):
+            shutil.copy2(path, new_dir / path.name)
+    
+    os.replace(data_dir, old_dir)
+    os.replace(new_dir, data_dir)
+    shutil.rmtree(old_dir)
+    return len(posts)
+
+class SQLiteStorage(StorageBackend):
+    """Posts stored in an indexed SQLite database in WAL mode
+    
+    Lookups by id, newest-first listing, author filtering and like totals run
+    as SQL queries, so none of them load every post into Python; the listing
+    queries also leave out the content column.
+    """
+    
+    # Columns added after the table was first created
+    ADDED_COLUMNS = (
+        ("version", "INTEGER NOT NULL DEFAULT 1"),
+        ("word_count", "INTEGER"),
+        ("reading_time", "INTEGER"),
+        ("preview", "TEXT"),
+        ("short_preview", "TEXT"),
+        ("created_display", "TEXT"),
+        ("updated_display", "TEXT"),
+    )
+    POST_COLUMNS = ", ".join(POST_FIELDS)
+    SUMMARY_COLUMNS = ", ".join(SUMMARY_FIELDS)
+    INSERT_SQL = (f"INSERT INTO posts ({', '.join(POST_FIELDS)}, author_lower) "
+                  f"VALUES ({', '.join('?' for _ in POST_FIELDS)}, ?)")
+    
+    def __init__(self, db_file):
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(exist_ok=True)
+        # sqlite3 connections can't be shared between threads, and Streamlit
+        # runs each session on its own thread
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS posts (
+                    id TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    author TEXT NOT NULL,
+                    author_lower TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT,
+                    likes INTEGER NOT NULL DEFAULT 0
+                );
+                DROP INDEX IF EXISTS idx_posts_created_at;
+                CREATE INDEX IF NOT EXISTS idx_posts_created_at_id ON posts (created_at, id);
+                DROP INDEX IF EXISTS idx_posts_author_lower;
+                CREATE INDEX IF NOT EXISTS idx_posts_author_created_at_id ON posts (author_lower, created_at, id);
+                
+                -- Bumped by triggers on every write, so readers can cheaply tell
+                -- whether anything changed
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO meta VALUES ('version', 0);
+                CREATE TRIGGER IF NOT EXISTS posts_insert_version AFTER INSERT ON posts
+                BEGIN UPDATE meta SET value = value + 1 WHERE key = 'version'; END;
+                CREATE TRIGGER IF NOT EXISTS posts_update_version AFTER UPDATE ON posts
+                BEGIN UPDATE meta SET value = value + 1 WHERE key = 'version'; END;
+                CREATE TRIGGER IF NOT EXISTS posts_delete_version AFTER DELETE ON posts
+                BEGIN UPDATE meta SET value = value + 1 WHERE key = 'version'; END;
+            """)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(posts)")}
+            for name, sql_type in self.ADDED_COLUMNS:
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE posts ADD COLUMN {name} {sql_type}")
+            
+            has_author_stats = conn.execute("SELECT 1 FROM sqlite_master "
+                                            "WHERE type = 'table' AND name = 'author_stats'").fetchone()
+            conn.executescript("""
+                -- Per-author post and like counts kept current by triggers, so
+                -- the blog totals are a sum over authors rather than over posts
+                CREATE TABLE IF NOT EXISTS author_stats (
+                    author_lower TEXT PRIMARY KEY,
+                    author TEXT NOT NULL,
+                    posts INTEGER NOT NULL,
+                    likes INTEGER NOT NULL
+                );
+                CREATE TRIGGER IF NOT EXISTS posts_insert_stats AFTER INSERT ON posts
+                BEGIN
+                    INSERT INTO author_stats VALUES (NEW.author_lower, NEW.author, 1, NEW.likes)
+                    ON CONFLICT (author_lower) DO UPDATE
+                    SET author = excluded.author, posts = posts + 1, likes = likes + excluded.likes;
+                END;
+                CREATE TRIGGER IF NOT EXISTS posts_delete_stats AFTER DELETE ON posts
+                BEGIN
+                    UPDATE author_stats SET posts = posts - 1, likes = likes - OLD.likes
+                    WHERE author_lower = OLD.author_lower;
+                    DELETE FROM author_stats WHERE author_lower = OLD.author_lower AND posts <= 0;
+                END;
+                CREATE TRIGGER IF NOT EXISTS posts_update_stats AFTER UPDATE OF likes, author ON posts
+                BEGIN
+                    UPDATE author_stats SET posts = posts - 1, likes = likes - OLD.likes
+                    WHERE author_lower = OLD.author_lower;
+                    DELETE FROM author_stats WHERE author_lower = OLD.author_lower AND posts <= 0;
+                    INSERT INTO author_stats VALUES (NEW.author_lower, NEW.author, 1, NEW.likes)
+                    ON CONFLICT (author_lower) DO UPDATE
+                    SET author = excluded.author, posts = posts + 1, likes = likes + excluded.likes;
+                END;
+            """)
+            if not has_author_stats:
+                conn.execute("INSERT OR IGNORE INTO author_stats "
+                             "SELECT author_lower, MAX(author), COUNT(*), SUM(likes) FROM posts GROUP BY author_lower")
+    
+    @property
+    def storage_key(self):
+        return (str(self.db_file.resolve()), type(self).__name__)
+    
+    def _connect(self):
+        """Get this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def change_token(self):
+        return self._connect().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+    
+    def sidecar_path(self, suffix):
+        return self.db_file.with_suffix(suffix)
+    
+    @staticmethod
+    def _row_to_post(row):
+        return {field: row[field] for field in row.keys()}
+    
+    @staticmethod
+    def _post_to_row(post):
+        # author_lower uses Python's lower() rather than SQLite's, which only
+        # folds ASCII, so matching stays identical to the JSON backends
+        return (*(post.get(field, FIELD_DEFAULTS.get(field)) for field in POST_FIELDS),
+                post["author"].lower())
+    
+    def _query(self, sql, params=()):
+        return [self._row_to_post(row) for row in self._connect().execute(sql, params)]
+    
+    def load_posts(self):
+        return self._query(f"SELECT {self.POST_COLUMNS} FROM posts ORDER BY rowid")
+    
+    def load_post_summaries(self):
+        return self._query(f"SELECT {self.SUMMARY_COLUMNS} FROM posts ORDER BY rowid")
+    
+    def save_posts(self, posts):
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM posts")
+                conn.executemany(self.INSERT_SQL,
+                                 (self._post_to_row(post) for post in posts))
+        except sqlite3.Error as e:
+            raise Exception(f"Error saving posts: {str(e)}")
+    
+    def insert_post(self, post):
+        try:
+            with self._connect() as conn:
+                conn.execute(self.INSERT_SQL,
+                             self._post_to_row(post))
+        except sqlite3.Error as e:
+            raise Exception(f"Error saving posts: {str(e)}")
+    
+    def insert_posts(self, posts):
+        try:
+            with self._connect() as conn:
+                cursor = conn.executemany(self.INSERT_SQL, (self._post_to_row(post) for post in posts))
+                return max(0, cursor.rowcount)
+        except sqlite3.Error as e:
+            raise Exception(f"Error saving posts: {str(e)}")
+    
+    def iter_posts(self):
+        # A separate connection, so writes on this thread's connection can't disturb the cursor
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            for row in conn.execute(f"SELECT {self.POST_COLUMNS} FROM posts ORDER BY rowid"):
+                yield self._row_to_post(row)
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _update_statement(post_id, fields, expected_version=None):
+        """Build the UPDATE statement and parameters for changing a post's fields"""
+        fields = {key: value for key, value in fields.items() if key in POST_FIELDS and key not in ("id", "version")}
+        if "author" in fields:
+            fields["author_lower"] = fields["author"].lower()
+        assignments = "".join(f"{key} = ?, " for key in fields) + "version = version + 1"
+        if expected_version is None:
+            return f"UPDATE posts SET {assignments} WHERE id = ?", (*fields.values(), post_id)
+        return (f"UPDATE posts SET {assignments} WHERE id = ? AND version = ?",
+                (*fields.values(), post_id, expected_version))
+    
+    def update_post(self, post_id, fields, expected_version=None):
+        try:
+            with self._connect() as conn:
+                cursor = conn.execute(*self._update_statement(post_id, fields, expected_version))
+                if cursor.rowcount == 0:
+                    row = conn.execute("SELECT version FROM posts WHERE id = ?", (post_id,)).fetchone()
+        except sqlite3.Error as e:
+            raise Exception(f"Error saving posts: {str(e)}")
+        if cursor.rowcount == 0:
+            if row is None:
+                return None
+            raise VersionConflict(post_id, expected_version, row["version"])
+        return self.get_post(post_id)
+    
+    def update_posts(self, updates):
+        try:
+            with self._connect() as conn:
+                for post_id, fields in updates.items():
+                    conn.execute(*self._update_statement(post_id, fields))
+        except sqlite3.Error as e:
+            raise Exception(f"Error saving posts: {str(e)}")
+    
+    def delete_post(self, post_id):
+        try:
+            with self._connect() as conn:
+                cursor = conn.execute("DELETE FROM posts WHERE id = ?", (post_id,))
+        except sqlite3.Error as e:
+            raise Exception(f"Error saving posts: {str(e)}")
+        return cursor.rowcount > 0
+    
+    def adjust_likes(self, post_id, delta):
+        try:
+            with self._connect() as conn:
+                conn.execute("UPDATE posts SET likes = max(0, likes + ?) WHERE id = ?", (delta, post_id))
+                row = conn.execute("SELECT likes FROM posts WHERE id = ?", (post_id,)).fetchone()
+        except sqlite3.Error as e:
+            raise Exception(f"Error saving posts: {str(e)}")
+        return row["likes"] if row else None
+    
+    def apply_like_deltas(self, deltas):
+        if not deltas:
+            return {}
+        post_ids = list(deltas)
+        placeholders = ", ".join("?" for _ in post_ids)
+        try:
+            with self._connect() as conn:
+                conn.executemany("UPDATE posts SET likes = max(0, likes + ?) WHERE id = ?",
+                                 [(delta, post_id) for post_id, delta in deltas.items()])
+                rows = conn.execute(f"SELECT id, likes FROM posts WHERE id IN ({placeholders})",
+                                    post_ids).fetchall()
+        except sqlite3.Error as e:
+            raise Exception(f"Error saving posts: {str(e)}")
+        return {row["id"]: row["likes"] for row in rows}
+    
+    def get_post(self, post_id):
+        posts = self._query(f"SELECT {self.POST_COLUMNS} FROM posts WHERE id = ?", (post_id,))
+        return posts[0] if posts else None
+    
+    def get_posts(self, post_ids):
+        post_ids = list(post_ids)
+        posts = []
+        # Stay well below SQLite's limit on bound parameters
+        for start in range(0, len(post_ids), 500):
+            chunk = post_ids[start:start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            posts.extend(self._query(f"SELECT {self.POST_COLUMNS} FROM posts WHERE id IN ({placeholders})",
+                                     chunk))
+        return posts
+    
+    def get_post_stamps(self):
+        rows = self._connect().execute("SELECT id, created_at, updated_at FROM posts")
+        return {row["id"]: [row["created_at"], row["updated_at"]] for row in rows}
+    
+    def list_posts(self):
+        return self._query(f"SELECT {self.SUMMARY_COLUMNS} FROM posts ORDER BY created_at DESC, id DESC")
+    
+    def get_posts_page(self, cursor=None, limit=5, author=None):
+        conditions = []
+        params = []
+        if author is not None:
+            conditions.append("author_lower = ?")
+            params.append(author.lower())
+        if cursor is not None:
+            conditions.append("(created_at, id) < (?, ?)")
+            params.extend(cursor)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        # Fetch one extra row to learn whether there is a next page
+        posts = self._query(f"SELECT {self.SUMMARY_COLUMNS} FROM posts {where}"
+                            "ORDER BY created_at DESC, id DESC LIMIT ?",
+                            (*params, limit + 1))
+        page = posts[:limit]
+        next_cursor = (page[-1]["created_at"], page[-1]["id"]) if len(posts) > limit else None
+        return page, next_cursor
+    
+    def get_posts_by_author(self, author):
+        return self._query(f"SELECT {self.SUMMARY_COLUMNS} FROM posts WHERE author_lower = ? "
+                           "ORDER BY created_at, id", (author.lower(),))
+    
+    def count_posts(self, author=None):
+        if author is not None:
+            row = self._connect().execute("SELECT posts FROM author_stats WHERE author_lower = ?",
+                                          (author.lower(),)).fetchone()
+            return row[0] if row else 0
+        return self._connect().execute("SELECT COALESCE(SUM(posts), 0) FROM author_stats").fetchone()[0]
+    
+    def total_likes(self):
+        return self._connect().execute("SELECT COALESCE(SUM(likes), 0) FROM author_stats").fetchone()[0]
+    
+    def get_stats(self):
+        conn = self._connect()
+        authors = {row["author_lower"]: {"author": row["author"], "posts": row["posts"], "likes": row["likes"]}
+                   for row in conn.execute("SELECT * FROM author_stats")}
+        return {
+            "post_count": sum(author["posts"] for author in authors.values()),
+            "total_likes": sum(author["likes"] for author in authors.values()),
+            "latest_post_at": conn.execute("SELECT MAX(created_at) FROM posts").fetchone()[0],
+            "authors": authors,
+        }
+    
+    def compact(self):
+        """Checkpoint the WAL back into the main database file"""
+        self._connect().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+STORAGE_BACKENDS = {
+    "json": JsonFileStorage,
+    "journal": JournalStorage,
+    "split": SplitStorage,
+    "compressed": CompressedStorage,
+    "sharded": ShardedStorage,
+    "sqlite": SQLiteStorage,
+}
+
+def storage_path(mode, data_file):
+    """Path a storage mode keeps its data at, given the app's .json data file name
+    
+    For "sqlite" a .json data file name is swapped for .db, so the default
+    data/blog_posts.json path maps to data/blog_posts.db; for "split" it
+    becomes a directory, data/blog_posts, for "sharded" the directory
+    data/blog_posts.shards, and for "compressed", whose files the json
+    backend can't read, data/blog_posts.compressed.json.
+    """
+    data_file = Path(data_file)
+    if mode == "sqlite" and data_file.suffix == ".json":
+        return data_file.with_suffix(".db")
+    if mode == "split" and data_file.suffix == ".json":
+        return data_file.with_suffix("")
+    if mode == "sharded" and data_file.suffix == ".json":
+        return data_file.with_suffix(".shards")
+    if mode == "compressed" and data_file.suffix == ".json" and not data_file.name.endswith(".compressed.json"):
+        return data_file.with_suffix(".compressed.json")
+    return data_file
+
+def create_storage(mode, data_file, **options):
+    """Create a storage backend by name, at storage_path(mode, data_file)"""
+    if mode not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage mode: {mode}")
+    return STORAGE_BACKENDS[mode](storage_path(mode, data_file), **options)
+
+def migrate_posts(source, target):
+    """Copy every post from one backend into another, replacing its contents"""
+    posts = source.load_posts()
+    target.save_posts(posts)
+    return len(posts)
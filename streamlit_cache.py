@@ -0,0 +1,97 @@
+"""Streamlit caching for the blog
+
+One BlogManager is shared by every session of the process through
+st.cache_resource, and read queries are cached with st.cache_data under the
+manager's data version. The version moves on with every write, so cached
+results never go stale and need no TTL; max_entries only bounds memory.
+"""
+import streamlit as st
+
+from blog_manager import BlogManager
+from fragment_cache import FragmentCache
+import metrics
+
+QUERY_CACHE_ENTRIES = 256
+FRAGMENT_CACHE_BYTES = 8 * 1024 * 1024
+
+@st.cache_resource(show_spinner=False)
+def setup_metrics(spec):
+    """Enable metrics with the sinks in spec once per process (see metrics.configure)"""
+    return metrics.configure(spec)
+
+@st.cache_resource(show_spinner=False)
+def get_blog_manager(storage_mode="json", codec=None):
+    """Get the process-wide BlogManager
+    
+    Likes are buffered and written in batches, and other writes are written
+    behind by a background thread, so no session waits for the disk (edits,
+    which check the post version, are written at once). codec
+    picks the body compression of the "compressed" storage mode.
+    """
+    options = {"codec": codec} if storage_mode == "compressed" and codec else {}
+    return BlogManager(storage_mode=storage_mode, buffer_likes=True, write_behind=True, **options)
+
+@st.cache_resource(show_spinner=False)
+def get_fragment_cache():
+    """Get the process-wide cache of rendered HTML fragments"""
+    return FragmentCache(FRAGMENT_CACHE_BYTES)
+
+# Each cached function takes the manager as _manager, which Streamlit doesn't
+# hash, plus the store's key and data version, which make up the cache key
+
+@st.cache_data(max_entries=QUERY_CACHE_ENTRIES, show_spinner=False)
+def _posts_page(_manager, store, version, cursor, limit, author):
+    return _manager.get_posts_page(cursor, limit, author)
+
+@st.cache_data(max_entries=QUERY_CACHE_ENTRIES, show_spinner=False)
+def _search_posts(_manager, store, version, query):
+    return _manager.search_posts(query)
+
+@st.cache_data(max_entries=QUERY_CACHE_ENTRIES, show_spinner=False)
+def _search_posts_ranked(_manager, store, version, query, page, per_page):
+    return _manager.search_posts_ranked(query, page, per_page)
+
+@st.cache_data(max_entries=QUERY_CACHE_ENTRIES, show_spinner=False)
+def _post(_manager, store, version, post_id):
+    return _manager.get_post(post_id)
+
+@st.cache_data(max_entries=QUERY_CACHE_ENTRIES, show_spinner=False)
+def _all_posts(_manager, store, version):
+    return _manager.get_all_posts()
+
+@st.cache_data(max_entries=QUERY_CACHE_ENTRIES, show_spinner=False)
+def _post_summaries(_manager, store, version):
+    return _manager.get_post_summaries()
+
+@st.cache_data(max_entries=QUERY_CACHE_ENTRIES, show_spinner=False)
+def _stats(_manager, store, version):
+    return _manager.get_stats()
+
+def get_posts_page(manager, cursor=None, limit=5, author=None):
+    """Cached BlogManager.get_posts_page"""
+    return _posts_page(manager, manager.storage.storage_key, manager.data_version(), cursor, limit, author)
+
+def search_posts(manager, query):
+    """Cached BlogManager.search_posts"""
+    return _search_posts(manager, manager.storage.storage_key, manager.data_version(), query)
+
+def search_posts_ranked(manager, query, page=1, per_page=5):
+    """Cached BlogManager.search_posts_ranked"""
+    return _search_posts_ranked(manager, manager.storage.storage_key, manager.data_version(),
+                                query, page, per_page)
+
+def get_post(manager, post_id):
+    """Cached BlogManager.get_post"""
+    return _post(manager, manager.storage.storage_key, manager.data_version(), post_id)
+
+def get_all_posts(manager):
+    """Cached BlogManager.get_all_posts"""
+    return _all_posts(manager, manager.storage.storage_key, manager.data_version())
+
+def get_post_summaries(manager):
+    """Cached BlogManager.get_post_summaries"""
+    return _post_summaries(manager, manager.storage.storage_key, manager.data_version())
+
+def get_stats(manager):
+    """Cached BlogManager.get_stats"""
+    return _stats(manager, manager.storage.storage_key, manager.data_version())
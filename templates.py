@@ -0,0 +1,322 @@
+"""HTML templates shared by the Streamlit app and the static site builder
+
+theme_css is the <style> block of the light or dark theme; the render_*
+functions return the HTML of a post as a card, a manage page item or a full
+page. They insert post fields as they are, so callers that need the fields
+escaped pass an escaped copy of the post.
+"""
+
+# Dynamic CSS for light/dark mode
+def theme_css(dark_mode):
+    """The <style> block of the light or dark theme"""
+    if dark_mode:
+        return """
+        <style>
+            .stApp {
+                background-color: #1a1a1a;
+                color: #ffffff;
+            }
+            
+            .main-header {
+                background: linear-gradient(90deg, #4a5568 0%, #2d3748 100%);
+                padding: 2rem 1rem;
+                border-radius: 10px;
+                margin-bottom: 2rem;
+                color: white;
+                text-align: center;
+            }
+            
+            .post-container {
+                background: #2d3748;
+                padding: 1.5rem;
+                border-radius: 10px;
+                box-shadow: 0 2px 10px rgba(0,0,0,0.3);
+                margin-bottom: 1.5rem;
+                border-left: 4px solid #4a5568;
+            }
+            
+            .post-title {
+                color: #e2e8f0;
+                font-size: 1.5rem;
+                font-weight: 600;
+                margin-bottom: 0.5rem;
+            }
+            
+            .post-meta {
+                color: #a0aec0;
+                font-size: 0.9rem;
+                margin-bottom: 1rem;
+            }
+            
+            .post-content {
+                color: #cbd5e0;
+                line-height: 1.6;
+                margin-bottom: 1rem;
+            }
+            
+            .sidebar-header {
+                background: linear-gradient(135deg, #4a5568 0%, #2d3748 100%);
+                padding: 1rem;
+                border-radius: 10px;
+                margin-bottom: 1rem;
+                color: white;
+                text-align: center;
+            }
+            
+            .stats-container {
+                background: #2d3748;
+                padding: 1rem;
+                border-radius: 8px;
+                margin: 1rem 0;
+                color: #e2e8f0;
+            }
+            
+            .welcome-banner {
+                background: linear-gradient(135deg, #4a5568 0%, #2d3748 100%);
+                color: white;
+                padding: 2rem;
+                border-radius: 15px;
+                text-align: center;
+                margin-bottom: 2rem;
+            }
+            
+            .search-highlight {
+                background: #744210;
+                padding: 0.5rem 1rem;
+                border-radius: 5px;
+                border-left: 4px solid #f6e05e;
+                margin-bottom: 1rem;
+                color: #faf089;
+            }
+            
+            .empty-state {
+                text-align: center;
+                padding: 3rem;
+                color: #a0aec0;
+            }
+            
+            .form-container {
+                background: #2d3748;
+                padding: 2rem;
+                border-radius: 10px;
+                box-shadow: 0 2px 10px rgba(0,0,0,0.3);
+                margin-bottom: 2rem;
+            }
+            
+            .manage-post-item {
+                background: #2d3748;
+                padding: 1.5rem;
+                border-radius: 8px;
+                box-shadow: 0 1px 5px rgba(0,0,0,0.3);
+                margin-bottom: 1rem;
+                border-left: 3px solid #4a5568;
+            }
+            
+            .reading-time {
+                color: #a0aec0;
+                font-size: 0.85rem;
+                font-style: italic;
+            }
+            
+            .like-button {
+                background: none;
+                border: none;
+                color: #e53e3e;
+                cursor: pointer;
+                font-size: 1.2rem;
+                margin-right: 0.5rem;
+            }
+            
+            .like-button:hover {
+                color: #c53030;
+            }
+            
+            .like-count {
+                color: #a0aec0;
+                font-size: 0.9rem;
+            }
+        </style>
+        """
+    else:
+        return """
+        <style>
+            .main-header {
+                background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
+                padding: 2rem 1rem;
+                border-radius: 10px;
+                margin-bottom: 2rem;
+                color: white;
+                text-align: center;
+            }
+            
+            .post-container {
+                background: white;
+                padding: 1.5rem;
+                border-radius: 10px;
+                box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+                margin-bottom: 1.5rem;
+                border-left: 4px solid #667eea;
+            }
+            
+            .post-title {
+                color: #2c3e50;
+                font-size: 1.5rem;
+                font-weight: 600;
+                margin-bottom: 0.5rem;
+            }
+            
+            .post-meta {
+                color: #7f8c8d;
+                font-size: 0.9rem;
+                margin-bottom: 1rem;
+            }
+            
+            .post-content {
+                color: #34495e;
+                line-height: 1.6;
+                margin-bottom: 1rem;
+            }
+            
+            .sidebar-header {
+                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                padding: 1rem;
+                border-radius: 10px;
+                margin-bottom: 1rem;
+                color: white;
+                text-align: center;
+            }
+            
+            .stats-container {
+                background: #f8f9fa;
+                padding: 1rem;
+                border-radius: 8px;
+                margin: 1rem 0;
+            }
+            
+            .welcome-banner {
+                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                color: white;
+                padding: 2rem;
+                border-radius: 15px;
+                text-align: center;
+                margin-bottom: 2rem;
+            }
+            
+            .button-container {
+                display: flex;
+                gap: 10px;
+                margin-top: 1rem;
+            }
+            
+            .pagination-container {
+                display: flex;
+                justify-content: center;
+                align-items: center;
+                gap: 20px;
+                margin: 2rem 0;
+            }
+            
+            .search-highlight {
+                background: #fff3cd;
+                padding: 0.5rem 1rem;
+                border-radius: 5px;
+                border-left: 4px solid #ffc107;
+                margin-bottom: 1rem;
+            }
+            
+            .empty-state {
+                text-align: center;
+                padding: 3rem;
+                color: #6c757d;
+            }
+            
+            .form-container {
+                background: white;
+                padding: 2rem;
+                border-radius: 10px;
+                box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+                margin-bottom: 2rem;
+            }
+            
+            .manage-post-item {
+                background: white;
+                padding: 1.5rem;
+                border-radius: 8px;
+                box-shadow: 0 1px 5px rgba(0,0,0,0.1);
+                margin-bottom: 1rem;
+                border-left: 3px solid #667eea;
+            }
+            
+            .reading-time {
+                color: #6c757d;
+                font-size: 0.85rem;
+                font-style: italic;
+            }
+            
+            .like-button {
+                background: none;
+                border: none;
+                color: #e53e3e;
+                cursor: pointer;
+                font-size: 1.2rem;
+                margin-right: 0.5rem;
+            }
+            
+            .like-button:hover {
+                color: #c53030;
+            }
+            
+            .like-count {
+                color: #6c757d;
+                font-size: 0.9rem;
+            }
+        </style>
+        """
+
+def render_post_card(post):
+    """HTML for a post preview on the home page"""
+    return f"""
+    <div class="post-container">
+        <div class="post-title">{post['title']}</div>
+        <div class="post-meta">
+            📅 {post['created_display']} | 
+            👤 {post['author']} | 
+            <span class="reading-time">⏱️ {post['reading_time']} min read</span> |
+            ❤️ {post.get('likes', 0)} likes
+        </div>
+        <div class="post-content">
+            {post['preview']}
+        </div>
+    </div>
+    """
+
+def render_manage_item(post):
+    """HTML for a post on the manage page"""
+    return f"""
+    <div class="manage-post-item">
+        <div class="post-title">{post['title']}</div>
+        <div class="post-meta">
+            👤 {post['author']} | 📅 {post['created_display']} | ⏱️ {post['reading_time']} min read | ❤️ {post.get('likes', 0)} likes
+        </div>
+        {f'<div class="post-meta">📝 Updated: {post["updated_display"]}</div>' if post['updated_at'] else ''}
+        <div class="post-content">{post['short_preview']}</div>
+    </div>
+    """
+
+def render_post_view(post):
+    """HTML for a full post on its own page"""
+    return f"""
+    <div class="post-container" style="margin-bottom: 2rem;">
+        <div class="post-title" style="font-size: 2rem; margin-bottom: 1rem;">{post['title']}</div>
+        <div class="post-meta" style="margin-bottom: 2rem;">
+            👤 <strong>{post['author']}</strong> | 
+            📅 {post['created_display']} | 
+            ⏱️ {post['reading_time']} min read | 
+            ❤️ {post.get('likes', 0)} likes
+        </div>
+        {f'<div class="post-meta" style="margin-bottom: 2rem;">📝 <em>Last Updated: {post["updated_display"]}</em></div>' if post['updated_at'] else ''}
+        <div class="post-content" style="font-size: 1.1rem; line-height: 1.8;">
+            {post['content'].replace(chr(10), '<br>')}
+        </div>
+    </div>
+    """
@@ -0,0 +1,36 @@
+import io
+import json
+import unittest
+
+from json_stream import iter_json_array
+
+class IterJsonArrayTest(unittest.TestCase):
+    def parse(self, text, chunk_size):
+        return list(iter_json_array(io.StringIO(text), chunk_size))
+    
+    def test_matches_json_loads_at_every_chunk_size(self):
+        values = [[], [1], [1, 2, 3], [{"a": "x" * 100, "b": [1, 2, {"c": None}]}] * 5,
+                  [12345678901234567890, -1.5e10, 'quote "]', True, False, None], ["é😀" * 20]]
+        for value in values:
+            for indent in (None, 2):
+                text = json.dumps(value, indent=indent, ensure_ascii=False)
+                for chunk_size in range(1, 12):
+                    self.assertEqual(self.parse(text, chunk_size), value, (text, chunk_size))
+    
+    def test_number_split_by_a_chunk_boundary(self):
+        for text in ("[1.0]", "[1.5e-3, 2E+10]", "[-0.25,12]", "[ 3.14159 ]", "[1e5]"):
+            for chunk_size in range(1, len(text) + 1):
+                self.assertEqual(self.parse(text, chunk_size), json.loads(text), (text, chunk_size))
+    
+    def test_empty_file_is_an_empty_array(self):
+        self.assertEqual(self.parse("", 4), [])
+        self.assertEqual(self.parse("  [ ] ", 1), [])
+    
+    def test_malformed_arrays_raise(self):
+        for text in ("[1,", "[1 2]", "[,1]", "[1,]", "{}", "[", '["abc', "[1.]", "[1]x"):
+            for chunk_size in (1, 2, 64):
+                with self.assertRaises(json.JSONDecodeError, msg=(text, chunk_size)):
+                    self.parse(text, chunk_size)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,11 @@
 from datetime import datetime
 import re
 
+# Limits enforced by validate_post_data
+MAX_TITLE_LENGTH = 200
+MAX_CONTENT_LENGTH = 50000
+MAX_AUTHOR_LENGTH = 100
+
 def format_date(date_string):
     """Format ISO date string to readable format"""
     try:
@@ -46,17 +51,17 @@ def validate_post_data(title, content, author):
     
     if not title or not title.strip():
         errors.append("Title is required")
-    elif len(title.strip()) > 200:
+    elif len(title.strip()) > MAX_TITLE_LENGTH:
         errors.append("Title must be 200 characters or less")
     
     if not content or not content.strip():
         errors.append("Content is required")
-    elif len(content.strip()) > 50000:
+    elif len(content.strip()) > MAX_CONTENT_LENGTH:
         errors.append("Content must be 50,000 characters or less")
     
     if not author or not author.strip():
         errors.append("Author is required")
-    elif len(author.strip()) > 100:
+    elif len(author.strip()) > MAX_AUTHOR_LENGTH:
         errors.append("Author name must be 100 characters or less")
     
     return errors
@@ -77,9 +82,25 @@ def count_words(text):
 def count_reading_time(text, words_per_minute=200):
     """Estimate reading time in minutes"""
     word_count = count_words(text)
+    return reading_time_for_words(word_count, words_per_minute)
+
+def reading_time_for_words(word_count, words_per_minute=200):
+    """Estimate reading time in minutes from a word count"""
     reading_time = max(1, round(word_count / words_per_minute))
     return reading_time
 
+def derive_post_fields(post):
+    """Compute the display fields stored with a post so pages don't recompute them"""
+    word_count = count_words(post['content'])
+    return {
+        "word_count": word_count,
+        "reading_time": reading_time_for_words(word_count),
+        "preview": truncate_content(post['content'], 200),
+        "short_preview": truncate_content(post['content'], 100),
+        "created_display": format_date(post['created_at']),
+        "updated_display": format_date(post['updated_at']) if post.get('updated_at') else None
+    }
+
 def sanitize_filename(filename):
     """Sanitize filename for safe file system usage"""
     # Remove or replace invalid characters
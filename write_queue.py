@@ -0,0 +1,100 @@
+"""Write-behind for file-backed storage
+
+A JSON file store writes the whole file on every mutation, so whoever
+publishes or edits a post waits for the disk. With a WriteQueue attached, a
+mutation only updates the shared in-memory posts, which every reader sees at
+once, and is staged there; a dedicated writer thread writes whatever has
+been staged a moment later, so a burst of mutations costs a single write.
+
+flush() is the durability barrier: once it returns, every mutation made
+before the call is on disk. Queues are closed, and so flushed, at
+interpreter exit; after that mutations are written immediately again.
+"""
+import atexit
+import threading
+
+from metrics import timed
+
+# One queue per underlying store, shared by every BlogManager in the process
+_queues = {}
+_queues_lock = threading.Lock()
+
+class WriteQueue:
+    """Writes a storage's staged mutations from a dedicated writer thread
+    
+    The thread wakes up on notify(), waits flush_interval seconds for more
+    mutations to join the batch and writes them all with
+    storage.flush_writes(). A failed write leaves the mutations staged and
+    is retried after another interval; error holds the failure until a
+    write succeeds.
+    """
+    
+    def __init__(self, storage, flush_interval=0.5):
+        self.storage = storage
+        self.flush_interval = flush_interval
+        self.error = None
+        self._closed = False
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+    
+    def notify(self):
+        """Schedule a write of newly staged mutations
+        
+        Returns False once the queue is closed, in which case the caller
+        must write them itself.
+        """
+        if self._closed:
+            return False
+        self._wakeup.set()
+        return True
+    
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            # Give the mutations that follow this one a chance to share its write
+            if self._stopped.wait(self.flush_interval):
+                return
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.error = e
+                self._wakeup.set()
+    
+    @timed("WriteQueue.flush")
+    def flush(self):
+        """Write every staged mutation now, returning once they are on disk"""
+        self.storage.flush_writes()
+        self.error = None
+    
+    def close(self):
+        """Stop the writer thread and write what is still staged"""
+        self._closed = True
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+
+def get_write_queue(storage, flush_interval=0.5):
+    """Get the process-wide write queue for a storage backend and stage its mutations for it"""
+    with _queues_lock:
+        queue = _queues.get(storage.storage_key)
+        if queue is None:
+            queue = WriteQueue(storage, flush_interval)
+            _queues[storage.storage_key] = queue
+    storage.write_queue = queue
+    return queue
+
+@atexit.register
+def flush_all():
+    """Close every write queue so no staged mutation is lost on shutdown"""
+    with _queues_lock:
+        queues = list(_queues.values())
+        _queues.clear()
+    for queue in queues:
+        try:
+            queue.close()
+        except Exception:
+            pass